@@ -0,0 +1,163 @@
+import os
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List
+from xml.sax.saxutils import quoteattr
+
+@dataclass
+class SyntheticProject:
+    """What generate_project wrote, for sizing benchmark results."""
+    root: str
+    classes: int
+    methods: int
+    lines: int
+    uncovered_lines: int
+    source_files: List[str] = field(default_factory=list)
+
+    @property
+    def jacoco_xml(self) -> str:
+        return os.path.join(self.root, "target", "site", "jacoco", "jacoco.xml")
+
+def _counter(kind: str, missed: int, covered: int) -> str:
+    return f'<counter type="{kind}" missed="{missed}" covered="{covered}"/>'
+
+def _add(totals: Dict[str, List[int]], other: Dict[str, List[int]]) -> None:
+    for kind, (missed, covered) in other.items():
+        totals.setdefault(kind, [0, 0])
+        totals[kind][0] += missed
+        totals[kind][1] += covered
+
+def _counters(totals: Dict[str, List[int]]) -> str:
+    return "".join(_counter(kind, *totals[kind]) for kind in ("INSTRUCTION", "BRANCH", "LINE", "COMPLEXITY", "METHOD", "CLASS")
+                   if kind in totals)
+
+def _method_source(index: int, blocks: int) -> List[str]:
+    """Lines of a method with `blocks` if/else blocks; branch lines are marked with a trailing '// if'"""
+    lines = [f"    public int method{index}(int a, int b) {{", "        int result = a;"]
+    for block in range(blocks):
+        lines += [
+            f"        if (a > {block}) {{ // if",
+            f"            result += b * {block + 1};",
+            "        } else {",
+            f"            result -= {block + 1};",
+            "        }",
+        ]
+    lines += ["        return result;", "    }", ""]
+    return lines
+
+def generate_project(
+    root: str,
+    packages: int = 5,
+    classes_per_package: int = 10,
+    methods_per_class: int = 8,
+    lines_per_method: int = 20,
+    missed_ratio: float = 0.4,
+    seed: int = 42
+) -> SyntheticProject:
+    """
+    Write a Maven-style Java source tree and a matching JaCoCo XML report.
+
+    Every method is a chain of if/else blocks sized to roughly lines_per_method
+    lines. Each executable line is marked missed with probability missed_ratio,
+    and branch lines get missed/covered branch counters to match, so the report
+    has the same shape as one JaCoCo writes (per-method, per-class, per-line,
+    package and report counters).
+
+    Args:
+        root (str): Directory to create the project in.
+        packages (int): Number of packages.
+        classes_per_package (int): Classes in each package.
+        methods_per_class (int): Methods in each class.
+        lines_per_method (int): Approximate source lines per method.
+        missed_ratio (float): Fraction of executable lines reported as not covered.
+        seed (int): Random seed, so the same arguments give the same project.
+
+    Returns:
+        SyntheticProject: Paths and sizes of what was generated.
+    """
+    rng = random.Random(seed)
+    blocks = max(1, (lines_per_method - 4) // 5)
+    project = SyntheticProject(root=root, classes=0, methods=0, lines=0, uncovered_lines=0)
+    report_totals: Dict[str, List[int]] = {}
+    package_xml = []
+
+    for p in range(packages):
+        package_name = f"com/bench/p{p}"
+        package_dir = os.path.join(root, "src", "main", "java", *package_name.split("/"))
+        os.makedirs(package_dir, exist_ok=True)
+        package_totals: Dict[str, List[int]] = {}
+        class_xml, sourcefile_xml = [], []
+
+        for c in range(classes_per_package):
+            class_name = f"Class{c}"
+            source = [f"package {package_name.replace('/', '.')};", "", f"public class {class_name} {{", ""]
+            class_totals: Dict[str, List[int]] = {"CLASS": [0, 1]}
+            method_xml, line_xml = [], []
+
+            for m in range(methods_per_class):
+                start = len(source) + 1
+                method_lines = _method_source(m, blocks)
+                source += method_lines
+                method_totals: Dict[str, List[int]] = {
+                    "INSTRUCTION": [0, 0], "BRANCH": [0, 0], "LINE": [0, 0], "COMPLEXITY": [0, 0], "METHOD": [0, 0]
+                }
+                for offset, text in enumerate(method_lines):
+                    stripped = text.strip()
+                    # Declarations, braces and blank lines carry no bytecode
+                    if not stripped or stripped in ("}", "} else {") or stripped.startswith("public"):
+                        continue
+                    number = start + offset
+                    instructions = 4
+                    missed = rng.random() < missed_ratio
+                    mi, ci = (instructions, 0) if missed else (0, instructions)
+                    mb = cb = 0
+                    if stripped.endswith("// if"):
+                        mb = rng.choice((0, 1, 2)) if not missed else 2
+                        cb = 2 - mb
+                    line_xml.append(f'<line nr="{number}" mi="{mi}" ci="{ci}" mb="{mb}" cb="{cb}"/>')
+                    method_totals["INSTRUCTION"][0] += mi
+                    method_totals["INSTRUCTION"][1] += ci
+                    method_totals["BRANCH"][0] += mb
+                    method_totals["BRANCH"][1] += cb
+                    method_totals["LINE"][0 if missed else 1] += 1
+                    project.lines += 1
+                    project.uncovered_lines += int(missed)
+                complexity_missed = min(blocks + 1, method_totals["BRANCH"][0] // 2 + int(method_totals["LINE"][1] == 0))
+                method_totals["COMPLEXITY"] = [complexity_missed, blocks + 1 - complexity_missed]
+                method_totals["METHOD"] = [1, 0] if method_totals["LINE"][1] == 0 else [0, 1]
+                method_xml.append(
+                    f'<method name="method{m}" desc="(II)I" line="{start + 1}">{_counters(method_totals)}</method>'
+                )
+                _add(class_totals, method_totals)
+                project.methods += 1
+
+            source.append("}")
+            path = os.path.join(package_dir, f"{class_name}.java")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(source) + "\n")
+            project.source_files.append(path)
+            project.classes += 1
+
+            class_xml.append(
+                f'<class name="{package_name}/{class_name}" sourcefilename="{class_name}.java">'
+                + "".join(method_xml) + _counters(class_totals) + "</class>"
+            )
+            sourcefile_xml.append(
+                f'<sourcefile name="{class_name}.java">' + "".join(line_xml) + _counters(class_totals) + "</sourcefile>"
+            )
+            _add(package_totals, class_totals)
+
+        package_xml.append(
+            f"<package name={quoteattr(package_name)}>" + "".join(class_xml) + "".join(sourcefile_xml)
+            + _counters(package_totals) + "</package>"
+        )
+        _add(report_totals, package_totals)
+
+    report_dir = os.path.join(root, "target", "site", "jacoco")
+    os.makedirs(report_dir, exist_ok=True)
+    with open(project.jacoco_xml, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n')
+        f.write('<report name="synthetic">' + "".join(package_xml) + _counters(report_totals) + "</report>\n")
+    with open(os.path.join(report_dir, "index.html"), 'w', encoding='utf-8') as f:
+        f.write("<html><body>synthetic report</body></html>\n")
+    return project
@@ -0,0 +1,244 @@
+"""
+Benchmarks for the coverage analysis pipeline.
+
+Generates a synthetic Maven project with a matching jacoco.xml, then times the
+analyzer, the agents and the LangGraph pipeline against an offline stub LLM.
+Results are saved as JSON so runs from different commits can be compared:
+
+    python benchmarks/run_benchmarks.py --classes 20 --repeat 5
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+# ensure the repository root is on path, as master_agent does
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_root)
+
+from benchmarks.generators import SyntheticProject, generate_project
+from benchmarks.stub_llm import StubLLM
+
+RESULTS_DIR = os.path.join(repo_root, "benchmarks", "results")
+
+def _time(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict:
+    """Run fn repeat times after one untimed warm-up and summarize the wall times"""
+    if setup:
+        setup()
+    fn()
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    return {
+        "runs": [round(run, 6) for run in runs],
+        "min": round(min(runs), 6),
+        "median": round(statistics.median(runs), 6),
+        "mean": round(statistics.mean(runs), 6)
+    }
+
+def _uncovered_files(project: SyntheticProject) -> Dict[str, List[int]]:
+    from src.tools.jacoco_xml_analyzer import JacocoXMLAnalyzer
+    files = {}
+    for source_path, lines in JacocoXMLAnalyzer(project.jacoco_xml).get_line_coverage().items():
+        uncovered = sorted(number for number, line in lines.items() if line.instructions_missed or line.branches_missed)
+        if uncovered:
+            files[os.path.join(project.root, "src", "main", "java", *source_path.split("/"))] = uncovered
+    return files
+
+def bench_jacoco_xml_analyzer(project: SyntheticProject, repeat: int) -> Dict:
+    from src.tools.jacoco_xml_analyzer import JacocoXMLAnalyzer
+    def run():
+        analyzer = JacocoXMLAnalyzer(project.jacoco_xml)
+        analyzer.analyze_coverage()
+        analyzer.get_coverage_summary()
+        analyzer.get_line_coverage()
+    return _time(run, repeat)
+
+def bench_coverage_agent(project: SyntheticProject, repeat: int) -> Dict:
+    from src.code_coverage_analyzer_agent import CoverageAnalysisAgent
+    return _time(lambda: CoverageAnalysisAgent(project.root).analyze_coverage(), repeat)
+
+def bench_tree_sitter(project: SyntheticProject, repeat: int, indexed: bool) -> Dict:
+    from src.tree_sitter_coverage_agent import TreeSitterCoverageAgent
+    from src.tools.method_index import MethodIndex
+    files = _uncovered_files(project)
+    index_dir = tempfile.mkdtemp(prefix="bench-index-")
+    try:
+        index = MethodIndex(os.path.join(index_dir, "methods.sqlite"), root=project.root) if indexed else None
+        agent = TreeSitterCoverageAgent(project.root, index=index)
+
+        async def collect():
+            return [result async for result in agent.analyze_files(files)]
+
+        result = _time(lambda: asyncio.run(collect()), repeat)
+        if index is not None:
+            index.close()
+        return result
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+def bench_orchestrator(project: SyntheticProject, repeat: int, llm: StubLLM) -> Dict:
+    from src.code_coverage_analyzer_agent import CoverageAnalysisAgent
+    from src.test_orchestrator_agent import TestOrchestratorAgent
+    from src.tree_sitter_coverage_agent import TreeSitterCoverageAgent
+
+    def run():
+        coverage_agent = CoverageAnalysisAgent(project.root)
+        coverage_agent.llm = llm
+        orchestrator = TestOrchestratorAgent(project.root, coverage_agent=coverage_agent,
+                                             tree_sitter_agent=TreeSitterCoverageAgent(project.root))
+        orchestrator.llm = llm
+        orchestrator.get_test_recommendations()
+    return _time(run, repeat)
+
+def bench_graph(project: SyntheticProject, repeat: int, llm: StubLLM) -> Dict:
+    """The compiled master_agent graph with cloning and the Maven build replaced by the synthetic project"""
+    import src.master_agent as master_agent
+    from src.pipeline_session import PipelineSession
+    from src.tools.metrics import InstrumentedLLM
+
+    master_agent.clone_repo = lambda inputs: {"project_dir": project.root, "commit": "synthetic", "clone_timing": {}}
+    master_agent.run_jacoco = lambda *args, **kwargs: os.path.join(project.root, "target", "site", "jacoco", "index.html")
+    master_agent.BuildRunner.detect = staticmethod(lambda *args, **kwargs: None)
+    app = master_agent.build_graph()
+
+    def run():
+        session = PipelineSession()
+        session.coverage_agent(project.root).llm = InstrumentedLLM(llm)
+        app.invoke({"repo_url": "synthetic", "session": session})
+    return _time(run, repeat)
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_benchmarks(args: argparse.Namespace) -> Dict:
+    # The agents build OpenAI clients on construction; no request is ever sent with this key
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-offline")
+    os.environ.setdefault("CODECOV_CACHE_DIR", tempfile.mkdtemp(prefix="bench-cache-"))
+    workdir = tempfile.mkdtemp(prefix="bench-project-")
+    try:
+        started = time.perf_counter()
+        project = generate_project(
+            workdir, packages=args.packages, classes_per_package=args.classes,
+            methods_per_class=args.methods, lines_per_method=args.lines, seed=args.seed
+        )
+        generation_seconds = time.perf_counter() - started
+        llm = StubLLM(latency=args.llm_latency)
+
+        benchmarks = {
+            "jacoco_xml_analyzer": lambda: bench_jacoco_xml_analyzer(project, args.repeat),
+            "coverage_agent.analyze_coverage": lambda: bench_coverage_agent(project, args.repeat),
+            "tree_sitter.analyze_files[cold]": lambda: bench_tree_sitter(project, args.repeat, indexed=False),
+            "tree_sitter.analyze_files[indexed]": lambda: bench_tree_sitter(project, args.repeat, indexed=True),
+            "orchestrator.get_test_recommendations": lambda: bench_orchestrator(project, args.repeat, llm),
+            "graph.invoke": lambda: bench_graph(project, args.repeat, llm),
+        }
+        results = {}
+        for name, bench in benchmarks.items():
+            if args.only and not any(part in name for part in args.only):
+                continue
+            print(f"Running {name}...", flush=True)
+            try:
+                results[name] = bench()
+            except Exception as e:
+                # e.g. graph.invoke without the optional runtime dependencies installed
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+        return {
+            "commit": _commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "packages": args.packages, "classes_per_package": args.classes, "methods_per_class": args.methods,
+                "lines_per_method": args.lines, "repeat": args.repeat, "seed": args.seed, "llm_latency": args.llm_latency
+            },
+            "project": {
+                "classes": project.classes, "methods": project.methods, "lines": project.lines,
+                "uncovered_lines": project.uncovered_lines, "generation_seconds": round(generation_seconds, 3)
+            },
+            "llm_calls": llm.calls,
+            "results": results
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Print median times against a baseline run; returns the benchmarks slower than threshold x"""
+    print(f"\nCompared with {baseline.get('commit', '?')} ({baseline.get('timestamp', '?')}):")
+    if baseline.get("config") != current.get("config"):
+        print("  warning: the baseline used a different configuration")
+    print(f"  {'Benchmark':<40} {'Baseline':>10} {'Current':>10} {'Ratio':>7}")
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name, {})
+        if "median" not in result or "median" not in before:
+            continue
+        ratio = result["median"] / before["median"] if before["median"] else float("inf")
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"  {name:<40} {before['median']:>9.4f}s {result['median']:>9.4f}s {ratio:>6.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+def print_results(report: Dict) -> None:
+    project = report["project"]
+    print(f"\nSynthetic project: {project['classes']} classes, {project['methods']} methods, "
+          f"{project['lines']} executable lines ({project['uncovered_lines']} uncovered)")
+    print(f"  {'Benchmark':<40} {'Min':>10} {'Median':>10} {'Mean':>10}")
+    for name, result in report["results"].items():
+        if "error" in result:
+            print(f"  {name:<40} skipped: {result['error']}")
+        else:
+            print(f"  {name:<40} {result['min']:>9.4f}s {result['median']:>9.4f}s {result['mean']:>9.4f}s")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the coverage pipeline on a synthetic project.")
+    parser.add_argument("--packages", type=int, default=5)
+    parser.add_argument("--classes", type=int, default=10, help="classes per package")
+    parser.add_argument("--methods", type=int, default=8, help="methods per class")
+    parser.add_argument("--lines", type=int, default=20, help="approximate lines per method")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark (after one warm-up)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the stub LLM sleeps per call")
+    parser.add_argument("--only", nargs="*", help="run only benchmarks whose name contains one of these")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args)
+    print_results(report)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+@dataclass
+class StubResponse:
+    content: str
+    usage_metadata: Dict[str, int] = field(default_factory=dict)
+
+class StubLLM:
+    """
+    Offline stand-in for the chat model: returns a fixed JUnit test after an optional
+    fake latency, and reports token usage estimated from the prompt size, so
+    benchmarks measure the pipeline rather than the network.
+    """
+
+    model_name = "stub-llm"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, messages: Any, *args, **kwargs) -> StubResponse:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages if isinstance(messages, str) else " ".join(_text(m) for m in messages)
+        content = (
+            "import org.junit.jupiter.api.Test;\n"
+            "import static org.junit.jupiter.api.Assertions.*;\n\n"
+            "@Test\n"
+            "void testMethod_returnsValue() {\n"
+            "    assertEquals(1, 1);\n"
+            "}\n"
+        )
+        # Roughly four characters per token
+        return StubResponse(content, {"input_tokens": len(prompt) // 4, "output_tokens": len(content) // 4})
+
+def _text(message: Any) -> str:
+    if isinstance(message, dict):
+        return str(message.get("content", ""))
+    return str(getattr(message, "content", message))
@@ -0,0 +1,171 @@
+import os
+import sys
+import re
+import json
+import time
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# ensure the repository root is on path
+project_root = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from src.master_agent import build_graph
+from src.tools.limits import configure_limits
+
+@dataclass
+class BatchJob:
+    """One repository (and optionally a ref and diff base) to run the pipeline for."""
+    repo_url: str
+    ref: Optional[str] = None
+    base_ref: Optional[str] = None
+    # Extra initial state, e.g. {"clone_depth": 1, "incremental": True}
+    options: Dict[str, Any] = field(default_factory=dict)
+
+def load_jobs(path: str) -> List[BatchJob]:
+    """
+    Read batch jobs from a file.
+
+    A '.json' file holds a list of objects with 'repo_url' and optional 'ref',
+    'base_ref' and 'options'. Any other file is read as text with one
+    '<repo_url> [ref]' per line; blank lines and lines starting with '#' are skipped.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(".json"):
+            return [BatchJob(**entry) for entry in json.load(f)]
+        jobs = []
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split()
+            jobs.append(BatchJob(repo_url=parts[0], ref=parts[1] if len(parts) > 1 else None))
+        return jobs
+
+def _workspace_name(job: BatchJob, index: int) -> str:
+    name = job.repo_url.rstrip("/").rsplit("/", 1)[-1]
+    if name.endswith(".git"):
+        name = name[:-4]
+    suffix = f"-{job.ref}" if job.ref else ""
+    return f"{index:03d}-" + re.sub(r"[^A-Za-z0-9._-]+", "_", name + suffix)
+
+def _run_job(app, job: BatchJob, workspace: str, resume: bool = False) -> Dict[str, Any]:
+    """Run the pipeline for one job in its own workspace and summarize the outcome"""
+    initial: Dict[str, Any] = {
+        "checkpoint": True,
+        **job.options,
+        "repo_url": job.repo_url,
+        "target_dir": os.path.join(workspace, "cloned_repo"),
+        "resume": resume
+    }
+    if job.ref:
+        initial["ref"] = job.ref
+    if job.base_ref:
+        initial["base_ref"] = job.base_ref
+        initial["head_ref"] = job.ref or "HEAD"
+
+    summary: Dict[str, Any] = {"repo_url": job.repo_url, "ref": job.ref, "workspace": workspace}
+    started = time.perf_counter()
+    try:
+        final_state = app.invoke(initial)
+        summary.update({
+            "status": "ok",
+            "commit": final_state.get("commit"),
+            "coverage": final_state.get("coverage_analysis", {}),
+            "recommendations": len(final_state.get("test_recommendations", [])),
+            "stage_counts": final_state["session"].stage_counts(),
+            "metrics_files": list(final_state["session"].metrics.export()),
+            "error": None
+        })
+    except Exception as e:
+        logging.exception(f"Pipeline failed for {job.repo_url}")
+        summary.update({"status": "failed", "commit": None, "coverage": {}, "recommendations": 0, "error": str(e)})
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+def run_batch(
+    jobs: List[BatchJob],
+    workers: int = 2,
+    maven_slots: Optional[int] = None,
+    llm_concurrency: Optional[int] = None,
+    workspace_root: Optional[str] = None,
+    resume: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Run the coverage pipeline for several repositories concurrently.
+
+    Every job clones into its own workspace, so jobs never share a checkout. Maven
+    builds and LLM requests are limited separately across all jobs, so more repositories
+    can be in flight than there are Maven slots.
+
+    Args:
+        jobs (List[BatchJob]): The repositories to process.
+        workers (int): How many jobs run at the same time.
+        maven_slots (Optional[int]): Concurrent Maven invocations (default: MAVEN_SLOTS, else the CPU count).
+        llm_concurrency (Optional[int]): Concurrent LLM requests (default: LLM_CONCURRENCY, else 4).
+        workspace_root (Optional[str]): Parent directory of the job workspaces (default: ./batch_workspaces).
+        resume (bool): Skip the graph nodes each job completed in an earlier, interrupted batch.
+
+    Returns:
+        List[Dict[str, Any]]: One summary per job, in input order.
+    """
+    configure_limits(maven_slots, llm_concurrency)
+    workspace_root = workspace_root or os.path.join(os.getcwd(), "batch_workspaces")
+    app = build_graph()
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {}
+        for index, job in enumerate(jobs):
+            workspace = os.path.join(workspace_root, _workspace_name(job, index))
+            os.makedirs(workspace, exist_ok=True)
+            futures[pool.submit(_run_job, app, job, workspace, resume)] = index
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            logging.info(f"{result['repo_url']} finished with status {result['status']} in {result['seconds']}s")
+    return results
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    """Print a one-line summary per repository"""
+    print("\n📦 Batch Results:")
+    print(f"{'Repository':<50} {'Ref':<15} {'Status':<7} {'Line %':>7} {'Branch %':>9} {'Tests':>6} {'Time':>8}")
+    for result in results:
+        coverage = result["coverage"]
+        line = f"{coverage.get('line_coverage', 0.0):.1f}" if coverage else "-"
+        branch = f"{coverage.get('branch_coverage', 0.0):.1f}" if coverage else "-"
+        print(f"{result['repo_url'][-50:]:<50} {(result['ref'] or '-'):<15} {result['status']:<7} "
+              f"{line:>7} {branch:>9} {result['recommendations']:>6} {result['seconds']:>7.1f}s")
+        if result["error"]:
+            print(f"    error: {result['error']}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the coverage pipeline for several repositories concurrently.")
+    parser.add_argument("jobs", help="JSON list of jobs, or a text file with one '<repo_url> [ref]' per line")
+    parser.add_argument("--workers", type=int, default=2, help="repositories processed at the same time")
+    parser.add_argument("--maven-slots", type=int, help="concurrent Maven builds across all repositories")
+    parser.add_argument("--llm-concurrency", type=int, help="concurrent LLM requests across all repositories")
+    parser.add_argument("--workspace-root", help="parent directory of the per-job workspaces")
+    parser.add_argument("--resume", action="store_true", help="reuse the checkpoints of an interrupted batch")
+    parser.add_argument("--output", help="write the per-repository summaries to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_batch(
+        load_jobs(args.jobs),
+        workers=args.workers,
+        maven_slots=args.maven_slots,
+        llm_concurrency=args.llm_concurrency,
+        workspace_root=args.workspace_root,
+        resume=args.resume
+    )
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
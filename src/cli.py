@@ -0,0 +1,123 @@
+"""
+Fast, read-only commands over an existing JaCoCo report.
+
+Unlike master_agent, nothing here imports langgraph, langchain or the OpenAI client,
+so the commands start in well under a second:
+
+    python src/cli.py summary cloned_repo
+    python src/cli.py report cloned_repo --json
+    python src/cli.py diff cloned_repo --base origin/main
+"""
+import os
+import sys
+import json
+import argparse
+from typing import Dict, List, Optional
+
+# ensure the repository root is on path
+project_root = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+from src.code_coverage_analyzer_agent import CoverageAnalysisAgent, format_ranges, range_lines, ranges_to_json
+
+METRICS = ("instruction", "branch", "line", "complexity", "method", "class")
+
+def _source_path(class_info: Dict) -> str:
+    package = class_info["class_name"].rsplit("/", 1)[0] if "/" in class_info["class_name"] else ""
+    return f"{package}/{class_info['source_file']}" if package else class_info["source_file"]
+
+def summary_command(args: argparse.Namespace) -> Dict:
+    """Report-wide coverage and how much of the code still needs tests"""
+    analysis = CoverageAnalysisAgent(args.project_dir).analyze_coverage()
+    classes = analysis["classes_needing_coverage"]
+    return {
+        "summary": analysis["summary"],
+        "classes_needing_coverage": len(classes),
+        "methods_needing_coverage": sum(len(class_info["methods_needing_coverage"]) for class_info in classes),
+        "uncovered_ranges": sum(len(class_info["uncovered_ranges"]) for class_info in classes),
+        "uncovered_lines": sum(range_lines(class_info["uncovered_ranges"]) for class_info in classes)
+    }
+
+def report_command(args: argparse.Namespace) -> Dict:
+    """The classes and methods needing coverage, least covered first"""
+    analysis = CoverageAnalysisAgent(args.project_dir).analyze_coverage()
+    classes = sorted(analysis["classes_needing_coverage"], key=lambda class_info: -range_lines(class_info["uncovered_ranges"]))
+    return {"summary": analysis["summary"], "classes": classes[:args.limit] if args.limit else classes}
+
+def diff_command(args: argparse.Namespace) -> Dict:
+    """The uncovered lines and methods among the lines changed between two refs"""
+    from src.tools.diff_scope import compute_diff_scope
+    scope = compute_diff_scope(args.project_dir, args.base, args.head)
+    analysis = CoverageAnalysisAgent(args.project_dir, diff_scope=scope).analyze_coverage()
+    return {
+        "base": scope.base,
+        "head": scope.head,
+        "changed_files": len(scope.changed_lines),
+        "classes": [
+            {
+                "class_name": class_info["class_name"],
+                "source_path": _source_path(class_info),
+                "uncovered_ranges": class_info["uncovered_ranges"],
+                "methods": [method["method_name"] for method in class_info["methods_needing_coverage"]]
+            }
+            for class_info in analysis["classes_needing_coverage"]
+        ]
+    }
+
+def _print_summary(summary: Dict) -> None:
+    print(f"{'Metric':<12} {'Covered':>9} {'Missed':>9} {'Coverage':>9}")
+    for metric in METRICS:
+        stats = summary[metric]
+        print(f"{metric:<12} {stats['covered']:>9} {stats['missed']:>9} {stats['coverage']:>8.1f}%")
+
+def _print_result(command: str, result: Dict) -> None:
+    if command == "summary":
+        _print_summary(result["summary"])
+        print(f"\n{result['classes_needing_coverage']} class(es), {result['methods_needing_coverage']} method(s) "
+              f"and {result['uncovered_lines']} line(s) in {result['uncovered_ranges']} range(s) need coverage")
+    elif command == "report":
+        _print_summary(result["summary"])
+        for class_info in result["classes"]:
+            print(f"\n{class_info['class_name']} (uncovered lines: {format_ranges(class_info['uncovered_ranges'])})")
+            for method in class_info["methods_needing_coverage"]:
+                metrics = method["coverage_metrics"]
+                print(f"    {method['method_name']:<40} line {method['line']:<6} "
+                      f"instructions {metrics['instruction_coverage']:5.1f}%  branches {metrics['branch_coverage']:5.1f}%")
+    else:
+        print(f"{result['changed_files']} changed Java file(s) between {result['base'][:10]} and {result['head'][:10]}")
+        if not result["classes"]:
+            print("All changed lines are covered")
+        for class_info in result["classes"]:
+            print(f"\n{class_info['source_path']}\n    uncovered lines: {format_ranges(class_info['uncovered_ranges'])}")
+            if class_info["methods"]:
+                print(f"    methods: {', '.join(class_info['methods'])}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect a project's JaCoCo report without running the pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    summary = commands.add_parser("summary", help="overall coverage")
+    report = commands.add_parser("report", help="classes and methods needing coverage")
+    report.add_argument("--limit", type=int, help="show only the N classes with the most uncovered lines")
+    diff = commands.add_parser("diff", help="uncovered lines changed between two refs")
+    diff.add_argument("--base", required=True, help="ref the change is compared against, e.g. origin/main")
+    diff.add_argument("--head", default="HEAD", help="ref containing the change (default: HEAD)")
+    for command in (summary, report, diff):
+        command.add_argument("project_dir", help="Maven project with target/site/jacoco/jacoco.xml")
+        command.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    handlers = {"summary": summary_command, "report": report_command, "diff": diff_command}
+    try:
+        result = handlers[args.command](args)
+    except FileNotFoundError as e:
+        print(f"No JaCoCo report found: {e}", file=sys.stderr)
+        return 2
+    if args.json:
+        print(json.dumps(ranges_to_json(result), indent=2, default=str))
+    else:
+        _print_result(args.command, result)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
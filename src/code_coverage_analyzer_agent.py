@@ -1,23 +1,53 @@
 from typing import Dict, List
-from langgraph.graph import MessageGraph
-from tools.jacoco_xml_analyzer import JacocoXMLAnalyzer
+from src.tools.jacoco_xml_analyzer import JacocoXMLAnalyzer, UncoveredRange, line_ranges
+from src.tools.limits import llm_slot
+from src.tools.test_context_index import TestContextIndex, method_query
 import os
 import datetime
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+
+def format_ranges(ranges: List[UncoveredRange]) -> str:
+    """
+    Uncovered ranges as compact prompt text, e.g. '12-18, 21 (1/2 branches missed), 25 (partial)'.
+    Branch counts are only spelled out where they tell more than the source does,
+    i.e. for partially covered ranges.
+    """
+    parts = []
+    for line_range in ranges:
+        lines = str(line_range.start) if line_range.start == line_range.end else f"{line_range.start}-{line_range.end}"
+        branches = line_range.branches_missed + line_range.branches_covered
+        if line_range.partial:
+            lines += f" ({line_range.branches_missed}/{branches} branches missed)" if branches else " (partial)"
+        parts.append(lines)
+    return ", ".join(parts) or "none"
+
+def range_lines(ranges: List[UncoveredRange]) -> int:
+    """Number of missed or partially covered lines in the ranges, not counting the absorbed lines"""
+    return sum(line_range.lines for line_range in ranges)
+
+def ranges_to_json(value):
+    """value with every UncoveredRange turned into a dict, so JSON output labels its fields"""
+    if isinstance(value, UncoveredRange):
+        return value._asdict()
+    if isinstance(value, dict):
+        return {key: ranges_to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [ranges_to_json(item) for item in value]
+    return value
 
 class CoverageAnalysisAgent:
-    def __init__(self, repo_path: str):
+    def __init__(self, repo_path: str, diff_scope=None):
         self.repo_path = repo_path
+        # Optional DiffScope limiting analysis and generation to changed lines
+        self.diff_scope = diff_scope
         self.jacoco_xml_path = os.path.join(repo_path, "target", "site", "jacoco", "jacoco.xml")
-        self.analyzer = JacocoXMLAnalyzer(self.jacoco_xml_path)
-        
-        # Initialize AI components
-        self.llm = ChatOpenAI(
-            model_name="gpt-4.1",
-            temperature=0.0,
-            streaming=True
-        )
+        # The report is parsed and the LLM client built on first use (see the properties below),
+        # so summary-only callers never pay for the client or the langchain imports
+        self._analyzer = None
+        self._llm = None
+        # BM25 index of the project's existing tests, used for few-shot examples in prompts
+        self._test_context = None
+        # analyze_coverage() result; the report does not change during the agent's lifetime
+        self._coverage_analysis = None
         
         # Define the system prompt for test case analysis
         self.system_prompt = """You are an expert Java testing code generator. Your task is to generate ONLY pure Java JUnit test code. No explanations, comments or text should be included.
@@ -36,16 +66,57 @@ Your output rules:
    - Error paths
    - Uncovered lines"""
 
+    @property
+    def analyzer(self) -> JacocoXMLAnalyzer:
+        if self._analyzer is None:
+            self._analyzer = JacocoXMLAnalyzer(self.jacoco_xml_path)
+        return self._analyzer
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._llm = self.build_llm()
+        return self._llm
+
+    @llm.setter
+    def llm(self, llm) -> None:
+        self._llm = llm
+
+    @property
+    def test_context(self) -> TestContextIndex:
+        if self._test_context is None:
+            self._test_context = TestContextIndex(self.repo_path)
+        return self._test_context
+
+    @test_context.setter
+    def test_context(self, index: TestContextIndex) -> None:
+        self._test_context = index
+
+    def build_llm(self):
+        """Create the chat model used for test suggestions"""
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model_name="gpt-4.1",
+            temperature=0.0,
+            streaming=True,
+            # Report token usage on streamed responses too, for the run metrics
+            stream_usage=True
+        )
+
     def analyze_coverage(self) -> Dict:
         """
         Analyzes the Jacoco coverage report and returns detailed information about:
         - Overall coverage metrics
         - Classes with incomplete coverage
         - Methods with incomplete coverage
-        - Uncovered lines that need test cases
+        - Uncovered and partially covered line ranges ('uncovered_ranges') that need test cases
         """
+        if self._coverage_analysis is not None:
+            return self._coverage_analysis
         coverage_data = self.analyzer.analyze_coverage()
         summary = self.analyzer.get_coverage_summary()
+        # Diff mode encodes the ranges again from the changed lines only
+        line_coverage = self.analyzer.get_line_coverage() if self.diff_scope is not None else None
         
         # Find classes and methods that need more coverage
         classes_needing_coverage = []
@@ -53,7 +124,7 @@ Your output rules:
             class_info = {
                 "class_name": class_coverage.name,
                 "source_file": class_coverage.source_file,
-                "uncovered_lines": class_coverage.uncovered_lines,
+                "uncovered_ranges": class_coverage.line_ranges,
                 "methods_needing_coverage": []
             }
             
@@ -71,13 +142,40 @@ Your output rules:
                     }
                     class_info["methods_needing_coverage"].append(method_info)
             
-            if class_info["methods_needing_coverage"] or class_info["uncovered_lines"]:
+            if self.diff_scope is not None:
+                class_info = self._limit_to_diff(class_coverage, class_info, line_coverage)
+
+            if class_info["methods_needing_coverage"] or class_info["uncovered_ranges"]:
                 classes_needing_coverage.append(class_info)
         
-        return {
+        self._coverage_analysis = {
             "summary": summary,
             "classes_needing_coverage": classes_needing_coverage
         }
+        return self._coverage_analysis
+
+    def _limit_to_diff(self, class_coverage, class_info: Dict, line_coverage: Dict) -> Dict:
+        """Keep only the uncovered lines and methods that overlap lines changed in the diff"""
+        package = class_coverage.name.rsplit("/", 1)[0] if "/" in class_coverage.name else ""
+        source_path = f"{package}/{class_coverage.source_file}" if package else class_coverage.source_file
+
+        # JaCoCo only reports where a method starts; assume it runs until the next one does
+        method_starts = sorted({method.line for method in class_coverage.methods})
+        def method_end(start_line: int) -> int:
+            later = [line for line in method_starts if line > start_line]
+            return later[0] - 1 if later else 2 ** 31
+
+        # Classes in the default package are keyed '/SourceFile.java'
+        lines = line_coverage.get(source_path) or line_coverage.get(f"/{source_path}", {})
+        changed = set(self.diff_scope.filter_lines(source_path, lines))
+        return {
+            **class_info,
+            "uncovered_ranges": line_ranges(lines.values(), changed.__contains__, method_starts),
+            "methods_needing_coverage": [
+                method for method in class_info["methods_needing_coverage"]
+                if self.diff_scope.overlaps(source_path, method["line"], method_end(method["line"]))
+            ]
+        }
 
     def _read_source_file(self, class_name: str, source_file: str) -> str:
         """Read the source code of the Java file"""
@@ -88,18 +186,23 @@ Your output rules:
                 return f.read()
         return ""
 
-    def _read_test_file(self, class_name: str) -> str:
-        """Read the existing test file for the class"""
-        test_path = os.path.join(self.repo_path, "src", "test", "java",
-                                *class_name.split("/")) + "Test.java"
-        if os.path.exists(test_path):
-            with open(test_path, 'r') as f:
-                return f.read()
-        return ""
+    def _test_examples(self, class_info: Dict, source_code: str) -> str:
+        """The existing tests most relevant to the class's uncovered methods and lines, within the token budget"""
+        lines = source_code.splitlines()
+        uncovered_code = "\n".join(
+            "\n".join(lines[line_range.start - 1:line_range.end]) for line_range in class_info["uncovered_ranges"]
+        )
+        method_names = " ".join(method["method_name"] for method in class_info["methods_needing_coverage"]
+                                if method["method_name"] != "<init>")
+        return TestContextIndex.format_examples(
+            self.test_context.few_shot(method_query(class_info["class_name"], method_names, uncovered_code))
+        )
 
     def _get_ai_test_suggestions(self, class_info: Dict, source_code: str, existing_tests: str) -> Dict:
         """Use AI to analyze the code and suggest specific test improvements"""
         
+        from langchain_core.prompts import ChatPromptTemplate
+
         # Create a detailed prompt for the AI
         prompt = ChatPromptTemplate.from_messages([
             ("system", self.system_prompt),
@@ -107,10 +210,10 @@ Your output rules:
 
 {source_code}
 
-Current test file:
+Relevant existing tests from this project (follow their imports, fixtures and style):
 {existing_tests}
 
-Uncovered lines: {uncovered_lines}
+Uncovered line ranges (partially covered ones are marked): {uncovered_ranges}
 
 Generate only the missing JUnit test methods needed to cover these lines. Output only valid Java code.""")
         ])
@@ -119,11 +222,12 @@ Generate only the missing JUnit test methods needed to cover these lines. Output
         messages = prompt.format_messages(
             source_code=source_code,
             existing_tests=existing_tests,
-            uncovered_lines=class_info["uncovered_lines"]
+            uncovered_ranges=format_ranges(class_info["uncovered_ranges"])
         )
 
         # Get AI response
-        response = self.llm.invoke(messages)
+        with llm_slot():
+            response = self.llm.invoke(messages)
         
         # Parse and structure the AI suggestions
         return {
@@ -131,18 +235,15 @@ Generate only the missing JUnit test methods needed to cover these lines. Output
             "generated_timestamp": str(datetime.datetime.now())
         }
 
-    def suggest_test_improvements(self) -> Dict:
-        """
-        Analyzes coverage data and suggests specific improvements needed for test cases,
-        enhanced with AI-powered suggestions
-        """
-        analysis = self.analyze_coverage()
-        
+    def _class_suggestions(self, class_info: Dict, test_code: str = None) -> List[Dict]:
+        """AI-backed suggestions for the methods of one class from analyze_coverage()"""
         suggestions = []
-        for class_info in analysis["classes_needing_coverage"]:
-            # Get source code and existing tests
+        if test_code is not None:
+            ai_suggestions = {"ai_suggestions": test_code, "generated_timestamp": str(datetime.datetime.now())}
+        else:
+            # Get source code and the existing tests closest to what needs covering
             source_code = self._read_source_file(class_info["class_name"], class_info["source_file"])
-            existing_tests = self._read_test_file(class_info["class_name"])
+            existing_tests = self._test_examples(class_info, source_code)
             
             # Get AI suggestions for this class
             ai_suggestions = self._get_ai_test_suggestions(
@@ -150,32 +251,50 @@ Generate only the missing JUnit test methods needed to cover these lines. Output
                 source_code,
                 existing_tests
             )
+        
+        class_name = class_info["class_name"].split("/")[-1]  # Get simple class name
+        # Ranges never span two methods, and every method with a range needs coverage,
+        # so a method's ranges are those starting before the next such method
+        method_starts = sorted({method["line"] for method in class_info["methods_needing_coverage"]})
+        
+        for method in class_info["methods_needing_coverage"]:
+            method_name = method["method_name"]
+            next_start = next((line for line in method_starts if line > method["line"]), 2 ** 31)
             
-            class_name = class_info["class_name"].split("/")[-1]  # Get simple class name
-            
-            for method in class_info["methods_needing_coverage"]:
-                method_name = method["method_name"]
+            # Skip constructors as they usually don't need extensive testing
+            if method_name == "<init>":
+                continue
                 
-                # Skip constructors as they usually don't need extensive testing
-                if method_name == "<init>":
-                    continue
-                    
-                suggestion = {
-                    "class_name": class_name,
-                    "method_name": method_name,
-                    "line_number": method["line"],
-                    "uncovered_lines": [line for line in class_info["uncovered_lines"] if line >= method["line"]],
-                    "coverage_needed": {
-                        "instruction_coverage": f"{method['coverage_metrics']['instruction_coverage']:.1f}%",
-                        "branch_coverage": f"{method['coverage_metrics']['branch_coverage']:.1f}%"
-                    },
-                    "automated_analysis": {
-                        "missed_branches": method["missed_branches"] > 0,
-                        "missed_instructions": method["missed_instructions"] > 0,
-                    },
-                    "ai_suggestions": ai_suggestions,
-                }
-                suggestions.append(suggestion)
+            suggestion = {
+                "class_name": class_name,
+                "method_name": method_name,
+                "line_number": method["line"],
+                "uncovered_ranges": [
+                    line_range for line_range in class_info["uncovered_ranges"] if method["line"] <= line_range.start < next_start
+                ],
+                "coverage_needed": {
+                    "instruction_coverage": f"{method['coverage_metrics']['instruction_coverage']:.1f}%",
+                    "branch_coverage": f"{method['coverage_metrics']['branch_coverage']:.1f}%"
+                },
+                "automated_analysis": {
+                    "missed_branches": method["missed_branches"] > 0,
+                    "missed_instructions": method["missed_instructions"] > 0,
+                },
+                "ai_suggestions": ai_suggestions,
+            }
+            suggestions.append(suggestion)
+        return suggestions
+
+    def suggest_test_improvements(self) -> Dict:
+        """
+        Analyzes coverage data and suggests specific improvements needed for test cases,
+        enhanced with AI-powered suggestions
+        """
+        analysis = self.analyze_coverage()
+        
+        suggestions = []
+        for class_info in analysis["classes_needing_coverage"]:
+            suggestions.extend(self._class_suggestions(class_info))
 
         # Calculate actual coverage from all methods
         total_instructions_missed = sum(
@@ -209,32 +328,48 @@ Generate only the missing JUnit test methods needed to cover these lines. Output
     
     def get_coverage_data(self) -> Dict:
         """Get coverage data and test recommendations from the JaCoCo report"""
-        coverage_data = self.analyze_coverage()
         summary = self.analyzer.get_coverage_summary()
         test_improvements = self.suggest_test_improvements()
         
         return {
-            "overall_coverage": {
-                "instruction_coverage": float(summary["instruction"]["coverage"]),
-                "branch_coverage": float(summary["branch"]["coverage"]),
-                "line_coverage": float(summary["line"]["coverage"]),
-                "complexity_coverage": float(summary["complexity"]["coverage"]),
-                "method_coverage": float(summary["method"]["coverage"])
-            },
+            "overall_coverage": self.overall_coverage(summary),
             "test_recommendations": [
-                {
-                    "class_name": suggestion["class_name"],
-                    "method_name": suggestion["method_name"],
-                    "test_code": suggestion["ai_suggestions"]["ai_suggestions"],
-                    "coverage": {
-                        "instruction_coverage": float(suggestion["coverage_needed"]["instruction_coverage"].rstrip('%')),
-                        "branch_coverage": float(suggestion["coverage_needed"]["branch_coverage"].rstrip('%'))
-                    }
-                }
+                self._recommendation(suggestion)
                 for suggestion in test_improvements["test_improvement_suggestions"]
             ]
         }
 
+    def overall_coverage(self, summary: Dict = None) -> Dict:
+        """Report-wide coverage percentages as floats"""
+        summary = summary or self.analyzer.get_coverage_summary()
+        return {
+            "instruction_coverage": float(summary["instruction"]["coverage"]),
+            "branch_coverage": float(summary["branch"]["coverage"]),
+            "line_coverage": float(summary["line"]["coverage"]),
+            "complexity_coverage": float(summary["complexity"]["coverage"]),
+            "method_coverage": float(summary["method"]["coverage"])
+        }
+
+    def class_recommendations(self, class_info: Dict, test_code: str = None) -> List[Dict]:
+        """
+        Test recommendations for a single class from analyze_coverage()['classes_needing_coverage'].
+        When test_code is given (e.g. a previously validated test) the LLM is not asked.
+        """
+        return [self._recommendation(suggestion) for suggestion in self._class_suggestions(class_info, test_code)]
+
+    @staticmethod
+    def _recommendation(suggestion: Dict) -> Dict:
+        return {
+            "class_name": suggestion["class_name"],
+            "method_name": suggestion["method_name"],
+            "line_number": suggestion["line_number"],
+            "test_code": suggestion["ai_suggestions"]["ai_suggestions"],
+            "coverage": {
+                "instruction_coverage": float(suggestion["coverage_needed"]["instruction_coverage"].rstrip('%')),
+                "branch_coverage": float(suggestion["coverage_needed"]["branch_coverage"].rstrip('%'))
+            }
+        }
+
     def get_uncovered_methods(self) -> List[Dict]:
         """Get a list of methods that need coverage"""
         coverage_data = self.analyze_coverage()
@@ -249,6 +384,7 @@ Generate only the missing JUnit test methods needed to cover these lines. Output
                     
                 uncovered_methods.append({
                     "class_name": class_name,
+                    "class_path": class_info["class_name"],
                     "method_name": method["method_name"],
                     "line": method["line"],
                     "coverage": {
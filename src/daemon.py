@@ -0,0 +1,380 @@
+"""
+Long-running local analysis service.
+
+Keeps tree-sitter parsers, parsed JaCoCo reports and LLM clients warm between
+requests, so IDE and CI hooks get quick answers for incremental queries:
+
+    python src/daemon.py serve --port 8765            # or --socket /tmp/codecov.sock
+    python src/daemon.py analyze cloned_repo          # or: curl -H 'Content-Type: application/json' \
+                                                      #       -d '{"project_dir": "..."}' localhost:8765/analyze
+    python src/daemon.py generate cloned_repo --class com/example/Foo
+
+Endpoints (JSON bodies and responses; only local, application/json requests are served):
+    GET  /health
+    POST /analyze     {"project_dir", "base_ref"?, "head_ref"?, "files"?, "structure"?}
+    POST /generate    {"project_dir", "classes"?, "base_ref"?, "head_ref"?}
+    POST /invalidate  {"project_dir"?}
+    POST /shutdown
+"""
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import threading
+import http.client
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from socketserver import ThreadingMixIn
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# ensure the repository root is on path
+project_root = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_SESSIONS = 8
+DEFAULT_SESSION_TTL = 3600
+
+# Host names a request may address the daemon by; anything else is a foreign site
+# reaching the port through the browser (DNS rebinding)
+_LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1", "::1"})
+
+class AnalysisDaemon:
+    """
+    Serves analyze and generate requests from warm PipelineSessions.
+
+    There is one session per project directory and diff range. It is replaced when
+    the project's jacoco.xml changes. The new session inherits the tree-sitter
+    agent, whose parsers and method index stay valid because the index is keyed by
+    file content. All sessions share one ClientPool of LLM clients. Sessions unused
+    for session_ttl seconds are dropped, and beyond max_sessions the least recently
+    used one goes (CODECOV_DAEMON_MAX_SESSIONS and CODECOV_DAEMON_SESSION_TTL by
+    default).
+    """
+
+    # Stages whose artifacts outlive a coverage report
+    WARM_STAGES = ("tree_sitter_agent",)
+
+    def __init__(self, max_sessions: Optional[int] = None, session_ttl: Optional[float] = None):
+        # Imported here so the client commands of this module start without the pipeline
+        from src.pipeline_session import ClientPool
+        self.clients = ClientPool()
+        self.started = time.time()
+        self.max_sessions = max_sessions or int(os.getenv("CODECOV_DAEMON_MAX_SESSIONS", DEFAULT_MAX_SESSIONS))
+        self.session_ttl = session_ttl or float(os.getenv("CODECOV_DAEMON_SESSION_TTL", DEFAULT_SESSION_TTL))
+        # key -> (report fingerprint, session, last used), least recently used first
+        self._sessions: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _session(self, project_dir: str, scope_key: Tuple[Optional[str], Optional[str]]):
+        from src.pipeline_session import PipelineSession
+        xml_path = os.path.join(project_dir, "target", "site", "jacoco", "jacoco.xml")
+        stat = os.stat(xml_path)
+        fingerprint = (stat.st_mtime_ns, stat.st_size)
+        key = (project_dir, *scope_key)
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            current = self._sessions.get(key)
+            if current is not None and current[0] == fingerprint:
+                self._sessions[key] = (fingerprint, current[1], now)
+                self._sessions.move_to_end(key)
+                return current[1]
+            session = PipelineSession(clients=self.clients)
+            previous = current or next(
+                (entry for other, entry in reversed(self._sessions.items()) if other[0] == project_dir), None
+            )
+            if previous is not None:
+                session.inherit(previous[1], self.WARM_STAGES)
+            self._sessions[key] = (fingerprint, session, now)
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+
+    def _evict(self, now: float) -> None:
+        """Drop the sessions idle for longer than session_ttl; the caller holds the lock"""
+        for key in [key for key, entry in self._sessions.items() if now - entry[2] > self.session_ttl]:
+            del self._sessions[key]
+
+    def _state(self, request: Dict) -> Dict:
+        """Graph state for a request: the project, its warm session and the optional diff scope"""
+        project_dir = os.path.abspath(request["project_dir"])
+        diff_scope = None
+        if request.get("base_ref"):
+            from src.tools.diff_scope import compute_diff_scope
+            diff_scope = compute_diff_scope(project_dir, request["base_ref"], request.get("head_ref") or "HEAD")
+        scope_key = (diff_scope.base, diff_scope.head) if diff_scope else (None, None)
+        state = {
+            "project_dir": project_dir,
+            "session": self._session(project_dir, scope_key),
+            "report_path": os.path.join(project_dir, "target", "site", "jacoco", "jacoco.xml")
+        }
+        if diff_scope is not None:
+            state["diff_scope"] = diff_scope
+        return state
+
+    def _tree_sitter_analysis(self, state: Dict, files: Optional[List[str]] = None) -> List[Dict]:
+        from src.master_agent import tree_sitter_coverage_node
+        if files:
+            # Limit the structural analysis to the files the caller asks about
+            uncovered = {
+                path: lines
+                for path, lines in self._uncovered_files(state).items()
+                if any(path.endswith(os.path.normpath(f)) for f in files)
+            }
+            if not uncovered:
+                return []
+            state = {**state, "uncovered_files": uncovered}
+        return tree_sitter_coverage_node(state).get("tree_sitter_analysis", [])
+
+    def _uncovered_files(self, state: Dict) -> Dict[str, List[int]]:
+        from src.master_agent import _uncovered_files_from_report
+        return _uncovered_files_from_report(state["session"], state["project_dir"], state.get("diff_scope"))
+
+    def analyze(self, request: Dict) -> Dict:
+        """Coverage analysis of a project and, unless 'structure' is false, the tree-sitter analysis of its uncovered methods"""
+        from src.master_agent import coverage_analysis_node
+        state = self._state(request)
+        out = coverage_analysis_node(state)
+        response = {"coverage": out["coverage_analysis"], "classes_needing_coverage": out["classes_needing_coverage"]}
+        if request.get("structure", True):
+            response["tree_sitter_analysis"] = [
+                {"file_path": entry["file_path"], **state["session"].artifacts.get(entry["analysis"])}
+                for entry in self._tree_sitter_analysis(state, request.get("files"))
+            ]
+        return response
+
+    def generate(self, request: Dict) -> Dict:
+        """Test recommendations for the requested classes (default: every class needing coverage)"""
+        from src.master_agent import coverage_analysis_node, generate_class_tests_node, _tree_sitter_analysis_for
+        state = self._state(request)
+        classes = coverage_analysis_node(state)["classes_needing_coverage"]
+        wanted = request.get("classes")
+        if wanted:
+            classes = [class_info for class_info in classes
+                       if class_info["class_name"] in wanted or class_info["class_name"].split("/")[-1] in wanted]
+        source_files = [class_info["source_file"] for class_info in classes]
+        tree_sitter_analysis = self._tree_sitter_analysis(state, source_files) if classes else []
+        recommendations = []
+        for class_info in classes:
+            recommendations += generate_class_tests_node({
+                **state,
+                "class_info": class_info,
+                "tree_sitter_analysis": _tree_sitter_analysis_for(class_info, tree_sitter_analysis),
+                "reuse_validated_tests": request.get("reuse_validated_tests", True)
+            })["test_recommendations"]
+        store = state["session"].artifacts
+        return {"test_recommendations": [
+            {key: store.load(value) for key, value in recommendation.items()} for recommendation in recommendations
+        ]}
+
+    def invalidate(self, request: Dict) -> Dict:
+        """Forget the sessions of one project (or all), e.g. after its sources were rebuilt"""
+        project_dir = request.get("project_dir")
+        with self._lock:
+            dropped = [key for key in self._sessions
+                       if project_dir is None or key[0] == os.path.abspath(project_dir)]
+            for key in dropped:
+                del self._sessions[key]
+        return {"invalidated": len(dropped)}
+
+    def health(self) -> Dict:
+        with self._lock:
+            projects = sorted({key[0] for key in self._sessions})
+        return {"status": "ok", "uptime": round(time.time() - self.started, 1), "projects": projects}
+
+def _jsonable(value: Any) -> Any:
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    return str(value)
+
+def _is_local(host: Optional[str]) -> bool:
+    """Whether a Host header value or Origin netloc names this machine's loopback"""
+    return bool(host) and urlsplit(f"//{host}").hostname in _LOCAL_HOSTS
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "codecov-daemon"
+
+    def _rejected(self, post: bool) -> bool:
+        """
+        Reply 403 to requests addressed to a non-local Host or sent from a non-local
+        Origin, and 415 to POST bodies that are not JSON, so a web page cannot drive
+        the daemon with a simple cross-origin form post. Returns whether it replied.
+        """
+        origin = self.headers.get("Origin")
+        if not _is_local(self.headers.get("Host")) or (origin is not None and not _is_local(urlsplit(origin).netloc)):
+            self._reply(403, {"error": "Only local requests are accepted"})
+            return True
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if post and content_type != "application/json":
+            self._reply(415, {"error": "Content-Type must be application/json"})
+            return True
+        return False
+
+    def _reply(self, status: int, body: Dict) -> None:
+        from src.code_coverage_analyzer_agent import ranges_to_json
+        data = json.dumps(ranges_to_json(body), default=_jsonable).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self._rejected(post=False):
+            return
+        if self.path == "/health":
+            self._reply(200, self.server.daemon.health())
+        else:
+            self._reply(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self) -> None:
+        daemon = self.server.daemon
+        handlers = {"/analyze": daemon.analyze, "/generate": daemon.generate, "/invalidate": daemon.invalidate}
+        started = time.perf_counter()
+        # Read the body before any reply, or the client may see the connection closed mid-request
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self._rejected(post=True):
+            return
+        if self.path == "/shutdown":
+            self._reply(200, {"status": "shutting down"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if self.path not in handlers:
+            self._reply(404, {"error": f"Unknown endpoint {self.path}"})
+            return
+        try:
+            request = json.loads(body or b"{}")
+            if self.path != "/invalidate" and not request.get("project_dir"):
+                raise ValueError("'project_dir' is required")
+            response = handlers[self.path](request)
+        except FileNotFoundError as e:
+            self._reply(404, {"error": f"No JaCoCo report found: {e}"})
+        except (ValueError, KeyError) as e:
+            self._reply(400, {"error": str(e)})
+        except Exception as e:
+            logging.exception(f"{self.path} failed")
+            self._reply(500, {"error": str(e)})
+        else:
+            response["seconds"] = round(time.perf_counter() - started, 4)
+            self._reply(200, response)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        logging.info(f"{self.address_string()} {format % args}")
+
+class _UnixHTTPServer(ThreadingMixIn, HTTPServer):
+    address_family = socket.AF_UNIX
+    daemon_threads = True
+
+    def server_bind(self) -> None:
+        # HTTPServer.server_bind expects a (host, port) address
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        self.socket.bind(self.server_address)
+        self.server_name, self.server_port = "localhost", 0
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: Optional[str] = None) -> None:
+    """Run the daemon until it is interrupted or receives /shutdown"""
+    if socket_path:
+        server = _UnixHTTPServer(socket_path, _Handler)
+        address = socket_path
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        address = f"http://{host}:{server.server_port}"
+    server.daemon = AnalysisDaemon()
+    logging.info(f"Analysis daemon listening on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def request(endpoint: str, payload: Optional[Dict] = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+            socket_path: Optional[str] = None, timeout: float = 600) -> Tuple[int, Dict]:
+    """Send one request to a running daemon and return (status, response)"""
+    if socket_path:
+        connection = _UnixHTTPConnection(socket_path, timeout)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        if payload is None:
+            connection.request("GET", endpoint)
+        else:
+            connection.request("POST", endpoint, body=json.dumps(payload),
+                               headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    finally:
+        connection.close()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Keep the coverage analysis warm in a local daemon.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=int(os.getenv("CODECOV_DAEMON_PORT", DEFAULT_PORT)))
+    parser.add_argument("--socket", default=os.getenv("CODECOV_DAEMON_SOCKET"), help="serve on a Unix socket instead")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("serve", help="run the daemon")
+    analyze = commands.add_parser("analyze", help="coverage and structural analysis of a project")
+    analyze.add_argument("--file", action="append", dest="files", help="limit structural analysis to this file")
+    analyze.add_argument("--no-structure", action="store_true", help="skip the tree-sitter analysis")
+    generate = commands.add_parser("generate", help="test recommendations for a project")
+    generate.add_argument("--class", action="append", dest="classes", help="only this class (repeatable)")
+    for command in (analyze, generate):
+        command.add_argument("project_dir")
+        command.add_argument("--base", help="diff mode: only lines changed since this ref")
+        command.add_argument("--head", default="HEAD")
+    commands.add_parser("health", help="check that the daemon runs")
+    commands.add_parser("shutdown", help="stop the daemon")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        serve(args.host, args.port, args.socket)
+        return 0
+
+    payload: Optional[Dict] = None
+    if args.command in ("analyze", "generate"):
+        payload = {"project_dir": os.path.abspath(args.project_dir)}
+        if args.base:
+            payload.update({"base_ref": args.base, "head_ref": args.head})
+        if args.command == "analyze":
+            payload.update({"files": args.files, "structure": not args.no_structure})
+        elif args.classes:
+            payload["classes"] = args.classes
+    elif args.command == "shutdown":
+        payload = {}
+    endpoint = "/health" if args.command == "health" else f"/{args.command}"
+    try:
+        status, response = request(endpoint, payload, args.host, args.port, args.socket)
+    except OSError as e:
+        print(f"Analysis daemon not reachable: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(response, indent=2))
+    return 0 if status == 200 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,30 @@
 import os
-import re
 import sys
+import asyncio
 from dotenv import load_dotenv
-from langgraph.graph import StateGraph, END
 import logging
-import subprocess
+import threading
 import time
-import shutil
 
-# ensure src directory is on path
+# ensure the repository root is on path
 project_root = os.path.dirname(os.path.dirname(__file__))
 sys.path.insert(0, project_root)
 
-# ensure current directory is on path
-current_dir = os.path.dirname(__file__)
-sys.path.insert(0, current_dir)
-
 from src.tools.git_tool import clone_repo
 from src.tools.jacoco_tool import run_jacoco
-from src.code_coverage_analyzer_agent import CoverageAnalysisAgent
-from src.test_orchestrator_agent import TestOrchestratorAgent
+from src.tools.maven_tool import find_module_dir, run_tests
+from src.tools.build_runner import BuildRunner
+from src.tools.parallel_validator import ParallelTestValidator
+from src.tools.surefire_parser import parse_surefire_reports
+from src.tools.coverage_gain import measure_coverage_gain
+from src.tools.diff_scope import compute_diff_scope
+from src.tools.checkpoint_store import CheckpointStore, run_key
+from src.tools.artifact_store import ArtifactRef
+from src.tools.validated_test_cache import method_body_hash
+from src.tools.metrics import count, metric_labels, observe, use_metrics
+from src.tools.test_validation import correct_test_code, write_test_file
+from src.pipeline_session import PipelineSession
+from src.pipeline_state import ClassGenerationTask, PipelineState
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -27,276 +32,617 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 # load .env from project root
 load_dotenv(os.path.join(os.path.dirname(__file__), "..", ".env"))
 
+# State keys forwarded to clone_repo as clone options
+CLONE_OPTIONS = {"ref": "ref", "clone_depth": "depth", "clone_filter": "filter",
+                 "single_branch": "single_branch", "reuse_clone": "reuse", "target_dir": "target_dir"}
+
+def _session(state: dict) -> PipelineSession:
+    """The run's shared session; nodes invoked on their own get a private one"""
+    return state.get("session") or PipelineSession()
+
+def _load(state: dict, value):
+    """Read an ArtifactRef from the run's artifact store; other values are returned as they are"""
+    if isinstance(value, ArtifactRef):
+        return _session(state).artifacts.get(value)
+    return value
+
+def start_session_node(state: dict) -> dict:
+    """Entry node: creates the PipelineSession every later node shares, unless the caller passed one."""
+    return {"session": _session(state)}
+
+def instrumented(name: str, node):
+    """Wrap a node so its wall time, and the LLM and Maven calls it makes, are recorded in the session's metrics."""
+    def run(state: dict) -> dict:
+        session = state.get("session")
+        if session is None:
+            return node(state)
+        class_name = state["class_info"]["class_name"] if "class_info" in state else None
+        with use_metrics(session.metrics), metric_labels(node=name, class_name=class_name), observe("node", name):
+            return node(state)
+    run.__name__ = getattr(node, "__name__", name)
+    return run
+
+_checkpoint_stores = {}
+_checkpoint_stores_lock = threading.Lock()
+
+def _checkpoint_store(state: dict):
+    """The CheckpointStore selected by state['checkpoint'] (a database path, or True for the default), or None"""
+    target = state.get("checkpoint")
+    if not target:
+        return None
+    db_path = target if isinstance(target, str) else None
+    with _checkpoint_stores_lock:
+        if db_path not in _checkpoint_stores:
+            _checkpoint_stores[db_path] = CheckpointStore(db_path)
+        return _checkpoint_stores[db_path]
+
+def checkpointed(name: str, node, task_key=None, is_valid=None, fingerprint=None, starts_run: bool = False):
+    """
+    Wrap a node so its output is saved to the checkpoint store once it completes.
+
+    With state['resume'] set, a saved output is replayed instead of running the node
+    again, provided is_valid(output, state) accepts it and fingerprint(state) of the
+    current inputs matches the one saved with it. task_key(state) distinguishes the
+    runs of a fan-out node. The starts_run node clears old checkpoints when not resuming.
+    A stale checkpoint turns 'resume' off for the nodes after it, except in fan-out
+    runs: they have no checkpointed successors, and parallel runs may not all write
+    the same key in one step.
+    """
+    def run(state: dict) -> dict:
+        store = _checkpoint_store(state)
+        if store is None:
+            return node(state)
+        key = state.get("run_key") or run_key(state)
+        commit = "" if starts_run else state.get("commit", "")
+        task = task_key(state) if task_key else ""
+        stale = False
+        if state.get("resume"):
+            saved = store.load(key, commit, name, task)
+            if saved is not None:
+                output, saved_fingerprint = saved
+                valid = is_valid is None or is_valid(output, state)
+                if valid and (fingerprint is None or fingerprint(state) == saved_fingerprint):
+                    logging.info(f"Resuming: reusing checkpointed output of {name}{f' [{task}]' if task else ''}")
+                    count("cache_hit", f"checkpoint:{name}")
+                    return {**output, "run_key": key} if starts_run else output
+                logging.info(f"Resuming: checkpoint of {name} is stale, running it again")
+                stale = True
+        elif starts_run:
+            store.clear(key)
+        output = node(state)
+        store.save(key, commit, name, output, task=task, fingerprint=fingerprint(state) if fingerprint else None)
+        if starts_run:
+            output = {**output, "run_key": key}
+        if stale and not starts_run and task_key is None:
+            # Later checkpoints were built from the stale output, so recompute them too
+            output = {**output, "resume": False}
+        return output
+    run.__name__ = getattr(node, "__name__", name)
+    return run
+
+def _clone_is_current(output: dict, state: dict) -> bool:
+    """A checkpointed clone is reusable while its directory is still checked out at the same commit"""
+    import git
+    try:
+        return git.Repo(output["project_dir"]).head.commit.hexsha == output["commit"]
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError, ValueError, KeyError):
+        return False
+
+def _coverage_fingerprint(state: dict) -> str:
+    return _session(state).source_fingerprint(state["project_dir"])
+
+def _analysis_fingerprint(state: dict) -> str:
+    """The sources an analysis or generation read, plus the diff range it was limited to"""
+    diff_scope = state.get("diff_scope")
+    diff_range = f"{diff_scope.base}..{diff_scope.head}" if diff_scope is not None else ""
+    return f"{_coverage_fingerprint(state)}:{diff_range}"
+
+def _generation_fingerprint(state: dict) -> str:
+    """What a class's generation depends on: the analysis inputs and whether validated tests are reused"""
+    return f"{_analysis_fingerprint(state)}:reuse={state.get('reuse_validated_tests', True)}"
+
+def _diff_refs_fingerprint(state: dict) -> str:
+    """The commits base_ref and head_ref point at; a branch that moved makes a saved diff stale"""
+    import git
+    if not state.get("base_ref"):
+        return ""
+    repo = git.Repo(state["project_dir"])
+    commits = []
+    for ref in (state["base_ref"], state.get("head_ref") or "HEAD"):
+        try:
+            commits.append(repo.commit(ref).hexsha)
+        except (git.BadName, ValueError):
+            commits.append(f"unresolved:{ref}")
+    return "..".join(commits)
+
+def _report_exists(output: dict, state: dict) -> bool:
+    return bool(output.get("report_path")) and os.path.exists(output["report_path"])
+
+def _artifacts_exist(output: dict, state: dict) -> bool:
+    """A checkpointed output is only reusable while the artifacts it refers to are still on disk"""
+    store = _session(state).artifacts
+    def refs(value):
+        if isinstance(value, ArtifactRef):
+            yield value
+        elif isinstance(value, dict):
+            for item in value.values():
+                yield from refs(item)
+        elif isinstance(value, list):
+            for item in value:
+                yield from refs(item)
+    return all(store.exists(ref) for ref in refs(output))
+
 def git_clone_node(state: dict) -> dict:
     """
-    Expects state['repo_url'], clones it, then returns
-    an updated state with 'project_dir' added.
+    Expects state['repo_url'], clones it (or updates a previous clone), then returns
+    an updated state with 'project_dir', 'commit' and 'clone_timing' added.
+    Optional clone settings: 'ref', 'clone_depth', 'clone_filter', 'single_branch',
+    'reuse_clone' and 'target_dir' (defaults to ./cloned_repo).
     """
-    logging.info(f"git_clone_node invoked with state: {state}")
-    out = clone_repo({"repo_url": state["repo_url"]})
-    logging.info(f"git_clone_node output: {out}")
-    return {**state, **out}
+    logging.info(f"git_clone_node: cloning {state['repo_url']}")
+    options = {option: state[key] for key, option in CLONE_OPTIONS.items() if key in state}
+    out = clone_repo({"repo_url": state["repo_url"], **options})
+    logging.info(f"git_clone_node: {out['project_dir']} at {out['commit'][:10]}")
+    return out
+
+def diff_scope_node(state: dict) -> dict:
+    """
+    Expects state['project_dir'] and, for diff mode, state['base_ref'] (and optionally
+    state['head_ref'], default HEAD); computes the Java lines changed between them
+    and returns updated state with 'diff_scope'. Without a base ref the run covers
+    the whole repository and nothing is added.
+    """
+    base_ref = state.get("base_ref")
+    if not base_ref:
+        return {}
+    scope = compute_diff_scope(state["project_dir"], base_ref, state.get("head_ref") or "HEAD")
+    logging.info(f"diff_scope_node: {len(scope.changed_lines)} changed Java file(s) between {scope.base[:10]} and {scope.head[:10]}")
+    return {"diff_scope": scope}
 
 def coverage_node(state: dict) -> dict:
     """
-    Expects state['project_dir'], runs JaCoCo,
-    then returns updated state with 'report_path'.
+    Expects state['project_dir'], runs JaCoCo (incrementally when
+    state['incremental'] is set), then returns updated state with 'report_path'.
     """
-    logging.info(f"coverage_node invoked with state: {state}")
-    out = run_jacoco(state["project_dir"])
-    logging.info(f"coverage_node output: {out}")
-    return {**state, "report_path": out}
+    logging.info(f"coverage_node: running JaCoCo in {state['project_dir']}")
+    runner = BuildRunner.detect(state["project_dir"], offline=state.get("offline"))
+    out = run_jacoco(state["project_dir"], runner=runner, incremental=state.get("incremental", False))
+    logging.info(f"coverage_node: report at {out}")
+    return {"report_path": out}
 
 def tree_sitter_coverage_node(state: dict) -> dict:
     """
-    Expects state['project_dir'], analyzes coverage using TreeSitterCoverageAgent,
-    then returns updated state with analysis results.
+    Expects state['project_dir'] and either state['uncovered_files'] (a mapping of
+    Java file path to uncovered line numbers) or state['file_path'] with
+    state['uncovered_lines']; without either, the uncovered lines are read from the
+    JaCoCo report so this node can run alongside coverage_analysis. Analyzes the
+    files concurrently with TreeSitterCoverageAgent, then returns 'tree_sitter_analysis':
+    per file its path, method count and an ArtifactRef to the full analysis.
     """
-    logging.info(f"tree_sitter_coverage_node invoked with state: {state}")
-    from src.tree_sitter_coverage_agent import TreeSitterCoverageAgent
-    agent = TreeSitterCoverageAgent(state["project_dir"])
-    # For demonstration, let's assume we analyze uncovered lines from coverage report
-    uncovered_lines = state.get("uncovered_lines", [])
-    # For simplicity, analyze a single file or all files as needed
-    # Here, just a placeholder for file_path
+    session = _session(state)
+    agent = session.tree_sitter_agent(state["project_dir"])
+    files = dict(state.get("uncovered_files") or {})
     file_path = state.get("file_path")
-    if not file_path:
-        logging.warning("No file_path provided in state for tree_sitter_coverage_node")
-        return state
-    analysis_result = agent.analyze_file(file_path, uncovered_lines)
-    logging.info(f"tree_sitter_coverage_node output: {analysis_result}")
-    return {**state, "tree_sitter_analysis": analysis_result}
+    if file_path:
+        files[file_path] = state.get("uncovered_lines", [])
+    if not files and state.get("report_path"):
+        files = _uncovered_files_from_report(session, state["project_dir"], state.get("diff_scope"))
+    diff_scope = state.get("diff_scope")
+    if diff_scope is not None:
+        files = {
+            path: changed
+            for path, lines in files.items()
+            if (changed := diff_scope.filter_lines(os.path.relpath(path, state["project_dir"]), lines))
+        }
+    if not files:
+        logging.warning("No files provided in state for tree_sitter_coverage_node")
+        return {}
+    analysis_results = asyncio.run(_collect_tree_sitter_analysis(agent, files))
+    logging.info(f"tree_sitter_coverage_node analyzed {len(analysis_results)} file(s)")
+    return {"tree_sitter_analysis": [_store_file_analysis(session, result) for result in analysis_results]}
+
+def _store_file_analysis(session: PipelineSession, result: dict) -> dict:
+    """Keep a file's path and method count in the state and its MethodAnalysis objects in the artifact store"""
+    entry = {"file_path": result["file_path"], "method_count": len(result["methods"]),
+             "analysis": session.artifacts.put(result)}
+    if result.get("error"):
+        entry["error"] = result["error"]
+    return entry
+
+def _uncovered_files_from_report(session: PipelineSession, project_dir: str, diff_scope=None) -> dict:
+    """Map each main source file to its lines with missed instructions or branches in jacoco.xml"""
+    xml_path = os.path.join(project_dir, "target", "site", "jacoco", "jacoco.xml")
+    if not os.path.exists(xml_path):
+        return {}
+    files = {}
+    for source_path, lines in session.line_coverage(project_dir, diff_scope).items():
+        path = os.path.join(project_dir, "src", "main", "java", *source_path.strip("/").split("/"))
+        uncovered = [number for number, line in lines.items() if line.instructions_missed or line.branches_missed]
+        if uncovered and os.path.exists(path):
+            files[path] = sorted(uncovered)
+    return files
+
+async def _collect_tree_sitter_analysis(agent, files: dict) -> list:
+    return [result async for result in agent.analyze_files(files)]
 
 def test_orchestrator_node(state: dict) -> dict:
     """
     Expects state['project_dir'], runs TestOrchestratorAgent to get test recommendations,
-    then returns updated state with test suggestions.
+    then returns updated state with test suggestions. Not part of the graph, where
+    the generate_class_tests fan-out does this per class; kept for callers that
+    want every recommendation from one call.
     """
-    logging.info(f"test_orchestrator_node invoked with state: {state}")
-    from src.test_orchestrator_agent import TestOrchestratorAgent
-    orchestrator = TestOrchestratorAgent(state["project_dir"])
-    recommendations = orchestrator.get_test_recommendations()
-    logging.info(f"test_orchestrator_node output: {recommendations}")
-    return {**state, **recommendations}
+    recommendations = _session(state).test_recommendations(state["project_dir"], state.get("diff_scope"))
+    logging.info(f"test_orchestrator_node: {len(recommendations['test_recommendations'])} recommendation(s)")
+    return recommendations
 
 def write_test_to_file_node(state: dict) -> dict:
     """Node to write test code to file."""
-    test_code = state.get("test_code")
+    test_code = _load(state, state.get("test_code"))
     class_name = state.get("class_name")
     test_dir = state.get("test_dir")
     if not (test_code and class_name and test_dir):
         logging.warning("Missing parameters for write_test_to_file_node")
-        return state
-    cleanedCode = re.sub(r"```[a-zA-Z]*\n?", "", test_code)
-    cleanedCode = cleanedCode.replace("```", "")
+        return {}
     file_path = os.path.join(test_dir, f"{class_name}Test.java")
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(cleanedCode)
+    write_test_file(file_path, test_code)
     logging.info(f"write_test_to_file_node wrote file: {file_path}")
-    return {**state, "file_path": file_path}
+    return {"file_path": file_path}
 
 def run_maven_tests_node(state: dict) -> dict:
-    """Node to run maven tests."""
+    """
+    Node to run maven tests. When state['test_class'] is set only that class runs
+    (optionally only state['test_methods']); otherwise the full suite runs.
+    """
     project_dir = state.get("project_dir")
     if not project_dir:
         logging.warning("Missing project_dir for run_maven_tests_node")
-        return state
-    mvn_path = shutil.which("mvn")
-    if not mvn_path:
-        mvn_path = r"C:\Program Files\Maven\apache-maven-3.8.8-bin\bin\mvn"
-    result = subprocess.run(
-        f'"{mvn_path}" test -B',
-        cwd=project_dir,
-        capture_output=True,
-        text=True,
-        shell=True
+        return {}
+    test_class = state.get("test_class")
+    file_path = state.get("file_path")
+    # Report timestamps can be truncated to whole seconds on some filesystems
+    started = time.time() - 1
+    result = run_tests(
+        project_dir,
+        test_classes=[test_class] if test_class else None,
+        test_methods=state.get("test_methods"),
+        module_dir=find_module_dir(project_dir, file_path) if test_class and file_path else None,
+        runner=BuildRunner.detect(project_dir, offline=state.get("offline"))
     )
     output = result.stdout + "\n" + result.stderr
     logging.info(f"run_maven_tests_node output length: {len(output)}")
-    return {**state, "mvn_output": output}
+    return {"mvn_output": _session(state).artifacts.put(output), "test_run_started": started}
 
 def parse_test_failures_node(state: dict) -> dict:
-    """Node to parse test failures from maven output."""
-    mvn_output = state.get("mvn_output")
-    if not mvn_output:
-        logging.warning("Missing mvn_output for parse_test_failures_node")
-        return state
-    failures = []
-    lines = mvn_output.splitlines()
-    capture = False
-    test_name = None
-    error_message = []
-    for line in lines:
-        if '<<< FAILURE!' in line or '<<< ERROR!' in line:
-            capture = True
-            test_name = line.split()[0]
-            error_message = [line]
-            logging.info(f"Capturing failure for test: {test_name}")
-        elif capture:
-            if line.strip() == '' or line.startswith('Results :'):
-                failures.append((test_name, '\n'.join(error_message)))
-                capture = False
-                test_name = None
-                error_message = []
-            else:
-                error_message.append(line)
-    if capture and test_name:
-        failures.append((test_name, '\n'.join(error_message)))
-        logging.info(f"Captured final failure for test: {test_name}")
-    return {**state, "failures": failures}
+    """
+    Node to parse test failures from the Surefire XML reports written by the last
+    test run (reports older than state['test_run_started'] are ignored).
+    """
+    project_dir = state.get("project_dir")
+    if not project_dir:
+        logging.warning("Missing project_dir for parse_test_failures_node")
+        return {}
+    failures = parse_surefire_reports(project_dir, since=state.get("test_run_started"))
+    for failure in failures:
+        logging.info(f"Captured failure for test: {failure.test_name}")
+    return {"failures": failures}
 
 def correct_test_with_llm_node(state: dict) -> dict:
     """Node to correct test code using LLM."""
     llm = state.get("llm")
-    test_code = state.get("test_code")
+    test_code = _load(state, state.get("test_code"))
     error_message = state.get("error_message")
     if not (llm and test_code and error_message):
         logging.warning("Missing parameters for correct_test_with_llm_node")
-        return state
-    prompt = f"""
-The following generated JUnit test failed with this error:
-{error_message}
-
-Here is the test code:
-{test_code}
-
-Please correct the test code so that it passes, and output only the corrected Java code (no explanations).
-"""
-    response = llm.invoke([{"role": "user", "content": prompt}])
+        return {}
+    corrected_test_code = correct_test_code(llm, test_code, error_message)
     logging.info(f"LLM response for correction received")
-    return {**state, "corrected_test_code": response.content}
+    return {"corrected_test_code": _session(state).artifacts.put(corrected_test_code)}
 
 def validate_and_fix_tests_node(state: dict) -> dict:
-    """Node to validate and fix tests with retries."""
-    recommendations = state.get("recommendations")
-    test_dir = state.get("test_dir")
+    """
+    Node to validate and fix tests with retries. Classes are validated in parallel,
+    each worker in its own copy of the checkout; state['validation_workers'] caps
+    the pool (defaults to what CPU and memory allow) and passing tests are merged
+    back into project_dir. Recommendations marked 'validated' (reused from the
+    validated-test cache) are still compiled and run, since code outside the
+    method bodies may have changed, but the LLM is only asked when they fail; the
+    cache entries of a reused test that fails are dropped. Tests that pass are
+    added to the cache.
+
+    In the graph it validates the generated 'test_recommendations' into
+    project_dir/src/test/java unless 'recommendations' and 'test_dir' are given;
+    state['validate_tests'] = False skips it.
+    """
+    if not state.get("validate_tests", True):
+        logging.info("validate_and_fix_tests_node: validation disabled")
+        return {}
+    recommendations = state.get("recommendations") or state.get("test_recommendations")
     project_dir = state.get("project_dir")
+    test_dir = state.get("test_dir") or (project_dir and os.path.join(project_dir, "src", "test", "java"))
     llm = state.get("llm")
+    if llm is None and project_dir and state.get("session"):
+        llm = state["session"].llm(project_dir, state.get("diff_scope"))
     max_retries = state.get("max_retries", 10)
     if not (recommendations and test_dir and project_dir and llm):
         logging.warning("Missing parameters for validate_and_fix_tests_node")
-        return state
-    for rec in recommendations:
-        class_name = rec.get('class_name')
-        test_code = rec.get('test_code')
-        if not class_name or not test_code:
+        return {}
+    validator = ParallelTestValidator(
+        project_dir,
+        llm,
+        workers=state.get("validation_workers"),
+        max_retries=max_retries,
+        runner=BuildRunner.detect(project_dir, offline=state.get("offline")),
+        precompile=state.get("precompile", True)
+    )
+    session = _session(state)
+    store = session.artifacts
+    reused = {rec["class_name"] for rec in recommendations if rec.get("validated") and rec.get("class_name")}
+    results = validator.validate(
+        [{**rec, "test_code": store.load(rec.get("test_code"))} for rec in recommendations],
+        test_dir
+    )
+
+    cache = session.validated_tests()
+    for result in results:
+        methods = {rec["body_hash"]: rec["method_name"] for rec in recommendations
+                   if rec.get("class_name") == result["class_name"] and rec.get("body_hash")}
+        result["body_hashes"] = list(methods)
+        if result["class_name"] in reused:
+            # A reused test passed as it was only if its first run passed
+            result["reused"] = result["passed"] and result["attempts"] == 1
+            if not result["reused"]:
+                logging.info(f"validate_and_fix_tests_node: the reused test of {result['class_name']} no longer passes")
+                cache.discard(methods)
+        if result["passed"] and not result.get("reused") and methods:
+            cache.store(result["class_name"], methods, result["test_code"])
+    passed = sum(1 for result in results if result["passed"])
+    unchanged = sum(1 for result in results if result.get("reused"))
+    logging.info(f"validate_and_fix_tests_node: {passed}/{len(results)} test class(es) passed, {unchanged} reused unchanged")
+    return {"validation_results": [{**result, "test_code": store.put(result["test_code"])} for result in results]}
+
+def _after_validation(state: dict) -> str:
+    from langgraph.graph import END
+    passed = any(result["passed"] for result in state.get("validation_results") or [])
+    return "coverage_gain" if passed else END
+
+def coverage_gain_node(state: dict) -> dict:
+    """
+    Expects state['project_dir'] and state['validation_results'], measures the
+    coverage each passing generated test adds over the baseline JaCoCo report,
+    then returns updated state with 'coverage_gains'. Tests that add nothing are
+    flagged as rejected and, when state['reject_useless_tests'] is set, deleted.
+    """
+    project_dir = state.get("project_dir")
+    results = state.get("validation_results")
+    if not (project_dir and results):
+        logging.warning("Missing parameters for coverage_gain_node")
+        return {}
+    runner = BuildRunner.detect(project_dir, offline=state.get("offline"))
+    coverage_gains = []
+    for result in results:
+        if not result["passed"]:
             continue
-        # Write initial test code
-        cleanedCode = re.sub(r"```[a-zA-Z]*\n?", "", test_code)
-        cleanedCode = cleanedCode.replace("```", "")
-        file_path = os.path.join(test_dir, f"{class_name}Test.java")
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(cleanedCode)
-        for attempt in range(max_retries):
-            result = subprocess.run(
-                f'"{shutil.which("mvn") or r"C:\\Program Files\\Maven\\apache-maven-3.8.8-bin\\bin\\mvn"}" test -B',
-                cwd=project_dir,
-                capture_output=True,
-                text=True,
-                shell=True
+        gain = measure_coverage_gain(
+            project_dir,
+            [f"{result['class_name']}Test"],
+            runner=runner,
+            module_dir=find_module_dir(project_dir, result["file_path"])
+        )[0]
+        rejected = gain.error is None and not gain.has_gain
+        if rejected and state.get("reject_useless_tests") and os.path.exists(result["file_path"]):
+            os.remove(result["file_path"])
+            logging.info(f"Removed {result['file_path']}: it adds no coverage")
+        if result.get("body_hashes") and gain.error is None:
+            _session(state).validated_tests().record_coverage(
+                result["body_hashes"], {"added_lines": gain.total_added_lines, "added_branches": gain.added_branches}
             )
-            mvn_output = result.stdout + "\n" + result.stderr
-            failures = []
-            lines = mvn_output.splitlines()
-            capture = False
-            test_name = None
-            error_message = []
-            for line in lines:
-                if '<<< FAILURE!' in line or '<<< ERROR!' in line:
-                    capture = True
-                    test_name = line.split()[0]
-                    error_message = [line]
-                elif capture:
-                    if line.strip() == '' or line.startswith('Results :'):
-                        failures.append((test_name, '\n'.join(error_message)))
-                        capture = False
-                        test_name = None
-                        error_message = []
-                    else:
-                        error_message.append(line)
-            if capture and test_name:
-                failures.append((test_name, '\n'.join(error_message)))
-            failed = False
-            for test_name, error_message in failures:
-                if class_name in test_name:
-                    logging.info(f"Test {test_name} failed. Attempting to auto-correct...")
-                    prompt = f"""
-The following generated JUnit test failed with this error:
-{error_message}
-
-Here is the test code:
-{test_code}
-
-Please correct the test code so that it passes, and output only the corrected Java code (no explanations).
-"""
-                    response = llm.invoke([{"role": "user", "content": prompt}])
-                    test_code = response.content
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(test_code)
-                    failed = True
-                    time.sleep(2)
-                    break
-            if not failed:
-                logging.info(f"Test for {class_name} passed after {attempt+1} attempt(s).")
-                break
-        else:
-            logging.warning(f"Test for {class_name} could not be auto-corrected after {max_retries} attempts.")
-    return state
+        coverage_gains.append({
+            "class_name": result["class_name"],
+            "test_class": gain.test_class,
+            "added_lines": gain.added_lines,
+            "added_line_count": gain.total_added_lines,
+            "added_branches": gain.added_branches,
+            "rejected": rejected,
+            "error": gain.error
+        })
+    logging.info(f"coverage_gain_node measured {len(coverage_gains)} test class(es)")
+    return {"coverage_gains": coverage_gains}
 
-if __name__ == "__main__":
-    # 1) Build a StateGraph whose state is a simple dict
-    builder = StateGraph(dict)
+def coverage_analysis_node(state: dict) -> dict:
+    """
+    Expects state['project_dir'], analyzes the JaCoCo XML report, then returns the
+    overall 'coverage_analysis' and the 'classes_needing_coverage' that test
+    generation fans out over.
+    """
+    session = _session(state)
+    agent = session.coverage_agent(state["project_dir"], state.get("diff_scope"))
+    analysis = session.coverage_analysis(state["project_dir"], state.get("diff_scope"))
+    out = {
+        "coverage_analysis": agent.overall_coverage(analysis["summary"]),
+        "classes_needing_coverage": analysis["classes_needing_coverage"]
+    }
+    logging.info(f"coverage_analysis_node: {len(out['classes_needing_coverage'])} class(es) need coverage")
+    return out
 
-    # 2) Register our nodes
-    builder.add_node("git_clone", git_clone_node)
-    builder.add_node("code_cov", coverage_node)
-    from src.code_coverage_analyzer_agent import CoverageAnalysisAgent
-
-    def coverage_analysis_node(state: dict) -> dict:
-        """
-        Expects state['project_dir'], analyzes JaCoCo coverage report using multiple agents,
-        then returns updated state with enhanced analysis and test suggestions.
-        """
-        logging.info(f"coverage_analysis_node invoked with state: {state}")
-        
-        # Initialize the orchestrator that manages all agents
-        orchestrator = TestOrchestratorAgent(state["project_dir"])
-        
-        # Get enhanced test recommendations using all agents
-        recommendations = orchestrator.get_test_recommendations()
-        
-        out = {
-            "coverage_analysis": recommendations["overall_coverage"],
-            "test_recommendations": recommendations["test_recommendations"],
-            "report_path": state.get("report_path", "")
-        }
-        logging.info(f"coverage_analysis_node output: {out}")
-        return {**state, **out}
+def plan_generation_node(state: dict) -> dict:
+    """Join point of the parallel analysis branches; generation is dispatched from here."""
+    analyzed = len(state.get("tree_sitter_analysis") or [])
+    logging.info(f"plan_generation_node: {len(state.get('classes_needing_coverage', []))} class(es) to generate, "
+                 f"{analyzed} file(s) with structural analysis")
+    return {}
+
+def dispatch_class_generation(state: dict):
+    """Send one generate_class_tests task per class that needs coverage"""
+    from langgraph.graph import END
+    from langgraph.types import Send
+
+    classes = state.get("classes_needing_coverage") or []
+    if not classes:
+        return END
+    tree_sitter_analysis = state.get("tree_sitter_analysis") or []
+    return [
+        Send("generate_class_tests", {
+            "class_info": class_info,
+            "tree_sitter_analysis": _tree_sitter_analysis_for(class_info, tree_sitter_analysis),
+            **{key: state[key] for key in ("session", "repo_url", "project_dir", "diff_scope", "checkpoint", "resume", "run_key",
+                                           "commit", "reuse_validated_tests")
+               if key in state}
+        })
+        for class_info in classes
+    ]
+
+def _tree_sitter_analysis_for(class_info: dict, tree_sitter_analysis: list) -> list:
+    """References to the tree-sitter analysis of the source file a JaCoCo class comes from"""
+    package = class_info["class_name"].rsplit("/", 1)[0] if "/" in class_info["class_name"] else ""
+    source_path = f"{package}/{class_info['source_file']}" if package else class_info["source_file"]
+    return [
+        result["analysis"]
+        for result in tree_sitter_analysis
+        if result["file_path"].replace("\\", "/").endswith("/" + source_path) and result.get("analysis")
+    ]
+
+def _matching_method(methods: list, method_name: str, line: int):
+    """The tree-sitter method a JaCoCo method (name and first line) belongs to"""
+    return next(
+        (method for method in methods if method.name == method_name and method.start_line <= line <= method.end_line),
+        None
+    )
 
-    builder.add_node("coverage_analysis", coverage_analysis_node)
-    # builder.add_node("tree_sitter_coverage", tree_sitter_coverage_node)
-    builder.add_node("test_orchestrator", test_orchestrator_node)
+def _project_key(state: dict) -> str:
+    """Identity of the project validated tests belong to: its repository, or its directory when run on a checkout"""
+    from src.tools.mirror_cache import normalize_repo_url
+    if state.get("repo_url"):
+        return normalize_repo_url(state["repo_url"])
+    return os.path.abspath(state["project_dir"])
+
+def _method_body_hashes(project: str, class_info: dict, analyses: list) -> dict:
+    """
+    method_body_hash of every method of class_info that needs coverage, keyed by
+    (method_name, line); empty when any of them has no tree-sitter span.
+    """
+    hashes = {}
+    sources = {}
+    for method in class_info["methods_needing_coverage"]:
+        if method["method_name"] == "<init>":
+            continue
+        match = next(
+            ((analysis["file_path"], found) for analysis in analyses
+             if (found := _matching_method(analysis["methods"], method["method_name"], method["line"]))),
+            None
+        )
+        if match is None:
+            return {}
+        file_path, found = match
+        if file_path not in sources:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                sources[file_path] = f.read()
+        hashes[(method["method_name"], method["line"])] = method_body_hash(
+            project, class_info["class_name"], sources[file_path], found.start_line, found.end_line
+        )
+    return hashes
+
+def generate_class_tests_node(task: ClassGenerationTask) -> dict:
+    """
+    Generates the tests for one class. Runs once per class in parallel; each run
+    appends to 'test_recommendations' and attaches the tree-sitter analysis of the
+    method it targets when available. When none of the class's methods needing
+    coverage changed since their test last passed validation, that test is reused
+    and marked 'validated' instead of asking the LLM (disable with
+    task['reuse_validated_tests'] = False).
+    """
+    class_info = task["class_info"]
+    session = _session(task)
+    # The class's file analysis is only read here, and only its matching methods are kept
+    analyses = [session.artifacts.get(ref) for ref in task.get("tree_sitter_analysis", [])]
+    body_hashes = _method_body_hashes(_project_key(task), class_info, analyses)
+    cached = None
+    if body_hashes and task.get("reuse_validated_tests", True):
+        cached = session.validated_tests().lookup_class(body_hashes.values())
+    recommendations = [
+        dict(recommendation)
+        for recommendation in session.class_recommendations(
+            task["project_dir"], class_info, task.get("diff_scope"), test_code=cached["test_code"] if cached else None
+        )
+    ]
+    methods = [method for analysis in analyses for method in analysis["methods"]]
+    for recommendation in recommendations:
+        method = _matching_method(methods, recommendation["method_name"], recommendation["line_number"])
+        recommendation["ast_analysis"] = session.artifacts.put(method) if method is not None else None
+        recommendation["body_hash"] = body_hashes.get((recommendation["method_name"], recommendation["line_number"]))
+        if cached:
+            recommendation["validated"] = True
+            recommendation["validated_coverage"] = cached["coverage"]
+    if cached:
+        count("cache_hit", "validated_tests")
+        logging.info(f"generate_class_tests_node: reusing the validated test of {class_info['class_name']}, its methods are unchanged")
+    logging.info(f"generate_class_tests_node: {len(recommendations)} recommendation(s) for {class_info['class_name']}")
+    return {"test_recommendations": recommendations}
+
+def build_graph():
+    """Build and compile the coverage pipeline graph."""
+    # langgraph is only imported here, so tools and CLIs importing this module start quickly
+    from langgraph.graph import StateGraph, END
+
+    # 1) Build a StateGraph over the typed pipeline state; nodes return only their updates
+    builder = StateGraph(PipelineState)
+
+    # 2) Register our nodes
+    # Every node is timed into the session's metrics. Completed nodes are checkpointed when
+    # state['checkpoint'] is set and replayed with state['resume']. coverage_analysis only
+    # reads the session's parsed report, so it always runs.
+    builder.add_node("start_session", start_session_node)
+    builder.add_node("git_clone", instrumented("git_clone", checkpointed(
+        "git_clone", git_clone_node, is_valid=_clone_is_current, starts_run=True
+    )))
+    builder.add_node("diff_scope", instrumented("diff_scope", checkpointed(
+        "diff_scope", diff_scope_node, fingerprint=_diff_refs_fingerprint
+    )))
+    builder.add_node("code_cov", instrumented("code_cov", checkpointed(
+        "code_cov", coverage_node, is_valid=_report_exists, fingerprint=_coverage_fingerprint
+    )))
+    builder.add_node("coverage_analysis", instrumented("coverage_analysis", coverage_analysis_node))
+    builder.add_node("tree_sitter_coverage", instrumented("tree_sitter_coverage", checkpointed(
+        "tree_sitter_coverage", tree_sitter_coverage_node, is_valid=_artifacts_exist, fingerprint=_analysis_fingerprint
+    )))
+    builder.add_node("plan_generation", instrumented("plan_generation", plan_generation_node))
+    builder.add_node("validate_and_fix_tests", instrumented("validate_and_fix_tests", validate_and_fix_tests_node))
+    builder.add_node("coverage_gain", instrumented("coverage_gain", coverage_gain_node))
+    builder.add_node("generate_class_tests", instrumented("generate_class_tests", checkpointed(
+        "generate_class_tests", generate_class_tests_node, task_key=lambda task: task["class_info"]["class_name"],
+        is_valid=_artifacts_exist, fingerprint=_generation_fingerprint
+    )))
+    # generate_class_tests replaces test_orchestrator: it produces the same per-method
+    # recommendations, with their tree-sitter analysis, one class per parallel run
     # builder.add_node("write_test_to_file", write_test_to_file_node)
     # builder.add_node("run_maven_tests", run_maven_tests_node)
     # builder.add_node("parse_test_failures", parse_test_failures_node)
     # builder.add_node("correct_test_with_llm", correct_test_with_llm_node)
-    # builder.add_node("validate_and_fix_tests", validate_and_fix_tests_node)
 
     # 3) Wire them up
-    builder.set_entry_point("git_clone")
-    builder.add_edge("git_clone", "code_cov")
+    builder.set_entry_point("start_session")
+    builder.add_edge("start_session", "git_clone")
+    builder.add_edge("git_clone", "diff_scope")
+    builder.add_edge("diff_scope", "code_cov")
+    # JaCoCo XML analysis and tree-sitter structural analysis run in parallel
     builder.add_edge("code_cov", "coverage_analysis")
-    # builder.add_edge("code_cov", "tree_sitter_coverage")
-    # builder.add_edge("tree_sitter_coverage", "coverage_analysis")
-    builder.add_edge("coverage_analysis", "test_orchestrator")
-    # builder.add_edge("test_orchestrator", "validate_and_fix_tests")
+    builder.add_edge("code_cov", "tree_sitter_coverage")
+    builder.add_edge(["coverage_analysis", "tree_sitter_coverage"], "plan_generation")
+    # One generate_class_tests run per class, all in the same parallel step
+    builder.add_conditional_edges("plan_generation", dispatch_class_generation, ["generate_class_tests", END])
+    # Validation runs once, after every class's generation finished; it is what fills
+    # the validated-test cache that generate_class_tests reuses
+    builder.add_edge("generate_class_tests", "validate_and_fix_tests")
+    # Coverage gain is only measured when some generated test passed validation
+    builder.add_conditional_edges("validate_and_fix_tests", _after_validation, ["coverage_gain", END])
+    builder.add_edge("coverage_gain", END)
     # Do NOT add another set of edges or a second invocation!
 
-    # 4) Compile and invoke
-    app = builder.compile()
-    initial = {"repo_url": os.getenv("GIT_REPO_URL")}
-    final_state = app.invoke(initial)
+    # 4) Compile
+    return builder.compile()
 
+def print_summary(final_state: dict) -> None:
+    """Print the coverage metrics, recommendations and coverage gains of a finished run."""
     print("\n✨ Enhanced Analysis Results:")
     print("✅ Coverage report generated at:", final_state.get("report_path", "N/A"))
     
@@ -319,23 +665,50 @@ if __name__ == "__main__":
         overall.get("method_coverage", 0.0) == 100.0
     ):
         print("No need to generate more test cases as coverage is already 100%.")
-    else:
-        for rec in recommendations:
-            print(f"\n� Class: {rec.get('class_name', 'N/A')}")
-            print(f"  Method: {rec.get('method_name', 'N/A')}")
-            print(f"  Coverage: {rec.get('coverage', 'N/A')}")
-            print(f"  Test Code:\n{rec.get('test_code', 'N/A')}")
-            for key in rec:
-                if key not in ['class_name', 'method_name', 'coverage', 'test_code']:
-                    print(f"  {key}: {rec[key]}")
-        # Run validation and feedback loop
-        test_dir = os.path.join(final_state.get("project_dir", ""), "src", "test", "java", "com", "training", "example", "JacocoExample")
-        project_dir = final_state.get("project_dir", "")
-        from src.test_orchestrator_agent import TestOrchestratorAgent
-        orchestrator = TestOrchestratorAgent(project_dir)
-        # validate_and_fix_tests_node({
-        #     "recommendations": recommendations,
-        #     "test_dir": test_dir,
-        #     "project_dir": project_dir,
-        #     "llm": orchestrator.llm
-        # })
+        return
+    for rec in recommendations:
+        print(f"\n� Class: {rec.get('class_name', 'N/A')}")
+        print(f"  Method: {rec.get('method_name', 'N/A')}")
+        print(f"  Coverage: {rec.get('coverage', 'N/A')}")
+        print(f"  Test Code:\n{_load(final_state, rec.get('test_code', 'N/A'))}")
+        for key in rec:
+            if key not in ['class_name', 'method_name', 'coverage', 'test_code']:
+                print(f"  {key}: {_load(final_state, rec[key])}")
+    coverage_gains = final_state.get("coverage_gains", [])
+    if coverage_gains:
+        print("\n📈 Coverage Gain per Generated Test:")
+        for gain in coverage_gains:
+            status = "rejected (no new coverage)" if gain["rejected"] else "kept"
+            if gain["error"]:
+                status = f"not measured ({gain['error']})"
+            print(f"  - {gain['test_class']}: +{gain['added_line_count']} line(s), +{gain['added_branches']} branch(es) - {status}")
+    session = final_state.get("session")
+    if session is not None:
+        print("\n🔁 Stage Runs:")
+        for stage, counts in session.stage_counts().items():
+            print(f"  - {stage}: ran {counts['runs']}x, reused {counts['reuses']}x")
+
+if __name__ == "__main__":
+    app = build_graph()
+    initial = {"repo_url": os.getenv("GIT_REPO_URL")}
+    # Checkpoint every completed node; RESUME=1 skips the nodes a crashed run already finished
+    if os.getenv("CHECKPOINT", "1") != "0":
+        initial["checkpoint"] = os.getenv("CHECKPOINT_DB") or True
+        initial["resume"] = os.getenv("RESUME", "").lower() in ("1", "true", "yes")
+    # Generated tests are compiled, run and corrected unless VALIDATE_TESTS=0
+    initial["validate_tests"] = os.getenv("VALIDATE_TESTS", "1") != "0"
+    # Unchanged methods reuse their previously validated tests unless VALIDATED_TEST_CACHE=0
+    initial["reuse_validated_tests"] = os.getenv("VALIDATED_TEST_CACHE", "1") != "0"
+    # Diff mode: only analyze and generate tests for lines changed between two refs
+    if os.getenv("DIFF_BASE_REF"):
+        initial["base_ref"] = os.getenv("DIFF_BASE_REF")
+        initial["head_ref"] = os.getenv("DIFF_HEAD_REF", "HEAD")
+        initial["ref"] = os.getenv("DIFF_HEAD_REF")
+    final_state = app.invoke(initial)
+    print_summary(final_state)
+
+    metrics = final_state["session"].metrics
+    print("\n⏱️ Run Metrics:")
+    print(metrics.summary_table())
+    jsonl_path, prom_path = metrics.export()
+    print(f"Metrics written to {jsonl_path} and {prom_path}")
@@ -0,0 +1,187 @@
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Iterable, List
+
+from src.tools.artifact_store import ArtifactStore
+from src.tools.metrics import InstrumentedLLM, RunMetrics, count
+
+class ClientPool:
+    """
+    Chat models shared by many sessions, one per agent class, so a long-running
+    process (see daemon.py) keeps its HTTP connections instead of reconnecting per run.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, build: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = build()
+            return self._clients[key]
+
+class PipelineSession:
+    """
+    Owns the agents and expensive artifacts of one pipeline run.
+
+    Every graph node gets the session from the state, so the JaCoCo report is parsed
+    once, the agents and their LLM clients are built once, and each class's tests are
+    generated once no matter how many nodes ask for them. `runs` counts how often each
+    stage was actually computed and `reuses` how often a computed result was handed out again.
+    The agents' LLM clients are instrumented, so their calls land in `metrics`, and
+    are only built when a stage first calls them.
+
+    Generated test code and AST analysis go to `artifacts`; the recommendations the
+    session hands out, and so the graph state, only hold ArtifactRefs to them.
+    """
+
+    def __init__(self, metrics: RunMetrics = None, artifacts: ArtifactStore = None, clients: ClientPool = None):
+        self.metrics = metrics or RunMetrics()
+        self.artifacts = artifacts or ArtifactStore()
+        # Without a pool every agent builds its own chat model
+        self.clients = clients
+        self.runs: Counter = Counter()
+        self.reuses: Counter = Counter()
+        self._artifacts: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        # One lock per artifact, so different classes can be generated at the same time
+        self._artifact_locks: Dict[Hashable, threading.Lock] = {}
+
+    def _once(self, stage: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Compute an artifact on first use and return the same object afterwards"""
+        artifact_key = (stage, key)
+        with self._lock:
+            if artifact_key in self._artifacts:
+                self.reuses[stage] += 1
+                count("cache_hit", f"session:{stage}")
+                return self._artifacts[artifact_key]
+            artifact_lock = self._artifact_locks.setdefault(artifact_key, threading.Lock())
+        with artifact_lock:
+            with self._lock:
+                if artifact_key in self._artifacts:
+                    self.reuses[stage] += 1
+                    count("cache_hit", f"session:{stage}")
+                    return self._artifacts[artifact_key]
+            value = compute()
+            with self._lock:
+                self._artifacts[artifact_key] = value
+                self.runs[stage] += 1
+        return value
+
+    def _llm_factory(self, agent) -> Callable[[], Any]:
+        if self.clients is None:
+            return agent.build_llm
+        return lambda: self.clients.get(type(agent).__name__, agent.build_llm)
+
+    def inherit(self, other: "PipelineSession", stages: Iterable[str]) -> None:
+        """Take over the artifacts of the given stages from an earlier session, e.g. warm agents"""
+        stages = set(stages)
+        with other._lock:
+            inherited = {key: value for key, value in other._artifacts.items() if key[0] in stages}
+        with self._lock:
+            self._artifacts.update(inherited)
+
+    def coverage_agent(self, project_dir: str, diff_scope=None):
+        """The CoverageAnalysisAgent of project_dir; it parses jacoco.xml on first use"""
+        def build():
+            from src.code_coverage_analyzer_agent import CoverageAnalysisAgent
+            agent = CoverageAnalysisAgent(project_dir, diff_scope=diff_scope)
+            agent.llm = InstrumentedLLM(factory=self._llm_factory(agent))
+            agent.test_context = self.test_context_index(project_dir)
+            return agent
+        return self._once("coverage_agent", project_dir, build)
+
+    def tree_sitter_agent(self, project_dir: str):
+        """A TreeSitterCoverageAgent backed by the persistent method index"""
+        def build():
+            from src.tree_sitter_coverage_agent import TreeSitterCoverageAgent
+            from src.tools.method_index import MethodIndex
+            return TreeSitterCoverageAgent(project_dir, index=MethodIndex(root=project_dir))
+        return self._once("tree_sitter_agent", project_dir, build)
+
+    def test_context_index(self, project_dir: str):
+        """The BM25 index of project_dir's existing tests; it reads the test files on its first query"""
+        def build():
+            from src.tools.test_context_index import TestContextIndex
+            return TestContextIndex(project_dir, tree_sitter_agent=self.tree_sitter_agent(project_dir))
+        return self._once("test_context_index", project_dir, build)
+
+    def source_fingerprint(self, project_dir: str) -> str:
+        """Hash of project_dir's poms and sources, computed once per run"""
+        def compute():
+            from src.tools.jacoco_tool import source_fingerprint
+            return source_fingerprint(project_dir)
+        return self._once("source_fingerprint", project_dir, compute)
+
+    def orchestrator(self, project_dir: str, diff_scope=None):
+        """A TestOrchestratorAgent sharing this session's coverage and tree-sitter agents"""
+        def build():
+            from src.test_orchestrator_agent import TestOrchestratorAgent
+            orchestrator = TestOrchestratorAgent(
+                project_dir,
+                diff_scope=diff_scope,
+                coverage_agent=self.coverage_agent(project_dir, diff_scope),
+                tree_sitter_agent=self.tree_sitter_agent(project_dir)
+            )
+            orchestrator.llm = InstrumentedLLM(factory=self._llm_factory(orchestrator))
+            return orchestrator
+        return self._once("orchestrator", project_dir, build)
+
+    def llm(self, project_dir: str, diff_scope=None):
+        """The chat model used for test generation and correction"""
+        return self.coverage_agent(project_dir, diff_scope).llm
+
+    def coverage_analysis(self, project_dir: str, diff_scope=None) -> Dict:
+        """CoverageAnalysisAgent.analyze_coverage() of project_dir"""
+        agent = self.coverage_agent(project_dir, diff_scope)
+        return self._once("analyze_coverage", project_dir, agent.analyze_coverage)
+
+    def line_coverage(self, project_dir: str, diff_scope=None) -> Dict:
+        """Per-line JaCoCo counters, read from the already parsed report"""
+        agent = self.coverage_agent(project_dir, diff_scope)
+        return self._once("line_coverage", project_dir, agent.analyzer.get_line_coverage)
+
+    def class_recommendations(self, project_dir: str, class_info: Dict, diff_scope=None,
+                              test_code: str = None) -> List[Dict]:
+        """
+        Generated test recommendations for one class of coverage_analysis(); with
+        test_code (a previously validated test) they are built without the LLM.
+        """
+        agent = self.coverage_agent(project_dir, diff_scope)
+        return self._once("generate_class_tests", (project_dir, class_info["class_name"]),
+                          lambda: [self._store_payloads(rec) for rec in agent.class_recommendations(class_info, test_code)])
+
+    def test_recommendations(self, project_dir: str, diff_scope=None) -> Dict:
+        """TestOrchestratorAgent.get_test_recommendations() of project_dir"""
+        orchestrator = self.orchestrator(project_dir, diff_scope)
+
+        def compute() -> Dict:
+            recommendations = orchestrator.get_test_recommendations()
+            return {
+                **recommendations,
+                "test_recommendations": [self._store_payloads(rec) for rec in recommendations["test_recommendations"]]
+            }
+        return self._once("test_recommendations", project_dir, compute)
+
+    def _store_payloads(self, recommendation: Dict) -> Dict:
+        """Move a recommendation's test code and AST analysis into the artifact store"""
+        return {
+            key: self.artifacts.put(value) if key in ("test_code", "ast_analysis") and value is not None else value
+            for key, value in recommendation.items()
+        }
+
+    def validated_tests(self):
+        """The persistent ValidatedTestCache, opened on first use"""
+        def build():
+            from src.tools.validated_test_cache import ValidatedTestCache
+            return ValidatedTestCache()
+        return self._once("validated_test_cache", None, build)
+
+    def stage_counts(self) -> Dict[str, Dict[str, int]]:
+        """How many times each stage ran and how many times its result was reused"""
+        with self._lock:
+            return {
+                stage: {"runs": self.runs[stage], "reuses": self.reuses[stage]}
+                for stage in sorted(set(self.runs) | set(self.reuses))
+            }
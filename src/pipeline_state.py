@@ -0,0 +1,93 @@
+import operator
+from typing import Annotated, Any, Dict, List, Optional, TypedDict
+
+class PipelineState(TypedDict, total=False):
+    """
+    State shared by the nodes of the coverage graph.
+
+    Nodes return only the keys they change; LangGraph merges them into the state.
+    Keys written by parallel branches either belong to one branch only or carry a
+    reducer that combines the branches' updates. Large payloads (test code, Maven
+    output, tree-sitter analysis) are ArtifactRefs into the session's artifact store.
+    """
+    # Inputs
+    repo_url: str
+    ref: Optional[str]
+    clone_depth: Optional[int]
+    clone_filter: Optional[str]
+    single_branch: bool
+    reuse_clone: bool
+    target_dir: str
+    base_ref: Optional[str]
+    head_ref: Optional[str]
+    incremental: bool
+    offline: Optional[bool]
+    # Reuse a class's validated test when its methods are unchanged (default True)
+    reuse_validated_tests: bool
+    # Compile, run and correct the generated tests after generation (default True)
+    validate_tests: bool
+    # Checkpointing: a database path or True for the default, and whether to replay completed nodes
+    checkpoint: Any
+    resume: bool
+    run_key: str
+
+    # git_clone / diff_scope / code_cov
+    project_dir: str
+    commit: str
+    clone_timing: Dict[str, Any]
+    diff_scope: Any
+    report_path: str
+
+    # PipelineSession owning the run's agents and memoized artifacts (see start_session)
+    session: Any
+
+    # coverage_analysis (JaCoCo XML) and tree_sitter_coverage run in parallel
+    coverage_analysis: Dict[str, float]
+    classes_needing_coverage: List[Dict]
+    uncovered_files: Dict[str, List[int]]
+    file_path: str
+    uncovered_lines: List[int]
+    # Per analyzed file: 'file_path', 'method_count' and 'analysis' (ArtifactRef)
+    tree_sitter_analysis: List[Dict]
+
+    # generate_class_tests runs once per class; each run appends its recommendations,
+    # whose 'test_code' and 'ast_analysis' are ArtifactRefs
+    test_recommendations: Annotated[List[Dict], operator.add]
+    overall_coverage: Dict[str, float]
+    uncovered_methods: List[Dict]
+
+    # Test writing, running and validation; test_code, mvn_output and corrected_test_code
+    # are ArtifactRefs (plain strings are accepted as input too)
+    llm: Any
+    recommendations: List[Dict]
+    test_dir: str
+    test_code: Any
+    class_name: str
+    test_class: str
+    test_methods: List[str]
+    mvn_output: Any
+    test_run_started: float
+    failures: List[Any]
+    error_message: str
+    corrected_test_code: Any
+    max_retries: int
+    validation_workers: Optional[int]
+    precompile: bool
+    validation_results: List[Dict]
+    reject_useless_tests: bool
+    coverage_gains: List[Dict]
+
+class ClassGenerationTask(TypedDict, total=False):
+    """Input of one generate_class_tests run, sent by the fan-out after analysis"""
+    class_info: Dict
+    # ArtifactRefs to the tree-sitter analysis of the class's source file
+    tree_sitter_analysis: List[Any]
+    session: Any
+    repo_url: str
+    project_dir: str
+    diff_scope: Any
+    checkpoint: Any
+    resume: bool
+    run_key: str
+    commit: str
+    reuse_validated_tests: bool
@@ -1,30 +1,22 @@
 from typing import Dict, List
-from code_coverage_analyzer_agent import CoverageAnalysisAgent
+from src.code_coverage_analyzer_agent import CoverageAnalysisAgent
+from src.tools.limits import llm_slot
+from src.tools.metrics import metric_labels
+from src.tools.test_context_index import TestContextIndex, method_query
 import os
 import datetime
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
 import xml.etree.ElementTree as ET
 
 class TestOrchestratorAgent:
-    def __init__(self, repo_path: str):
+    def __init__(self, repo_path: str, diff_scope=None, coverage_agent=None, tree_sitter_agent=None):
         self.repo_path = repo_path
-        self.coverage_agent = CoverageAnalysisAgent(repo_path)
-        self.tree_sitter_agent = None
-        
-        # Try to initialize Tree-sitter support
-        try:
-            from tree_sitter_coverage_agent import TreeSitterCoverageAgent
-            self.tree_sitter_agent = TreeSitterCoverageAgent(repo_path)
-        except Exception as e:
-            print(f"Tree-sitter support not available: {str(e)}")
-        
-        # Initialize AI components for test generation
-        self.llm = ChatOpenAI(
-            model_name="gpt‑4o",
-            temperature=0.0,
-            streaming=True
-        )
+        self.diff_scope = diff_scope
+        # Agents can be shared with the rest of a run (see PipelineSession) instead of built
+        # again; otherwise they, and the LLM client, are created on first use
+        self._coverage_agent = coverage_agent
+        self._tree_sitter_agent = tree_sitter_agent
+        self._tree_sitter_loaded = tree_sitter_agent is not None
+        self._llm = None
         
         # Define the system prompt for intelligent test synthesis
         self.system_prompt = """You are a Java test synthesis expert. Your task is to generate optimal test cases by combining:
@@ -44,10 +36,55 @@ Also,
 3. Just output the Java code, nothing else. 
 """
 
-    def analyze_code(self, java_code: str, method_name: str) -> Dict:
+    @property
+    def coverage_agent(self) -> CoverageAnalysisAgent:
+        if self._coverage_agent is None:
+            self._coverage_agent = CoverageAnalysisAgent(self.repo_path, diff_scope=self.diff_scope)
+        return self._coverage_agent
+
+    @property
+    def tree_sitter_agent(self):
+        # Try to initialize Tree-sitter support
+        if not self._tree_sitter_loaded:
+            self._tree_sitter_loaded = True
+            try:
+                from src.tree_sitter_coverage_agent import TreeSitterCoverageAgent
+                self._tree_sitter_agent = TreeSitterCoverageAgent(self.repo_path)
+            except Exception as e:
+                print(f"Tree-sitter support not available: {str(e)}")
+        return self._tree_sitter_agent
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._llm = self.build_llm()
+        return self._llm
+
+    @llm.setter
+    def llm(self, llm) -> None:
+        self._llm = llm
+
+    def build_llm(self):
+        """Create the chat model used for test generation"""
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model_name="gpt‑4o",
+            temperature=0.0,
+            streaming=True,
+            # Report token usage on streamed responses too, for the run metrics
+            stream_usage=True
+        )
+
+    def analyze_code(self, java_code: str, method_name: str, coverage: Dict = None) -> Dict:
         """Analyze Java code using both coverage and AST analysis"""
+        if coverage is None:
+            coverage = next(
+                (method["coverage"] for method in self.coverage_agent.get_uncovered_methods()
+                 if method["method_name"] == method_name),
+                None
+            )
         analysis = {
-            "coverage": self.coverage_agent.analyze_coverage(java_code, method_name),
+            "coverage": coverage,
             "ast_analysis": None
         }
         
@@ -60,8 +97,10 @@ Also,
                 
         return analysis
         
-    def generate_test_cases(self, analysis: Dict, class_name: str, method_name: str) -> str:
-        """Generate test cases based on the combined analysis"""
+    def generate_test_cases(self, analysis: Dict, class_name: str, method_name: str, java_code: str = "") -> str:
+        """Generate test cases based on the combined analysis, with the project's most similar tests as examples"""
+        from langchain_core.prompts import ChatPromptTemplate
+
         template = ChatPromptTemplate.from_messages([
             ("system", self.system_prompt),
             ("user", """Generate JUnit tests for the following Java method:
@@ -74,6 +113,9 @@ Coverage Analysis:
 AST Analysis:
 {ast_data}
 
+Existing tests from this project (follow their imports, fixtures and style):
+{examples}
+
 Generate comprehensive test cases that achieve high coverage and test edge cases.""")
         ])
         
@@ -94,10 +136,14 @@ Generate comprehensive test cases that achieve high coverage and test edge cases
             class_name=class_name,
             method_name=method_name,
             coverage_data=analysis["coverage"],
-            ast_data=ast_data
+            ast_data=ast_data,
+            examples=TestContextIndex.format_examples(
+                self.coverage_agent.test_context.few_shot(method_query(class_name, method_name, java_code))
+            )
         )
         
-        response = self.llm.invoke(messages)
+        with llm_slot():
+            response = self.llm.invoke(messages)
         return response.content
     
     def get_test_recommendations(self) -> Dict:
@@ -128,10 +174,14 @@ Generate comprehensive test cases that achieve high coverage and test edge cases
             # For each uncovered method, try to get enhanced analysis and generate tests
             for method in uncovered_methods:
                 try:
-                    java_code = self.coverage_agent.get_method_source(method["class_name"], method["method_name"])
+                    # The source file is located by the package path, not the simple class name
+                    java_code = self.coverage_agent.get_method_source(
+                        method.get("class_path", method["class_name"]), method["method_name"]
+                    )
                     if java_code:
-                        analysis = self.analyze_code(java_code, method["method_name"])
-                        test_code = self.generate_test_cases(analysis, method["class_name"], method["method_name"])
+                        analysis = self.analyze_code(java_code, method["method_name"], method.get("coverage"))
+                        with metric_labels(class_name=method["class_name"], method_name=method["method_name"]):
+                            test_code = self.generate_test_cases(analysis, method["class_name"], method["method_name"], java_code)
                         
                         coverage_data["test_recommendations"].append({
                             "class_name": method["class_name"],
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from .cache_paths import cache_dir
+
+DEFAULT_MAX_AGE_DAYS = 7
+DEFAULT_MAX_BYTES = 1024 ** 3
+# Payloads used this recently are never evicted, so a running pipeline keeps what its state refers to
+MIN_AGE_SECONDS = 3600
+
+@dataclass(frozen=True)
+class ArtifactRef:
+    """
+    Reference to a payload in an ArtifactStore. It is what the graph state carries
+    instead of test code, Maven output or analysis objects, so copying, checkpointing
+    and logging the state stays cheap however large the payload is.
+    """
+    digest: str
+    codec: str
+    size: int
+
+    def __repr__(self) -> str:
+        return f"ArtifactRef({self.codec}:{self.digest[:12]}, {self.size} bytes)"
+
+class ArtifactStore:
+    """
+    Content-addressed store of large pipeline payloads on local disk.
+
+    Each payload is written once to '<root>/<digest[:2]>/<digest>', keyed by the
+    sha256 of its encoded bytes, so identical payloads (the same test code for two
+    runs, an unchanged file's analysis) share one file. Strings are stored as UTF-8
+    text and anything else is pickled, so the store must only be read by the user
+    who wrote it.
+
+    A payload's modification time is its last use. When a store is opened,
+    payloads not used for max_age_days are deleted, then the least recently used
+    ones beyond max_bytes (ARTIFACT_STORE_MAX_AGE_DAYS and ARTIFACT_STORE_MAX_MB by
+    default). Checkpoints that refer to a deleted payload are recomputed.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_age_days: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self.root = root or cache_dir("artifacts")
+        self.max_age_days = max_age_days if max_age_days is not None else float(
+            os.getenv("ARTIFACT_STORE_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS)
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else (
+            int(float(os.environ["ARTIFACT_STORE_MAX_MB"]) * 1024 ** 2)
+            if os.getenv("ARTIFACT_STORE_MAX_MB") else DEFAULT_MAX_BYTES
+        )
+        os.makedirs(self.root, exist_ok=True)
+        self.evict()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, value: Any) -> ArtifactRef:
+        """Store value and return its reference"""
+        if isinstance(value, str):
+            codec, data = "text", value.encode("utf-8")
+        else:
+            codec, data = "pickle", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = hashlib.sha256(codec.encode() + b"\0" + data).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            _touch(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial payload
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return ArtifactRef(digest=digest, codec=codec, size=len(data))
+
+    def get(self, ref: ArtifactRef) -> Any:
+        """Read the payload a reference points to"""
+        path = self._path(ref.digest)
+        with open(path, 'rb') as f:
+            data = f.read()
+        _touch(path)
+        return data.decode("utf-8") if ref.codec == "text" else pickle.loads(data)
+
+    def load(self, value: Any) -> Any:
+        """The payload when value is a reference, else value itself (for states built by hand)"""
+        return self.get(value) if isinstance(value, ArtifactRef) else value
+
+    def exists(self, ref: ArtifactRef) -> bool:
+        return os.path.exists(self._path(ref.digest))
+
+    def evict(self) -> int:
+        """Delete payloads older than max_age_days, then the least recently used beyond max_bytes"""
+        now = time.time()
+        entries = []
+        for directory, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                path = os.path.join(directory, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            age = now - mtime
+            if age < MIN_AGE_SECONDS:
+                break
+            # Leftover temporary files of interrupted writes go too
+            if age > self.max_age_days * 86400 or total > self.max_bytes or path.endswith(".tmp"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+        return removed
+
+def _touch(path: str) -> None:
+    """Mark a payload as used; another process may have just evicted it"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
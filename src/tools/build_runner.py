@@ -0,0 +1,182 @@
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .cache_paths import cache_dir
+from .limits import maven_slot
+from .metrics import observe
+from .maven_stream import FailureWatcher, StreamResult
+
+# Cheaper JIT settings for short-lived Maven JVMs; only applied when MAVEN_OPTS is unset
+_COLD_JVM_OPTS = "-XX:+TieredCompilation -XX:TieredStopAtLevel=1"
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+def _goals(args: List[str]) -> str:
+    """The goals and phases of a Maven command line, used to name its metrics"""
+    return " ".join(arg for arg in args if not arg.startswith("-")) or "mvn"
+
+@dataclass
+class BuildRunner:
+    """
+    A Maven-compatible build command.
+
+    `kind` is 'mvnd' for the Maven daemon (a warm JVM kept between invocations),
+    'mvnw' for the project's Maven wrapper or 'mvn' for a plain Maven install.
+    """
+    executable: str
+    kind: str
+    offline: bool = False
+    extra_args: List[str] = field(default_factory=list)
+
+    @classmethod
+    def detect(cls, project_dir: Optional[str] = None, offline: Optional[bool] = None) -> "BuildRunner":
+        """
+        Pick the fastest available build command.
+
+        Resolution order: BUILD_RUNNER (an explicit executable), mvnd on PATH unless
+        MAVEN_DAEMON=0, the project's mvnw wrapper, then mvn on PATH. Offline mode ('-o')
+        is enabled by the offline argument or, when that is None, by MAVEN_OFFLINE=1.
+
+        Raises:
+            FileNotFoundError: If no Maven executable can be found.
+        """
+        if offline is None:
+            offline = _env_flag("MAVEN_OFFLINE")
+
+        explicit = os.getenv("BUILD_RUNNER")
+        if explicit:
+            executable = shutil.which(explicit) or explicit
+            kind = "mvnd" if os.path.basename(executable).lower().startswith("mvnd") else "mvn"
+            return cls(executable, kind, offline)
+
+        if os.getenv("MAVEN_DAEMON", "1") != "0":
+            mvnd = shutil.which("mvnd")
+            if mvnd:
+                return cls(mvnd, "mvnd", offline)
+
+        if project_dir:
+            wrapper = os.path.join(project_dir, "mvnw.cmd" if os.name == "nt" else "mvnw")
+            if os.path.isfile(wrapper) and os.access(wrapper, os.X_OK):
+                return cls(wrapper, "mvnw", offline)
+
+        # shutil.which honours PATHEXT, so this also finds mvn.cmd on Windows
+        mvn = shutil.which("mvn")
+        if mvn:
+            return cls(mvn, "mvn", offline)
+        raise FileNotFoundError("Maven executable not found. Ensure Maven (or mvnd) is installed and added to PATH.")
+
+    def command(self, args: List[str]) -> List[str]:
+        """Build the full command line for the given Maven arguments"""
+        prefix = ["-o"] if self.offline else []
+        return [self.executable, *prefix, *self.extra_args, *args]
+
+    def environment(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        if self.kind != "mvnd" and not env.get("MAVEN_OPTS"):
+            env["MAVEN_OPTS"] = _COLD_JVM_OPTS
+        return env
+
+    def run(self, args: List[str], cwd: str, capture_output: bool = True, check: bool = False) -> subprocess.CompletedProcess:
+        """
+        Run Maven with the given arguments, waiting for a free Maven slot first.
+
+        Args:
+            args (List[str]): Goals and options, e.g. ["test", "-B"].
+            cwd (str): The project directory.
+            capture_output (bool): Capture stdout/stderr as text instead of inheriting them.
+            check (bool): Raise subprocess.CalledProcessError on a non-zero exit code.
+
+        Returns:
+            subprocess.CompletedProcess: The finished process.
+        """
+        with maven_slot(), observe("maven", _goals(args)):
+            return subprocess.run(
+                self.command(args),
+                cwd=cwd,
+                env=self.environment(),
+                capture_output=capture_output,
+                text=True,
+                check=check
+            )
+
+    def stream(
+        self,
+        args: List[str],
+        cwd: str,
+        watcher: Optional[FailureWatcher] = None,
+        log_path: Optional[str] = None
+    ) -> StreamResult:
+        """
+        Run Maven while inspecting its output as it is produced.
+
+        Output is spooled to log_path (a new file under the cache's maven-logs directory
+        when None) instead of being held in memory. When watcher signals a relevant
+        failure the whole process tree is stopped immediately.
+
+        Args:
+            args (List[str]): Goals and options, e.g. ["test", "-B"].
+            cwd (str): The project directory.
+            watcher (Optional[FailureWatcher]): Decides when to abort; the build always runs to completion when None.
+            log_path (Optional[str]): Where to write the raw build log.
+
+        Returns:
+            StreamResult: Exit code, whether and why the build was aborted, the
+            diagnostics collected by the watcher and the log location.
+        """
+        if log_path is None:
+            fd, log_path = tempfile.mkstemp(prefix="mvn-", suffix=".log", dir=cache_dir("maven-logs"))
+            os.close(fd)
+
+        aborted = False
+        with maven_slot(), observe("maven", _goals(args)) as fields, open(log_path, 'w', encoding='utf-8') as log:
+            process = subprocess.Popen(
+                self.command(args),
+                cwd=cwd,
+                env=self.environment(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                errors="replace",
+                # A separate process group lets us stop the forked Surefire JVM as well
+                start_new_session=(os.name != "nt")
+            )
+            try:
+                for line in process.stdout:
+                    log.write(line)
+                    if watcher is not None and watcher.feed(line.rstrip("\n")):
+                        aborted = True
+                        self._terminate(process)
+                        break
+            finally:
+                process.stdout.close()
+                returncode = process.wait()
+                fields["aborted"] = aborted
+
+        if watcher is not None:
+            watcher.finish()
+        return StreamResult(
+            returncode=returncode,
+            aborted=aborted,
+            reason=watcher.reason if watcher else None,
+            excerpt=watcher.excerpt if watcher else "",
+            log_path=log_path
+        )
+
+    @staticmethod
+    def _terminate(process: subprocess.Popen) -> None:
+        try:
+            if os.name == "nt":
+                process.terminate()
+            else:
+                os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        except ProcessLookupError:
+            pass
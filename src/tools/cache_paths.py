@@ -0,0 +1,25 @@
+import os
+
+def cache_path(*parts: str) -> str:
+    """
+    Resolve a path inside the local cache directory, creating its parent directory.
+
+    The cache lives next to the 'cloned_repo' checkout so that it survives re-clones.
+    Set CODECOV_CACHE_DIR to move it elsewhere.
+
+    Args:
+        *parts (str): Path components relative to the cache directory.
+
+    Returns:
+        str: Absolute path of the requested cache entry.
+    """
+    root = os.getenv("CODECOV_CACHE_DIR") or os.path.join(os.getcwd(), ".codecov_cache")
+    path = os.path.join(root, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def cache_dir(*parts: str) -> str:
+    """Resolve a directory inside the local cache directory, creating it if needed."""
+    path = os.path.dirname(cache_path(*parts, ""))
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache_paths import cache_path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_key TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    node TEXT NOT NULL,
+    task TEXT NOT NULL,
+    output BLOB NOT NULL,
+    fingerprint TEXT,
+    completed_at REAL NOT NULL,
+    PRIMARY KEY (run_key, commit_sha, node, task)
+);
+"""
+
+# State keys that identify what a run computes; anything else does not change a node's output
+RUN_CONFIG_KEYS = ("repo_url", "ref", "clone_depth", "clone_filter", "single_branch", "reuse_clone",
+                   "target_dir", "base_ref", "head_ref", "incremental", "offline")
+
+def run_key(state: Dict[str, Any]) -> str:
+    """Stable key for a run's repository and configuration"""
+    config = {key: state.get(key) for key in RUN_CONFIG_KEYS if state.get(key) is not None}
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf8")).hexdigest()[:24]
+
+class CheckpointStore:
+    """
+    Durable SQLite record of the output of every completed graph node.
+
+    Outputs are keyed by run key (repository plus configuration), the commit being
+    processed, the node name and, for nodes that run once per item, a task key.
+    The git_clone output is stored with an empty commit because the commit is not
+    known until the clone exists. Outputs are pickled, so the database must only
+    be read by the user who wrote it.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or cache_path("checkpoints.sqlite")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def load(self, key: str, commit: str, node: str, task: str = "") -> Optional[Tuple[Dict[str, Any], Optional[str]]]:
+        """Return the stored (output, fingerprint) of a completed node, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output, fingerprint FROM checkpoints WHERE run_key = ? AND commit_sha = ? AND node = ? AND task = ?",
+                (key, commit, node, task)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return pickle.loads(row["output"]), row["fingerprint"]
+        except (pickle.UnpicklingError, AttributeError, ImportError, TypeError, EOFError):
+            # Written by a version whose classes have since changed shape; recompute it
+            return None
+
+    def save(self, key: str, commit: str, node: str, output: Dict[str, Any],
+             task: str = "", fingerprint: Optional[str] = None) -> None:
+        """Record a node's output; it replaces any earlier output of the same node and task"""
+        blob = pickle.dumps(output, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO checkpoints
+                   (run_key, commit_sha, node, task, output, fingerprint, completed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (key, commit, node, task, blob, fingerprint, time.time())
+            )
+
+    def completed(self, key: str, commit: str) -> List[Tuple[str, str]]:
+        """(node, task) pairs already completed for a run and commit, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT node, task FROM checkpoints WHERE run_key = ? AND commit_sha IN (?, '') ORDER BY completed_at",
+                (key, commit)
+            ).fetchall()
+        return [(r["node"], r["task"]) for r in rows]
+
+    def clear(self, key: str) -> None:
+        """Forget every checkpoint of a run"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoints WHERE run_key = ?", (key,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,93 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .build_runner import BuildRunner
+from .jacoco_xml_analyzer import JacocoXMLAnalyzer
+
+@dataclass
+class CoverageGain:
+    test_class: str
+    added_lines: Dict[str, List[int]] = field(default_factory=dict)
+    added_branches: int = 0
+    error: Optional[str] = None
+
+    @property
+    def total_added_lines(self) -> int:
+        return sum(len(lines) for lines in self.added_lines.values())
+
+    @property
+    def has_gain(self) -> bool:
+        return self.total_added_lines > 0 or self.added_branches > 0
+
+def compute_gain(baseline: JacocoXMLAnalyzer, measured: JacocoXMLAnalyzer, test_class: str) -> CoverageGain:
+    """
+    Compare the coverage of one test class against the baseline report.
+
+    A line counts as added when the test covers instructions on it that the baseline
+    left entirely uncovered. Branches are counted per line as the number of covered
+    branches beyond the baseline's, since JaCoCo reports only counts, not which branch.
+    """
+    baseline_lines = baseline.get_line_coverage()
+    gain = CoverageGain(test_class=test_class)
+    for source_file, lines in measured.get_line_coverage().items():
+        base_file = baseline_lines.get(source_file, {})
+        added = []
+        for line_number, line in lines.items():
+            base = base_file.get(line_number)
+            if line.instructions_covered > 0 and (base is None or base.instructions_covered == 0):
+                added.append(line_number)
+            base_branches = base.branches_covered if base else 0
+            gain.added_branches += max(0, line.branches_covered - base_branches)
+        if added:
+            gain.added_lines[source_file] = sorted(added)
+    return gain
+
+def measure_coverage_gain(
+    project_dir: str,
+    test_classes: List[str],
+    baseline_xml: Optional[str] = None,
+    runner: Optional[BuildRunner] = None,
+    module_dir: Optional[str] = None
+) -> List[CoverageGain]:
+    """
+    Run each test class on its own with a dedicated JaCoCo exec file and measure its coverage gain.
+
+    Args:
+        project_dir (str): Path to the Maven project (JaCoCo's prepare-agent must be bound in its pom, as for run_jacoco).
+        test_classes (List[str]): Test classes to measure, e.g. ["FooTest"].
+        baseline_xml (Optional[str]): Baseline jacoco.xml; defaults to the report written by run_jacoco.
+        runner (Optional[BuildRunner]): Build command to use; detected when None.
+        module_dir (Optional[str]): Module (relative to project_dir) that owns the tests.
+
+    Returns:
+        List[CoverageGain]: One entry per test class; 'error' is set when it could not be measured.
+    """
+    runner = runner or BuildRunner.detect(project_dir)
+    module_root = os.path.join(os.path.abspath(project_dir), module_dir or "")
+    baseline = JacocoXMLAnalyzer(baseline_xml or os.path.join(module_root, "target", "site", "jacoco", "jacoco.xml"))
+
+    gains = []
+    for test_class in test_classes:
+        work_dir = os.path.join(module_root, "target", "coverage-gain", test_class)
+        exec_file = os.path.join(work_dir, "jacoco.exec")
+        if os.path.exists(exec_file):
+            os.remove(exec_file)
+        args = [
+            "test", "jacoco:report", "-B",
+            f"-Dtest={test_class}",
+            "-Dsurefire.failIfNoSpecifiedTests=false",
+            "-DfailIfNoTests=false",
+            f"-Djacoco.destFile={exec_file}",
+            f"-Djacoco.dataFile={exec_file}",
+            f"-Djacoco.outputDirectory={work_dir}",
+        ]
+        if module_dir:
+            args += ["-pl", module_dir, "-am"]
+        result = runner.run(args, cwd=project_dir)
+        report_path = os.path.join(work_dir, "jacoco.xml")
+        if result.returncode != 0 or not os.path.exists(report_path):
+            gains.append(CoverageGain(test_class=test_class, error=f"Coverage run failed with exit code {result.returncode}"))
+            continue
+        gains.append(compute_gain(baseline, JacocoXMLAnalyzer(report_path), test_class))
+    return gains
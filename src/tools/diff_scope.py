@@ -0,0 +1,116 @@
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+if TYPE_CHECKING:
+    import git
+
+# "@@ -12,3 +14,5 @@" -> new-file start 14, length 5 (length defaults to 1)
+_HUNK_HEADER = re.compile(rb"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@", re.MULTILINE)
+
+@dataclass
+class DiffScope:
+    """Lines added or modified between two commits, per repository-relative file path."""
+    base: str
+    head: str
+    changed_lines: Dict[str, List[Tuple[int, int]]] = field(default_factory=dict)
+
+    def ranges_for(self, source_path: str) -> List[Tuple[int, int]]:
+        """
+        Changed line ranges of a file.
+
+        source_path may be a full repository-relative path or a JaCoCo-style
+        'package/SourceFile.java' suffix, which matches the file in any source root.
+        """
+        source_path = source_path.replace("\\", "/").lstrip("/")
+        if source_path in self.changed_lines:
+            return self.changed_lines[source_path]
+        ranges = []
+        for path, path_ranges in self.changed_lines.items():
+            if path.endswith("/" + source_path):
+                ranges.extend(path_ranges)
+        return ranges
+
+    def touches(self, source_path: str) -> bool:
+        return bool(self.ranges_for(source_path))
+
+    def overlaps(self, source_path: str, start_line: int, end_line: int) -> bool:
+        return any(start <= end_line and end >= start_line for start, end in self.ranges_for(source_path))
+
+    def filter_lines(self, source_path: str, lines: Iterable[int]) -> List[int]:
+        """Keep only the lines that fall inside a changed range"""
+        ranges = self.ranges_for(source_path)
+        return [line for line in lines if any(start <= line <= end for start, end in ranges)]
+
+def _resolve(repo: "git.Repo", ref: str) -> "git.Commit":
+    """Resolve ref, fetching it from origin first if a shallow or single-branch clone lacks it"""
+    import git
+    try:
+        return repo.commit(ref)
+    except (git.BadName, ValueError):
+        pass
+    if ref.startswith("origin/"):
+        # A remote-tracking ref: fetch the branch into it, origin has no 'origin/<branch>'
+        branch = ref[len("origin/"):]
+        repo.git.fetch("origin", f"+refs/heads/{branch}:refs/remotes/origin/{branch}")
+        return repo.commit(ref)
+    repo.git.fetch("origin", ref)
+    return repo.commit("FETCH_HEAD")
+
+def _merge_base(repo: "git.Repo", base: "git.Commit", head: "git.Commit") -> "git.Commit":
+    """
+    The commit head branched off base at, deepening a shallow clone until it is
+    found; base itself when the histories share no commit.
+    """
+    bases = repo.merge_base(base, head)
+    if not bases and os.path.exists(os.path.join(repo.git_dir, "shallow")):
+        repo.git.fetch("--unshallow", "origin")
+        bases = repo.merge_base(base, head)
+    if not bases:
+        logging.warning(f"No merge base between {base.hexsha[:10]} and {head.hexsha[:10]}; diffing against {base.hexsha[:10]}")
+        return base
+    return bases[0]
+
+def _changed_ranges(patch: bytes) -> List[Tuple[int, int]]:
+    ranges = []
+    for match in _HUNK_HEADER.finditer(patch):
+        start = int(match.group(1))
+        length = int(match.group(2)) if match.group(2) is not None else 1
+        if length == 0:
+            # Pure deletion: the surrounding line is the one whose behaviour changed
+            ranges.append((max(start, 1), max(start, 1)))
+        else:
+            ranges.append((start, start + length - 1))
+    return ranges
+
+def compute_diff_scope(repo_dir: str, base: str, head: str = "HEAD", suffix: str = ".java") -> DiffScope:
+    """
+    Compute the Java lines changed on head since it branched off base.
+
+    Like 'git diff base...head', the diff starts at the merge base, so commits
+    that landed on base after the branch point are not counted as changes.
+
+    Args:
+        repo_dir (str): Path to the Git checkout.
+        base (str): The ref the change is compared against, e.g. 'origin/main'.
+        head (str): The ref containing the change (default: 'HEAD').
+        suffix (str): Only files with this suffix are included (default: '.java').
+
+    Returns:
+        DiffScope: Changed line ranges, keyed by path relative to the repository root.
+    """
+    # GitPython is only imported when a diff is computed, so importing the pipeline stays cheap
+    import git
+    repo = git.Repo(repo_dir)
+    head_commit = _resolve(repo, head)
+    base_commit = _merge_base(repo, _resolve(repo, base), head_commit)
+    scope = DiffScope(base=base_commit.hexsha, head=head_commit.hexsha)
+    for diff in base_commit.diff(head_commit, create_patch=True, unified=0):
+        if diff.deleted_file or not diff.b_path or not diff.b_path.endswith(suffix):
+            continue
+        ranges = _changed_ranges(diff.diff or b"")
+        if ranges:
+            scope.changed_lines[diff.b_path] = ranges
+    return scope
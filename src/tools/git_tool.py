@@ -1,27 +1,127 @@
 import os
+import re
 import shutil
 import tempfile
-from typing import Dict
-import git
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
-def clone_repo(inputs: Dict[str, str]) -> Dict[str, str]:
+if TYPE_CHECKING:
+    import git
+
+from .mirror_cache import MirrorCache
+
+def _strip_credentials(url: str) -> str:
+    """Remove any 'user[:token]@' part from an HTTPS URL so remotes can be compared."""
+    return re.sub(r"^(https?://)[^/@]+@", r"\1", url).rstrip("/")
+
+def _is_commit_sha(ref: str) -> bool:
+    return re.fullmatch(r"[0-9a-f]{7,40}", ref) is not None
+
+def _default_branch(repo: "git.Repo") -> Optional[str]:
+    """The branch origin/HEAD points at, else the currently checked out branch."""
+    import git
+    try:
+        return repo.git.rev_parse("--abbrev-ref", "origin/HEAD").split("/", 1)[1]
+    except (git.GitCommandError, IndexError):
+        pass
+    try:
+        return repo.active_branch.name
+    except TypeError:
+        return None
+
+def _fetch_options(depth: Optional[int], clone_filter: Optional[str]) -> Dict[str, Any]:
+    options: Dict[str, Any] = {}
+    if depth:
+        options["depth"] = depth
+    if clone_filter:
+        options["filter"] = clone_filter
+    return options
+
+def _update_clone(repo: "git.Repo", auth_url: str, ref: Optional[str], depth: Optional[int],
+                  clone_filter: Optional[str], fetch_from: Optional[str] = None) -> None:
+    """Bring an existing clone to the requested ref, discarding local changes but keeping ignored build output."""
+    repo.remotes.origin.set_url(auth_url)
+    ref = ref or _default_branch(repo)
+    source = fetch_from or "origin"
+    fetch_args = [source, ref] if ref else [source]
+    repo.git.fetch(*fetch_args, **_fetch_options(depth, clone_filter))
+    repo.git.reset("--hard", "FETCH_HEAD")
+    # Removes generated tests and other untracked files, but keeps ignored files and
+    # build output so incremental builds can reuse it
+    repo.git.clean("-fd", "-e", "target/")
+
+def _fresh_clone(auth_url: str, target_dir: str, ref: Optional[str], depth: Optional[int],
+                 clone_filter: Optional[str], single_branch: bool) -> "git.Repo":
+    import git
+    options = _fetch_options(depth, clone_filter)
+    if single_branch:
+        options["single_branch"] = True
+    if ref and not _is_commit_sha(ref):
+        options["branch"] = ref
+    repo = git.Repo.clone_from(auth_url, target_dir, **options)
+    if ref and _is_commit_sha(ref):
+        repo.git.fetch("origin", ref, **_fetch_options(depth, clone_filter))
+        repo.git.checkout("--detach", "FETCH_HEAD")
+    return repo
+
+def _checkout(repo_url: str, auth_url: str, target_dir: str, ref: Optional[str], depth: Optional[int],
+              clone_filter: Optional[str], single_branch: bool, reuse: bool,
+              source_url: Optional[str]) -> Tuple["git.Repo", str]:
+    """Reuse the clone in target_dir if possible, otherwise clone afresh; source_url overrides where objects come from."""
+    # GitPython is only imported once a clone is needed, so importing the pipeline stays cheap
+    import git
+    def handle_remove_readonly(func, path, exc_info):
+        """Forcefully remove read-only files."""
+        os.chmod(path, 0o777)
+        func(path)
+
+    if reuse and os.path.isdir(os.path.join(target_dir, ".git")):
+        try:
+            repo = git.Repo(target_dir)
+            if _strip_credentials(repo.remotes.origin.url) == _strip_credentials(repo_url):
+                _update_clone(repo, auth_url, ref, depth, clone_filter, fetch_from=source_url)
+                return repo, "reuse"
+        except (git.GitCommandError, git.InvalidGitRepositoryError, AttributeError) as e:
+            print(f"Could not reuse existing clone, cloning again: {e}")
+
+    if os.path.exists(target_dir):
+        shutil.rmtree(target_dir, onerror=handle_remove_readonly)
+    repo = _fresh_clone(source_url or auth_url, target_dir, ref, depth, clone_filter, single_branch)
+    if source_url:
+        repo.remotes.origin.set_url(auth_url)
+    flags = [f"depth={depth}" if depth else "full", f"filter={clone_filter}" if clone_filter else None,
+             "single-branch" if single_branch else None]
+    return repo, "clone(" + ", ".join(flag for flag in flags if flag) + ")"
+
+def clone_repo(inputs: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Clone a Git repository to a local directory.
+    Clone a Git repository to a local directory, or update an existing clone of it.
 
     Args:
-        inputs (Dict[str, str]): A dictionary containing the key 'repo_url', which specifies the URL of the Git repository to clone.
+        inputs (Dict[str, Any]): A dictionary containing the key 'repo_url', which specifies the URL of the Git repository to clone.
+            Optional keys:
+            - 'ref': branch, tag or commit SHA to check out (default: the remote's default branch).
+            - 'depth': create a shallow clone with this many commits, e.g. 1.
+            - 'filter': partial-clone filter, e.g. 'blob:none' for a blobless clone.
+            - 'single_branch': only fetch the requested (or default) branch.
+            - 'reuse': update an existing clone of the same repository with fetch + hard reset
+              instead of deleting it (default: True).
+            - 'target_dir': where to clone (default: 'cloned_repo' in the working directory).
+            - 'mirror_cache': True (or a MirrorCache) to clone and fetch through a local bare
+              mirror that is refreshed incrementally; also enabled by GIT_MIRROR_CACHE=1.
 
     Returns:
-        Dict[str, str]: A dictionary containing the key 'project_dir', which specifies the path to the cloned repository.
+        Dict[str, Any]: A dictionary containing the key 'project_dir', which specifies the path to the cloned repository,
+            'commit', the checked out commit SHA, and 'clone_timing', the mode used and how long it took.
     """
     repo_url = inputs.get('repo_url')
     if not repo_url:
         raise ValueError("GIT repository URL not provided")
-
-    def handle_remove_readonly(func, path, exc_info):
-        """Forcefully remove read-only files."""
-        os.chmod(path, 0o777)
-        func(path)
+    ref = inputs.get('ref')
+    depth = inputs.get('depth')
+    clone_filter = inputs.get('filter')
+    single_branch = bool(inputs.get('single_branch', False))
+    reuse = inputs.get('reuse', True)
 
     token = os.getenv("GIT_TOKEN")
     # Inject token for HTTPS
@@ -31,9 +131,25 @@ def clone_repo(inputs: Dict[str, str]) -> Dict[str, str]:
     else:
         auth_url = repo_url
 
-    target_dir = os.path.join(os.getcwd(), 'cloned_repo')
-    if os.path.exists(target_dir):
-        shutil.rmtree(target_dir, onerror=handle_remove_readonly)
+    target_dir = inputs.get('target_dir') or os.path.join(os.getcwd(), 'cloned_repo')
+    started = time.perf_counter()
+
+    mirror_cache = inputs.get('mirror_cache')
+    if mirror_cache is None:
+        mirror_cache = os.getenv("GIT_MIRROR_CACHE", "").lower() in ("1", "true", "yes")
+    if mirror_cache:
+        cache = mirror_cache if isinstance(mirror_cache, MirrorCache) else MirrorCache()
+        # The mirror stays locked (safe from eviction) while we clone or fetch from it
+        with cache.use(repo_url, auth_url) as source_url:
+            repo, mode = _checkout(repo_url, auth_url, target_dir, ref, depth, clone_filter, single_branch, reuse, source_url)
+        mode = f"mirror+{mode}"
+    else:
+        repo, mode = _checkout(repo_url, auth_url, target_dir, ref, depth, clone_filter, single_branch, reuse, None)
 
-    git.Repo.clone_from(auth_url, target_dir)
-    return {'project_dir': target_dir}
\ No newline at end of file
+    elapsed = time.perf_counter() - started
+    print(f"Repository ready in {elapsed:.2f}s using {mode}")
+    return {
+        'project_dir': target_dir,
+        'commit': repo.head.commit.hexsha,
+        'clone_timing': {'mode': mode, 'seconds': round(elapsed, 3)}
+    }
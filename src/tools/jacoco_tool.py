@@ -1,15 +1,91 @@
+import hashlib
+import json
 import os
 import subprocess
-import shutil
-from typing import Dict
+from typing import Dict, Iterator, Optional
 
-def run_jacoco(project_dir: str, report_dir: str = "site/jacoco") -> str:
+from .build_runner import BuildRunner
+from .metrics import count
+
+FINGERPRINT_FILE = "coverage-fingerprint.json"
+
+def _input_files(project_dir: str) -> Iterator[str]:
+    """Every pom.xml plus everything under each module's src/, in a stable order"""
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = sorted(d for d in dirs if d not in ("target", ".git"))
+        relative_root = os.path.relpath(root, project_dir)
+        in_src = "src" in relative_root.split(os.sep)
+        for name in sorted(files):
+            if name == "pom.xml" or in_src:
+                yield os.path.join(root, name)
+
+def source_fingerprint(project_dir: str) -> str:
+    """
+    Hash the inputs of a coverage run: every pom.xml plus everything under each module's src/.
+
+    Args:
+        project_dir (str): Path to the project directory.
+
+    Returns:
+        str: Hex SHA-256 over the relative paths and contents of those files.
+    """
+    digest = hashlib.sha256()
+    for path in _input_files(project_dir):
+        digest.update(os.path.relpath(path, project_dir).replace(os.sep, "/").encode("utf8"))
+        digest.update(b"\0")
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _file_set_digest(project_dir: str) -> str:
+    """Hash only the paths of the coverage inputs; it changes when a source is added, deleted or renamed"""
+    digest = hashlib.sha256()
+    for path in _input_files(project_dir):
+        digest.update(os.path.relpath(path, project_dir).replace(os.sep, "/").encode("utf8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def _read_fingerprint(project_dir: str) -> Dict:
+    try:
+        with open(os.path.join(project_dir, "target", FINGERPRINT_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _cached_report(project_dir: str, report_dir: str, fingerprint: str) -> Optional[str]:
+    """Return the report of the last successful run if it was produced from identical sources"""
+    cached = _read_fingerprint(project_dir)
+    report_path = os.path.join(project_dir, "target", report_dir, "index.html")
+    if cached.get("fingerprint") == fingerprint and cached.get("report_dir") == report_dir and os.path.exists(report_path):
+        return report_path
+    return None
+
+def _remove_execution_data(project_dir: str) -> None:
+    """Delete jacoco.exec files; the JaCoCo agent appends to them, which would merge stale coverage"""
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        if os.path.basename(root) == "target" and "jacoco.exec" in files:
+            os.remove(os.path.join(root, "jacoco.exec"))
+
+def run_jacoco(
+    project_dir: str,
+    report_dir: str = "site/jacoco",
+    runner: Optional[BuildRunner] = None,
+    incremental: bool = False
+) -> str:
     """
     Run JaCoCo code coverage analysis using Maven.
 
     Args:
         project_dir (str): Path to the project directory.
         report_dir (str): Relative path to the coverage report directory (default: "site/jacoco").
+        runner (Optional[BuildRunner]): Build command to use; detected (mvnd, mvnw, then mvn) when None.
+        incremental (bool): Skip 'clean' and reuse compiled classes. If src/ and pom.xml are unchanged
+            since the last successful run, Maven is not invoked at all and the existing report is returned.
+            When files were added, deleted or renamed since then, the build still cleans, so classes
+            of removed sources do not linger in target/classes and show up in the report.
 
     Returns:
         str: Path to the generated coverage report.
@@ -22,19 +98,30 @@ def run_jacoco(project_dir: str, report_dir: str = "site/jacoco") -> str:
     if not os.path.isdir(project_dir):
         raise NotADirectoryError(f"The directory {project_dir} does not exist or is invalid.")
 
-    mvn_path = shutil.which("mvn")
-    if not mvn_path:
-        raise FileNotFoundError("Maven executable not found. Ensure Maven is installed and added to PATH.")
+    fingerprint = source_fingerprint(project_dir)
+    file_set = _file_set_digest(project_dir)
+    goals = ["clean", "test", "jacoco:report", "-B"]
+    if incremental:
+        cached_report = _cached_report(project_dir, report_dir, fingerprint)
+        if cached_report:
+            print(f"Sources unchanged since the last coverage run, reusing {cached_report}")
+            count("cache_hit", "jacoco_report")
+            return cached_report
+        if _read_fingerprint(project_dir).get("file_set") == file_set:
+            _remove_execution_data(project_dir)
+            goals.remove("clean")
+        else:
+            print("Source files were added, removed or renamed since the last coverage run, rebuilding from clean")
 
-    # Ensure the correct executable format for Windows
-    if not mvn_path.endswith(".cmd"):
-        mvn_path += ".cmd"
+    runner = runner or BuildRunner.detect(project_dir)
 
     try:
-        subprocess.run([mvn_path, "clean", "test", "jacoco:report"], cwd=project_dir, check=True)
+        runner.run(goals, cwd=project_dir, capture_output=False, check=True)
         report_path = os.path.join(project_dir, "target", report_dir, "index.html")
         if not os.path.exists(report_path):
             raise FileNotFoundError(f"Coverage report not found at {report_path}")
+        with open(os.path.join(project_dir, "target", FINGERPRINT_FILE), 'w', encoding='utf-8') as f:
+            json.dump({"fingerprint": fingerprint, "file_set": file_set, "report_dir": report_dir}, f)
         return report_path
     except subprocess.CalledProcessError as e:
         print(f"Error running JaCoCo: {e}")
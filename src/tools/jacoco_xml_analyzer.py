@@ -1,6 +1,7 @@
+import bisect
 import xml.etree.ElementTree as ET
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Dict, NamedTuple, Optional
 
 @dataclass
 class MethodCoverage:
@@ -15,6 +16,70 @@ class MethodCoverage:
     complexity_missed: int
     complexity_covered: int
 
+@dataclass
+class LineCoverage:
+    line: int
+    instructions_missed: int
+    instructions_covered: int
+    branches_missed: int
+    branches_covered: int
+
+    @property
+    def status(self) -> Optional[str]:
+        """'missed' when nothing on the line ran, 'partial' when some instructions or branches did not, else None"""
+        if self.instructions_missed and not self.instructions_covered and not self.branches_covered:
+            return "missed"
+        if self.instructions_missed or self.branches_missed:
+            return "partial"
+        return None
+
+class UncoveredRange(NamedTuple):
+    """
+    A run of missed or partially covered lines with the branch counters summed over
+    it. A tuple, so the many ranges of a large report stay small in memory and in
+    the pipeline state.
+    """
+    start: int
+    end: int
+    # Some instructions on the lines ran, but not all instructions or branches
+    partial: bool
+    branches_missed: int
+    branches_covered: int
+    # Reported lines in the range; the absorbed lines between them do not count
+    lines: int
+
+def line_ranges(lines: Iterable[LineCoverage], include: Optional[Callable[[int], bool]] = None,
+                method_lines: Iterable[int] = ()) -> List[UncoveredRange]:
+    """
+    Run-length encode the missed and partially covered lines. Consecutive reported
+    lines with the same status form one range, and the unreported lines between
+    them (blank lines, comments, braces) are absorbed. A covered line, a status
+    change, a line rejected by include or the start of another method (method_lines)
+    ends the range.
+    """
+    boundaries = sorted(method_lines)
+    ranges: List[UncoveredRange] = []
+    current: Optional[UncoveredRange] = None
+    for line in sorted(lines, key=lambda line: line.line):
+        status = line.status if include is None or include(line.line) else None
+        if status is None:
+            current = None
+            continue
+        partial = status == "partial"
+        if current is not None and current.partial == partial and (
+            bisect.bisect_right(boundaries, current.start) == bisect.bisect_right(boundaries, line.line)
+        ):
+            current = ranges[-1] = current._replace(
+                end=line.line,
+                branches_missed=current.branches_missed + line.branches_missed,
+                branches_covered=current.branches_covered + line.branches_covered,
+                lines=current.lines + 1
+            )
+        else:
+            current = UncoveredRange(line.line, line.line, partial, line.branches_missed, line.branches_covered, 1)
+            ranges.append(current)
+    return ranges
+
 @dataclass
 class ClassCoverage:
     name: str
@@ -27,6 +92,7 @@ class ClassCoverage:
     total_lines_missed: int
     total_lines_covered: int
     uncovered_lines: List[int]
+    line_ranges: List[UncoveredRange] = field(default_factory=list)
 
 class JacocoXMLAnalyzer:
     def __init__(self, xml_path: str):
@@ -35,7 +101,8 @@ class JacocoXMLAnalyzer:
         self.root = self.tree.getroot()
 
     def get_counter_values(self, element, counter_type: str) -> Dict[str, int]:
-        counter = element.find(f".//counter[@type='{counter_type}']")
+        # Only the element's own counter: a descendant search would return the first method's
+        counter = element.find(f"counter[@type='{counter_type}']")
         if counter is None:
             return {"missed": 0, "covered": 0}
         return {
@@ -43,14 +110,35 @@ class JacocoXMLAnalyzer:
             "covered": int(counter.get("covered", 0))
         }
 
+    @staticmethod
+    def _line(line_element) -> LineCoverage:
+        return LineCoverage(
+            line=int(line_element.get("nr", 0)),
+            instructions_missed=int(line_element.get("mi", 0)),
+            instructions_covered=int(line_element.get("ci", 0)),
+            branches_missed=int(line_element.get("mb", 0)),
+            branches_covered=int(line_element.get("cb", 0))
+        )
+
     def get_uncovered_lines(self, sourcefile_element) -> List[int]:
-        uncovered_lines = []
-        for line in sourcefile_element.findall("line"):
-            line_number = int(line.get("nr", 0))
-            missed_instructions = int(line.get("mi", 0))
-            if missed_instructions > 0:
-                uncovered_lines.append(line_number)
-        return uncovered_lines
+        """Lines with missed instructions or missed branches"""
+        return [
+            line.line for line in map(self._line, sourcefile_element.findall("line"))
+            if line.instructions_missed > 0 or line.branches_missed > 0
+        ]
+
+    def get_line_ranges(self, sourcefile_element, method_lines: Iterable[int] = ()) -> List[UncoveredRange]:
+        """The source file's missed and partially covered lines as run-length ranges (see line_ranges)"""
+        return line_ranges(map(self._line, sourcefile_element.findall("line")), method_lines=method_lines)
+
+    def get_line_coverage(self) -> Dict[str, Dict[int, LineCoverage]]:
+        """Per-line counters keyed by 'package/SourceFile.java' and line number"""
+        line_coverage = {}
+        for package in self.root.findall(".//package"):
+            for sourcefile in package.findall("sourcefile"):
+                lines = {line.line: line for line in map(self._line, sourcefile.findall("line"))}
+                line_coverage[f"{package.get('name', '')}/{sourcefile.get('name', '')}"] = lines
+        return line_coverage
 
     def analyze_method(self, method_element) -> MethodCoverage:
         name = method_element.get("name", "")
@@ -87,6 +175,7 @@ class JacocoXMLAnalyzer:
         lines = self.get_counter_values(class_element, "LINE")
         
         uncovered_lines = self.get_uncovered_lines(sourcefile_element)
+        ranges = self.get_line_ranges(sourcefile_element, [method.line for method in methods])
 
         return ClassCoverage(
             name=name,
@@ -98,7 +187,8 @@ class JacocoXMLAnalyzer:
             total_branches_covered=branch["covered"],
             total_lines_missed=lines["missed"],
             total_lines_covered=lines["covered"],
-            uncovered_lines=uncovered_lines
+            uncovered_lines=uncovered_lines,
+            line_ranges=ranges
         )
 
     def analyze_coverage(self) -> List[ClassCoverage]:
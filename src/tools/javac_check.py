@@ -0,0 +1,199 @@
+import glob
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .build_runner import BuildRunner
+from .cache_paths import cache_path
+
+# Stands for the project directory in cached classpaths
+_PROJECT_PLACEHOLDER = "${project}"
+
+# Serializes dependency resolution so parallel workers resolve a project only once
+_resolve_lock = threading.Lock()
+
+# Jars registering one are picked up by javac as annotation processors
+_PROCESSOR_SERVICE = "META-INF/services/javax.annotation.processing.Processor"
+
+# pom.xml content that configures annotation processing for the compiler plugin
+_PROCESSOR_POM_MARKERS = ("<annotationProcessorPaths>", "<annotationProcessors>", "org.projectlombok")
+
+@dataclass
+class CompileResult:
+    ok: bool
+    diagnostics: str
+    seconds: float
+
+def _project_poms(project_dir: str) -> List[str]:
+    return [pom for pom in sorted(glob.glob(os.path.join(project_dir, "**", "pom.xml"), recursive=True))
+            if f"{os.sep}target{os.sep}" not in pom]
+
+def _poms_digest(project_dir: str) -> str:
+    """Hash every pom.xml of the project; the dependency classpath only changes with them"""
+    digest = hashlib.sha256()
+    for pom in _project_poms(project_dir):
+        digest.update(os.path.relpath(pom, project_dir).encode("utf8"))
+        with open(pom, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+class JavacChecker:
+    """
+    Compiles a single generated test with javac against the module's test classpath.
+
+    The dependency part of the classpath is resolved once with
+    'mvn dependency:build-classpath' and cached on disk, keyed by the content of
+    the project's pom.xml files, so later checks (and later runs) only pay for javac.
+    Entries inside the project are cached relative to it and rebased on load.
+    Main and test classes already compiled under target/ are added to the classpath.
+
+    A failed resolution is remembered as well, so it is not retried until a pom.xml
+    changes. Projects using annotation processors (Lombok, MapStruct, ...) are not
+    checked: sources javac loads from the source path are never processed, so their
+    generated members would show up as false "cannot find symbol" errors.
+    """
+
+    def __init__(self, project_dir: str, module_dir: Optional[str] = None, runner: Optional[BuildRunner] = None):
+        self.project_dir = os.path.abspath(project_dir)
+        self.module_dir = module_dir
+        self.runner = runner or BuildRunner.detect(project_dir)
+        self.javac = shutil.which("javac")
+        self._dependency_classpath: Optional[str] = None
+        self._resolve_failed = False
+        self._uses_processors: Optional[bool] = None
+
+    @property
+    def available(self) -> bool:
+        if self.javac is None or self.dependency_classpath() is None:
+            return False
+        if self.uses_annotation_processors():
+            logging.info(f"{self.project_dir} uses annotation processors; skipping javac pre-checks")
+            return False
+        return True
+
+    def dependency_classpath(self) -> Optional[str]:
+        """Resolve (or load from cache) the module's test-scope dependency classpath"""
+        if self._dependency_classpath is not None or self._resolve_failed:
+            return self._dependency_classpath
+        key = hashlib.sha256(f"{_poms_digest(self.project_dir)}:{self.module_dir}".encode("utf8")).hexdigest()
+        cached_file = cache_path("classpaths", f"{key}.txt")
+        failed_marker = cache_path("classpaths", f"{key}.failed")
+        with _resolve_lock:
+            if os.path.exists(failed_marker):
+                self._resolve_failed = True
+                return None
+            if not os.path.exists(cached_file):
+                args = ["dependency:build-classpath", "-B", "-q",
+                        "-Dmdep.includeScope=test", f"-Dmdep.outputFile={cached_file}.tmp"]
+                if self.module_dir:
+                    # Upstream modules build first, so the owning module writes the file last
+                    args += ["-pl", self.module_dir, "-am"]
+                result = self.runner.run(args, cwd=self.project_dir)
+                if result.returncode != 0 or not os.path.exists(f"{cached_file}.tmp"):
+                    logging.warning(f"Could not resolve the test classpath for {self.project_dir}; skipping javac pre-checks")
+                    with open(failed_marker, 'w', encoding='utf-8') as f:
+                        f.write(f"exit code {result.returncode}\n")
+                    self._resolve_failed = True
+                    return None
+                with open(f"{cached_file}.tmp", 'r', encoding='utf-8') as f:
+                    classpath = f.read().strip()
+                with open(f"{cached_file}.tmp", 'w', encoding='utf-8') as f:
+                    f.write(self._relativize(classpath))
+                os.replace(f"{cached_file}.tmp", cached_file)
+        with open(cached_file, 'r', encoding='utf-8') as f:
+            self._dependency_classpath = self._rebase(f.read().strip())
+        return self._dependency_classpath
+
+    def uses_annotation_processors(self) -> bool:
+        """Whether the poms configure annotation processing or a dependency provides a processor"""
+        if self._uses_processors is None:
+            self._uses_processors = self._poms_configure_processors() or self._classpath_has_processor()
+        return self._uses_processors
+
+    def _poms_configure_processors(self) -> bool:
+        for pom in _project_poms(self.project_dir):
+            with open(pom, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+            if any(marker in content for marker in _PROCESSOR_POM_MARKERS):
+                return True
+        return False
+
+    def _classpath_has_processor(self) -> bool:
+        for entry in (self.dependency_classpath() or "").split(os.pathsep):
+            if not entry.endswith(".jar") or not os.path.isfile(entry):
+                continue
+            try:
+                with zipfile.ZipFile(entry) as jar:
+                    if _PROCESSOR_SERVICE in jar.namelist():
+                        return True
+            except (OSError, zipfile.BadZipFile):
+                continue
+        return False
+
+    def _relativize(self, classpath: str) -> str:
+        """
+        Store entries inside the project (sibling modules' output) relative to it, so
+        the cached classpath also fits other copies of the checkout, e.g. validation
+        workspaces, whose poms are identical
+        """
+        prefix = self.project_dir + os.sep
+        return os.pathsep.join(
+            _PROJECT_PLACEHOLDER + os.sep + entry[len(prefix):] if entry.startswith(prefix) else entry
+            for entry in classpath.split(os.pathsep) if entry
+        )
+
+    def _rebase(self, classpath: str) -> str:
+        """Resolve the project-relative entries of a cached classpath against this checkout"""
+        return os.pathsep.join(
+            os.path.join(self.project_dir, entry[len(_PROJECT_PLACEHOLDER) + 1:])
+            if entry.startswith(_PROJECT_PLACEHOLDER + os.sep) else entry
+            for entry in classpath.split(os.pathsep) if entry
+        )
+
+    def _project_classpath(self) -> List[str]:
+        """Compiled output of every module, with the owning module's first"""
+        module_root = os.path.join(self.project_dir, self.module_dir or "")
+        entries = [os.path.join(module_root, "target", "test-classes"), os.path.join(module_root, "target", "classes")]
+        for classes_dir in sorted(glob.glob(os.path.join(self.project_dir, "**", "target", "classes"), recursive=True)):
+            if classes_dir not in entries:
+                entries.append(classes_dir)
+        return entries
+
+    def _source_path(self) -> List[str]:
+        module_root = os.path.join(self.project_dir, self.module_dir or "")
+        return [os.path.join(module_root, "src", "test", "java"), os.path.join(module_root, "src", "main", "java")]
+
+    def check(self, test_file: str) -> CompileResult:
+        """
+        Compile test_file on its own, discarding the output.
+
+        Returns:
+            CompileResult: Whether it compiled, javac's diagnostics and how long it took.
+        """
+        started = time.time()
+        dependency_classpath = self.dependency_classpath() or ""
+        classpath = os.pathsep.join(self._project_classpath() + ([dependency_classpath] if dependency_classpath else []))
+        with tempfile.TemporaryDirectory(prefix="javac-") as output_dir:
+            result = subprocess.run(
+                [self.javac, "-d", output_dir, "-cp", classpath,
+                 "-sourcepath", os.pathsep.join(self._source_path()),
+                 # Referenced sources are only type-checked, never written out
+                 "-implicit:none", "-proc:none", "-nowarn", "-Xlint:none",
+                 "-encoding", "UTF-8", "-Xmaxerrs", "50", test_file],
+                capture_output=True,
+                text=True,
+                timeout=300
+            )
+        return CompileResult(
+            ok=result.returncode == 0,
+            diagnostics=(result.stderr or result.stdout).strip(),
+            seconds=time.time() - started
+        )
@@ -0,0 +1,50 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+_lock = threading.Lock()
+_maven_slots: Optional[threading.BoundedSemaphore] = None
+_llm_slots: Optional[threading.BoundedSemaphore] = None
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+def configure_limits(maven_slots: Optional[int] = None, llm_concurrency: Optional[int] = None) -> None:
+    """
+    Set how many Maven builds and LLM requests may run at once across all pipeline runs in this process.
+
+    Args:
+        maven_slots (Optional[int]): Concurrent Maven/mvnd invocations (default: MAVEN_SLOTS, else the CPU count).
+        llm_concurrency (Optional[int]): Concurrent LLM requests (default: LLM_CONCURRENCY, else 4).
+    """
+    with _lock:
+        _configure(maven_slots, llm_concurrency)
+
+def _configure(maven_slots: Optional[int], llm_concurrency: Optional[int]) -> None:
+    global _maven_slots, _llm_slots
+    _maven_slots = threading.BoundedSemaphore(maven_slots or _env_int("MAVEN_SLOTS", os.cpu_count() or 1))
+    _llm_slots = threading.BoundedSemaphore(llm_concurrency or _env_int("LLM_CONCURRENCY", 4))
+
+def _semaphores():
+    with _lock:
+        if _maven_slots is None or _llm_slots is None:
+            _configure(None, None)
+        return _maven_slots, _llm_slots
+
+@contextmanager
+def maven_slot() -> Iterator[None]:
+    """Hold one of the shared Maven slots for the duration of a build"""
+    semaphore = _semaphores()[0]
+    with semaphore:
+        yield
+
+@contextmanager
+def llm_slot() -> Iterator[None]:
+    """Hold one of the shared LLM request slots for the duration of a call"""
+    semaphore = _semaphores()[1]
+    with semaphore:
+        yield
@@ -0,0 +1,76 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from .surefire_parser import _matches_class
+
+# "[ERROR] Tests run: 3, Failures: 1, Errors: 0, Skipped: 0, Time elapsed: 0.1 s <<< FAILURE! - in com.x.FooTest"
+_CLASS_FAILURE = re.compile(r"Tests run:.*<<< (?:FAILURE|ERROR)!.* - in (?P<class_name>\S+)")
+# "[INFO] 2 errors" closes the compiler's diagnostic block
+_COMPILER_SUMMARY = re.compile(r"^\[INFO\] \d+ errors?\s*$")
+_TEST_BLOCK_END = ("[INFO] Running ", "[INFO] Results", "[INFO] Tests run:", "[ERROR] Tests run:")
+
+@dataclass
+class StreamResult:
+    returncode: int
+    aborted: bool
+    reason: Optional[str]
+    excerpt: str
+    log_path: str
+
+    def read_log(self) -> Iterable[str]:
+        """Iterate over the spooled build log without loading it all at once"""
+        with open(self.log_path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+class FailureWatcher:
+    """
+    Watches Maven output line by line and decides when the build can be stopped.
+
+    The build is worth stopping once the compiler reports errors or a test class
+    matching target_class (simple or fully qualified name,
+    nested classes included) reports failures. The watcher first collects the
+    diagnostics that follow (compiler messages or failure stack traces, up to
+    max_lines) so they can go straight into a correction prompt.
+    """
+
+    def __init__(self, target_class: Optional[str] = None, max_lines: int = 200):
+        self.target_class = target_class
+        self.max_lines = max_lines
+        self.reason: Optional[str] = None
+        self.lines: List[str] = []
+        self._collecting: Optional[str] = None
+
+    def feed(self, line: str) -> bool:
+        """Process one line of output; returns True when the build should be aborted"""
+        if self._collecting is None:
+            if "COMPILATION ERROR" in line:
+                self._collecting = "compilation error"
+                self.lines = [line]
+                return False
+            match = _CLASS_FAILURE.search(line)
+            if match and (self.target_class is None or _matches_class(match.group("class_name"), self.target_class)):
+                self._collecting = f"test failure in {match.group('class_name')}"
+                self.lines = [line]
+            return False
+
+        if self._block_ended(line) or len(self.lines) >= self.max_lines:
+            self.reason = self._collecting
+            return True
+        self.lines.append(line)
+        return False
+
+    def finish(self) -> None:
+        """Mark a block that was still being collected when the output ended"""
+        if self._collecting and not self.reason:
+            self.reason = self._collecting
+
+    @property
+    def excerpt(self) -> str:
+        return "\n".join(self.lines)
+
+    def _block_ended(self, line: str) -> bool:
+        if self._collecting == "compilation error":
+            return bool(_COMPILER_SUMMARY.match(line)) or "BUILD FAILURE" in line
+        return line.startswith(_TEST_BLOCK_END)
@@ -0,0 +1,110 @@
+import os
+import subprocess
+from typing import List, Optional
+
+from .build_runner import BuildRunner
+from .maven_stream import FailureWatcher, StreamResult
+
+# Plugins that add nothing to a pass/fail answer for a single test class
+FAST_TEST_FLAGS = [
+    "-Djacoco.skip=true",
+    "-Dcheckstyle.skip=true",
+    "-Dspotbugs.skip=true",
+    "-Dpmd.skip=true",
+    "-Denforcer.skip=true",
+    "-Dmaven.javadoc.skip=true",
+]
+
+def find_module_dir(project_dir: str, path: str) -> Optional[str]:
+    """
+    Find the Maven module that owns a file.
+
+    Args:
+        project_dir (str): Root of the Maven project.
+        path (str): A file inside the project, e.g. a generated test.
+
+    Returns:
+        Optional[str]: The module directory relative to project_dir, or None when the
+        file belongs to the root project.
+    """
+    root = os.path.abspath(project_dir)
+    current = os.path.dirname(os.path.abspath(path))
+    while current.startswith(root) and current != root:
+        if os.path.isfile(os.path.join(current, "pom.xml")):
+            return os.path.relpath(current, root)
+        current = os.path.dirname(current)
+    return None
+
+def test_selector(test_classes: List[str], test_methods: Optional[List[str]] = None) -> str:
+    """
+    Build a Surefire -Dtest selector.
+
+    Methods are only applied when a single class is selected, producing
+    'FooTest#testA+testB'; otherwise classes are joined with commas.
+    """
+    if test_methods and len(test_classes) == 1:
+        return f"{test_classes[0]}#{'+'.join(test_methods)}"
+    return ",".join(test_classes)
+
+def maven_test_args(
+    test_classes: Optional[List[str]] = None,
+    test_methods: Optional[List[str]] = None,
+    module_dir: Optional[str] = None
+) -> List[str]:
+    """
+    Build the Maven arguments for a test run.
+
+    Without test_classes this is the full 'test -B' suite. With test_classes only the
+    selected classes run, unrelated modules are skipped via '-pl <module> -am', and no
+    'clean' is issued so the compiler reuses existing output under target/.
+    """
+    args = ["test", "-B"]
+    if not test_classes:
+        return args
+    args += [
+        f"-Dtest={test_selector(test_classes, test_methods)}",
+        "-Dsurefire.failIfNoSpecifiedTests=false",
+        "-DfailIfNoTests=false",
+        *FAST_TEST_FLAGS,
+    ]
+    if module_dir:
+        args += ["-pl", module_dir, "-am"]
+    return args
+
+def run_tests(
+    project_dir: str,
+    test_classes: Optional[List[str]] = None,
+    test_methods: Optional[List[str]] = None,
+    module_dir: Optional[str] = None,
+    runner: Optional[BuildRunner] = None
+) -> subprocess.CompletedProcess:
+    """
+    Run Maven tests, optionally restricted to specific test classes or methods.
+
+    Args:
+        project_dir (str): Path to the Maven project.
+        test_classes (Optional[List[str]]): Test class names to run; None runs the full suite.
+        test_methods (Optional[List[str]]): Test methods to run within a single selected class.
+        module_dir (Optional[str]): Module (relative to project_dir) that owns the tests.
+        runner (Optional[BuildRunner]): Build command to use; detected when None.
+
+    Returns:
+        subprocess.CompletedProcess: The finished Maven process with captured text output.
+    """
+    runner = runner or BuildRunner.detect(project_dir)
+    return runner.run(maven_test_args(test_classes, test_methods, module_dir), cwd=project_dir)
+
+def stream_tests(
+    project_dir: str,
+    test_classes: Optional[List[str]] = None,
+    test_methods: Optional[List[str]] = None,
+    module_dir: Optional[str] = None,
+    runner: Optional[BuildRunner] = None,
+    watcher: Optional[FailureWatcher] = None
+) -> StreamResult:
+    """
+    Like run_tests, but streams the output to a log file and stops the build as soon as
+    watcher reports a compilation error or a failure in the watched test class.
+    """
+    runner = runner or BuildRunner.detect(project_dir)
+    return runner.stream(maven_test_args(test_classes, test_methods, module_dir), cwd=project_dir, watcher=watcher)
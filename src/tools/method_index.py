@@ -0,0 +1,143 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .cache_paths import cache_path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    indexed_at REAL NOT NULL,
+    PRIMARY KEY (root, path)
+);
+CREATE TABLE IF NOT EXISTS methods (
+    id INTEGER PRIMARY KEY,
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    complexity INTEGER NOT NULL,
+    return_type TEXT NOT NULL,
+    parameters TEXT NOT NULL,
+    throws TEXT NOT NULL,
+    branches TEXT NOT NULL,
+    conditions TEXT NOT NULL,
+    FOREIGN KEY (root, path) REFERENCES files(root, path) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_methods_name ON methods(root, name);
+CREATE INDEX IF NOT EXISTS idx_methods_span ON methods(root, path, start_line, end_line);
+"""
+
+_JSON_COLUMNS = ("parameters", "throws", "branches", "conditions")
+_METHOD_COLUMNS = ("name", "start_line", "end_line", "branches", "conditions",
+                   "complexity", "parameters", "return_type", "throws")
+
+class MethodIndex:
+    """
+    Persistent SQLite index of the methods found in each Java source file.
+
+    Files are keyed by the repository root the index is opened for and their path
+    relative to it, together with a hash of their content, so an unchanged file is
+    served from the index instead of being parsed again. One database can hold
+    many checkouts; each MethodIndex only sees the rows of its own root. Methods are
+    stored as the field dictionaries of `MethodAnalysis` records.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, root: Optional[str] = None):
+        self.db_path = db_path or cache_path("method_index.sqlite")
+        self.root = os.path.abspath(root) if root else ""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(files)")]
+        if columns and "root" not in columns:
+            # An index written before rows were keyed by root; it is only a cache
+            self._conn.executescript("DROP TABLE IF EXISTS methods; DROP TABLE IF EXISTS files;")
+        self._conn.executescript(_SCHEMA)
+
+    def lookup(self, path: str, content_hash: str) -> Optional[List[Dict]]:
+        """Return the indexed methods of path, or None if the file is unknown or has changed"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM files WHERE root = ? AND path = ?", (self.root, path)
+            ).fetchone()
+            if row is None or row["content_hash"] != content_hash:
+                return None
+            rows = self._conn.execute(
+                "SELECT * FROM methods WHERE root = ? AND path = ? ORDER BY start_line", (self.root, path)
+            ).fetchall()
+        return [self._row_to_method(r) for r in rows]
+
+    def store(self, path: str, content_hash: str, methods: List[Dict]) -> None:
+        """Replace the indexed methods of path with methods"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE root = ? AND path = ?", (self.root, path))
+            self._conn.execute(
+                "INSERT INTO files (root, path, content_hash, indexed_at) VALUES (?, ?, ?, ?)",
+                (self.root, path, content_hash, time.time())
+            )
+            self._conn.executemany(
+                """INSERT INTO methods (root, path, name, signature, start_line, end_line, complexity,
+                                        return_type, parameters, throws, branches, conditions)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [
+                    (
+                        self.root, path, m["name"], self._signature(m), m["start_line"], m["end_line"],
+                        m["complexity"], m["return_type"],
+                        *(json.dumps(m[column]) for column in _JSON_COLUMNS)
+                    )
+                    for m in methods
+                ]
+            )
+
+    def forget(self, path: str) -> None:
+        """Drop path and its methods, e.g. once the file was deleted"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE root = ? AND path = ?", (self.root, path))
+
+    def find_methods(self, name: str, path: Optional[str] = None) -> List[Tuple[str, Dict]]:
+        """Return (path, method) pairs for every indexed method called name"""
+        query = "SELECT * FROM methods WHERE root = ? AND name = ?"
+        params: Tuple = (self.root, name)
+        if path is not None:
+            query += " AND path = ?"
+            params += (path,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY path, start_line", params).fetchall()
+        return [(r["path"], self._row_to_method(r)) for r in rows]
+
+    def methods_overlapping(self, path: str, start_line: int, end_line: int) -> List[Dict]:
+        """Return the methods of path whose span overlaps [start_line, end_line]"""
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT * FROM methods
+                   WHERE root = ? AND path = ? AND start_line <= ? AND end_line >= ?
+                   ORDER BY start_line""",
+                (self.root, path, end_line, start_line)
+            ).fetchall()
+        return [self._row_to_method(r) for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _signature(method: Dict) -> str:
+        return f"{method['return_type']} {method['name']}({', '.join(method['parameters'])})"
+
+    @staticmethod
+    def _row_to_method(row: sqlite3.Row) -> Dict:
+        return {
+            column: json.loads(row[column]) if column in _JSON_COLUMNS else row[column]
+            for column in _METHOD_COLUMNS
+        }
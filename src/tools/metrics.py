@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .cache_paths import cache_dir
+
+# The metrics of the run the current thread works for, and labels (node, class, ...) to attach to records
+_current: ContextVar[Optional["RunMetrics"]] = ContextVar("codecov_metrics", default=None)
+_labels: ContextVar[Dict[str, str]] = ContextVar("codecov_metric_labels", default={})
+
+class RunMetrics:
+    """
+    Measurements of one pipeline run.
+
+    Each record has a 'kind' (node, llm, maven, cache_hit or retries), a 'name', the
+    labels active when it was taken (node, class_name, method_name) and either a
+    duration in 'seconds' or a 'value'. LLM records also carry 'tokens_in' and 'tokens_out'.
+    """
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, name: str, **fields: Any) -> Dict[str, Any]:
+        entry = {"time": time.time(), "kind": kind, "name": name, **_labels.get(), **fields}
+        with self._lock:
+            self.records.append(entry)
+        return entry
+
+    def totals(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Count, seconds, value and tokens summed per (kind, name)"""
+        totals: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(
+            lambda: {"count": 0, "seconds": 0.0, "value": 0, "tokens_in": 0, "tokens_out": 0}
+        )
+        with self._lock:
+            records = list(self.records)
+        for entry in records:
+            total = totals[(entry["kind"], entry["name"])]
+            total["count"] += 1
+            for field in ("seconds", "value", "tokens_in", "tokens_out"):
+                total[field] += entry.get(field) or 0
+        return dict(totals)
+
+    def write_jsonl(self, path: str) -> str:
+        with self._lock:
+            records = list(self.records)
+        with open(path, 'w', encoding='utf-8') as f:
+            for entry in records:
+                f.write(json.dumps({"run_id": self.run_id, **entry}, default=str) + "\n")
+        return path
+
+    def write_prometheus(self, path: str) -> str:
+        """Write the totals in the Prometheus text exposition format (for a textfile collector)"""
+        totals = self.totals()
+        series = {
+            "codecov_stage_seconds_total": ("Wall time per node, LLM call and Maven build.", "seconds"),
+            "codecov_stage_calls_total": ("Number of node runs, LLM calls and Maven builds.", "count"),
+        }
+        lines = []
+        for metric, (help_text, field) in series.items():
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for (kind, name), total in sorted(totals.items()):
+                if kind in ("node", "llm", "maven"):
+                    lines.append(f'{metric}{{run="{self.run_id}",kind="{kind}",name="{_escape(name)}"}} {total[field]:g}')
+        lines += ["# HELP codecov_llm_tokens_total LLM tokens sent and received.", "# TYPE codecov_llm_tokens_total counter"]
+        for (kind, name), total in sorted(totals.items()):
+            if kind == "llm":
+                for direction in ("in", "out"):
+                    lines.append(f'codecov_llm_tokens_total{{run="{self.run_id}",model="{_escape(name)}",direction="{direction}"}} '
+                                 f'{total["tokens_" + direction]:g}')
+        for kind, metric, help_text in (("cache_hit", "codecov_cache_hits_total", "Results served from a cache."),
+                                        ("retries", "codecov_retries_total", "Test correction retries.")):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for (record_kind, name), total in sorted(totals.items()):
+                if record_kind == kind:
+                    lines.append(f'{metric}{{run="{self.run_id}",name="{_escape(name)}"}} {total["value"]:g}')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+    def export(self, directory: Optional[str] = None) -> Tuple[str, str]:
+        """Write '<run_id>.jsonl' and '<run_id>.prom' to directory (default: METRICS_DIR, else the cache)"""
+        directory = directory or os.getenv("METRICS_DIR") or cache_dir("metrics")
+        os.makedirs(directory, exist_ok=True)
+        return (self.write_jsonl(os.path.join(directory, f"{self.run_id}.jsonl")),
+                self.write_prometheus(os.path.join(directory, f"{self.run_id}.prom")))
+
+    def summary_table(self) -> str:
+        """Per-stage totals plus per-class LLM usage as a fixed-width table"""
+        rows = [f"{'Kind':<10} {'Name':<32} {'Count':>6} {'Total s':>9} {'Mean s':>8} {'Tok in':>8} {'Tok out':>8}"]
+        for (kind, name), total in sorted(self.totals().items()):
+            count = total["value"] if kind in ("cache_hit", "retries") else total["count"]
+            mean = total["seconds"] / total["count"] if total["count"] else 0.0
+            rows.append(f"{kind:<10} {name[-32:]:<32} {count:>6g} {total['seconds']:>9.2f} {mean:>8.2f} "
+                        f"{total['tokens_in']:>8g} {total['tokens_out']:>8g}")
+        per_class: Dict[str, Dict[str, float]] = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "tokens": 0})
+        with self._lock:
+            for entry in self.records:
+                if entry["kind"] == "llm" and entry.get("class_name"):
+                    usage = per_class[entry["class_name"]]
+                    usage["calls"] += 1
+                    usage["seconds"] += entry.get("seconds", 0.0)
+                    usage["tokens"] += (entry.get("tokens_in") or 0) + (entry.get("tokens_out") or 0)
+        if per_class:
+            rows.append("")
+            rows.append(f"{'LLM by class':<43} {'Calls':>6} {'Total s':>9} {'Tokens':>8}")
+            for class_name, usage in sorted(per_class.items()):
+                rows.append(f"{class_name[-43:]:<43} {usage['calls']:>6g} {usage['seconds']:>9.2f} {usage['tokens']:>8g}")
+        return "\n".join(rows)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+def current_metrics() -> Optional[RunMetrics]:
+    return _current.get()
+
+@contextmanager
+def use_metrics(metrics: Optional[RunMetrics]) -> Iterator[None]:
+    """Send the records taken in this thread (and contexts copied from it) to metrics"""
+    token = _current.set(metrics)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def metric_labels(**labels: Any) -> Iterator[None]:
+    """Attach labels such as node or class_name to every record taken inside the block"""
+    token = _labels.set({**_labels.get(), **{key: value for key, value in labels.items() if value is not None}})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+@contextmanager
+def observe(kind: str, name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time the block and record it under kind/name. The yielded dict can be filled
+    with more fields (e.g. tokens) before the block ends. Does nothing without active metrics.
+    """
+    extra: Dict[str, Any] = dict(fields)
+    started = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.record(kind, name, seconds=round(time.perf_counter() - started, 4), **extra)
+
+def count(kind: str, name: str, value: float = 1, **fields: Any) -> None:
+    """Record a counter increment such as a cache hit or retries"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.record(kind, name, value=value, **fields)
+
+class InstrumentedLLM:
+    """
+    Wraps a chat model so every invoke() records latency and token usage.
+
+    Pass factory instead of llm to build the model on its first use, so wrapping an
+    agent's client does not import or construct it up front.
+    """
+
+    def __init__(self, llm=None, factory: Optional[Callable[[], Any]] = None):
+        self._llm = llm
+        self._factory = factory
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    self._llm = self._factory()
+        return self._llm
+
+    @property
+    def model_name(self) -> str:
+        llm = self.model
+        return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+    def invoke(self, *args, **kwargs):
+        with observe("llm", self.model_name) as fields:
+            response = self.model.invoke(*args, **kwargs)
+            usage = getattr(response, "usage_metadata", None) or {}
+            fields["tokens_in"] = usage.get("input_tokens", 0)
+            fields["tokens_out"] = usage.get("output_tokens", 0)
+        return response
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.model, name)
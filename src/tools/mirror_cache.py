@@ -0,0 +1,202 @@
+import hashlib
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .cache_paths import cache_dir
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+LAST_USED_FILE = "codecov-last-used"
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+def normalize_repo_url(url: str) -> str:
+    """
+    Reduce the different spellings of a repository URL to one canonical form.
+
+    Credentials, a trailing '.git' or '/', and the case of the scheme and host are
+    ignored, and scp-style 'git@host:owner/repo' becomes 'ssh://host/owner/repo'.
+    """
+    url = url.strip()
+    scp = re.fullmatch(r"([^@/]+@)?([^:/]+):(?!//)(.+)", url)
+    if scp:
+        url = f"ssh://{scp.group(2)}/{scp.group(3)}"
+    match = re.fullmatch(r"([a-zA-Z][a-zA-Z0-9+.-]*)://(?:[^/@]*@)?([^/]*)(.*)", url)
+    if match:
+        scheme, host, path = match.groups()
+        url = f"{scheme.lower()}://{host.lower()}{path}"
+    url = url.rstrip("/")
+    if url.endswith(".git"):
+        url = url[:-4]
+    return url
+
+def mirror_key(url: str) -> str:
+    """Directory name for a repository's mirror: a readable slug plus a hash of the normalized URL."""
+    normalized = normalize_repo_url(url)
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", normalized.split("://", 1)[-1]).strip("_")[-60:]
+    return f"{slug}-{hashlib.sha256(normalized.encode('utf8')).hexdigest()[:12]}.git"
+
+class FileLock:
+    """An exclusive advisory lock on a file, usable across processes."""
+
+    def __init__(self, path: str, blocking: bool = True):
+        self.path = path
+        self.blocking = blocking
+        self._file = None
+
+    def acquire(self) -> bool:
+        self._file = open(self.path, "a+")
+        try:
+            if os.name == "nt":
+                mode = msvcrt.LK_LOCK if self.blocking else msvcrt.LK_NBLCK
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), mode, 1)
+            else:
+                flags = fcntl.LOCK_EX | (0 if self.blocking else fcntl.LOCK_NB)
+                fcntl.flock(self._file.fileno(), flags)
+            return True
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        try:
+            if os.name == "nt":
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "FileLock":
+        if not self.acquire():
+            raise TimeoutError(f"Could not lock {self.path}")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+class MirrorCache:
+    """
+    A directory of bare mirror repositories keyed by normalized repository URL.
+
+    Mirrors are created with 'git clone --mirror' and refreshed incrementally with a
+    pruning fetch. Every create, refresh and removal happens under a per-mirror file
+    lock, so concurrent runs can share the cache. When the cache grows beyond
+    max_bytes, the least recently used mirrors are evicted.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.root = root or cache_dir("mirrors")
+        os.makedirs(self.root, exist_ok=True)
+        if max_bytes is None:
+            max_gb = os.getenv("MIRROR_CACHE_MAX_GB")
+            max_bytes = int(float(max_gb) * 1024 ** 3) if max_gb else DEFAULT_MAX_BYTES
+        self.max_bytes = max_bytes
+
+    def mirror_path(self, repo_url: str) -> str:
+        return os.path.join(self.root, mirror_key(repo_url))
+
+    def mirror_url(self, repo_url: str) -> str:
+        """file:// URL of the mirror, usable as a clone or fetch source (including shallow ones)"""
+        return Path(self.mirror_path(repo_url)).as_uri()
+
+    def ensure(self, repo_url: str, fetch_url: Optional[str] = None) -> str:
+        """
+        Create or refresh the mirror of repo_url.
+
+        Args:
+            repo_url (str): The repository URL the mirror is keyed by.
+            fetch_url (Optional[str]): URL to fetch from when it differs from repo_url,
+                e.g. with an access token injected. It is never stored in the mirror's config.
+
+        Returns:
+            str: Path of the up-to-date bare mirror.
+        """
+        with self.use(repo_url, fetch_url):
+            pass
+        return self.mirror_path(repo_url)
+
+    @contextmanager
+    def use(self, repo_url: str, fetch_url: Optional[str] = None) -> Iterator[str]:
+        """
+        Refresh the mirror of repo_url and keep it locked while the caller clones or fetches from it.
+
+        Yields:
+            str: The mirror's file:// URL.
+        """
+        path = self.mirror_path(repo_url)
+        with FileLock(f"{path}.lock"):
+            self._refresh(path, repo_url, fetch_url or repo_url)
+            yield self.mirror_url(repo_url)
+        self.evict(keep=path)
+
+    def _refresh(self, path: str, repo_url: str, fetch_url: str) -> None:
+        import git
+        if os.path.isdir(path):
+            git.Repo(path).git.fetch("--prune", "--tags", fetch_url, "+refs/*:refs/*")
+        else:
+            partial = f"{path}.partial"
+            shutil.rmtree(partial, ignore_errors=True)
+            repo = git.Repo.clone_from(fetch_url, partial, mirror=True)
+            repo.git.remote("set-url", "origin", repo_url)
+            # Let clones from the mirror be partial and check out arbitrary commits
+            repo.git.config("uploadpack.allowFilter", "true")
+            repo.git.config("uploadpack.allowAnySHA1InWant", "true")
+            os.replace(partial, path)
+        Path(path, LAST_USED_FILE).touch()
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """Remove least recently used mirrors until the cache fits in max_bytes; returns the removed paths"""
+        mirrors = self._mirrors()
+        total = sum(size for _, _, size in mirrors)
+        removed = []
+        for path, _, size in sorted(mirrors, key=lambda entry: entry[1]):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            lock = FileLock(f"{path}.lock", blocking=False)
+            # A mirror locked by another run is in use, so leave it alone
+            if not lock.acquire():
+                continue
+            try:
+                shutil.rmtree(path, ignore_errors=True)
+            finally:
+                lock.release()
+            total -= size
+            removed.append(path)
+        return removed
+
+    def _mirrors(self) -> List[Tuple[str, float, int]]:
+        """(path, last used time, size in bytes) of every mirror"""
+        mirrors = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not name.endswith(".git") or not os.path.isdir(path):
+                continue
+            marker = os.path.join(path, LAST_USED_FILE)
+            last_used = os.path.getmtime(marker) if os.path.exists(marker) else os.path.getmtime(path)
+            mirrors.append((path, last_used, _disk_usage(path)))
+        return mirrors
+
+def _disk_usage(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
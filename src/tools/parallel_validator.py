@@ -0,0 +1,207 @@
+import contextvars
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .build_runner import BuildRunner
+from .test_validation import validate_test_class
+
+# Rough resident size of one Maven + Surefire JVM pair
+DEFAULT_WORKER_MEMORY_MB = 1536
+
+def _available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def _available_memory_mb() -> Optional[int]:
+    """Available memory in MB, honouring a cgroup v2 limit; None when it cannot be determined."""
+    limits = []
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    limits.append(int(line.split()[1]) // 1024)
+                    break
+    except OSError:
+        pass
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            value = f.read().strip()
+        if value != "max":
+            limits.append(int(value) // (1024 * 1024))
+    except (OSError, ValueError):
+        pass
+    return min(limits) if limits else None
+
+def default_worker_count(worker_memory_mb: int = DEFAULT_WORKER_MEMORY_MB) -> int:
+    """
+    Number of validation workers the machine can sustain.
+
+    VALIDATION_WORKERS overrides the estimate; otherwise it is the number of usable
+    CPUs, capped by how many workers of worker_memory_mb fit in available memory.
+    """
+    configured = os.getenv("VALIDATION_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    workers = _available_cpus()
+    memory_mb = _available_memory_mb()
+    if memory_mb is not None:
+        workers = min(workers, memory_mb // worker_memory_mb)
+    return max(1, workers)
+
+class ParallelTestValidator:
+    """
+    Validates generated test classes concurrently, each worker in its own copy of the checkout.
+
+    Workspaces are either hardlinked copies of the project (mode 'copy', the default,
+    which also carries uncommitted changes) or `git worktree` checkouts of HEAD (mode
+    'worktree'). Every workspace gets its own target/ directory, seeded from the
+    project's compiled output when present. Tests that pass are copied back into
+    the original checkout. With a single worker classes are validated in the
+    original checkout itself, and a failing test is removed from it the same way.
+    """
+
+    def __init__(
+        self,
+        project_dir: str,
+        llm,
+        workers: Optional[int] = None,
+        max_retries: int = 10,
+        runner: Optional[BuildRunner] = None,
+        mode: str = "copy",
+        precompile: bool = True
+    ):
+        if mode not in ("copy", "worktree"):
+            raise ValueError(f"Unknown workspace mode: {mode}")
+        self.project_dir = os.path.abspath(project_dir)
+        self.llm = llm
+        self.workers = workers or default_worker_count()
+        self.max_retries = max_retries
+        self.runner = runner or BuildRunner.detect(project_dir)
+        self.mode = mode
+        self.precompile = precompile
+
+    def validate(self, recommendations: List[Dict], test_dir: str) -> List[Dict]:
+        """
+        Validate one generated test class per distinct class_name in recommendations.
+
+        Returns:
+            List[Dict]: One validation result per class, see validate_test_class.
+        """
+        by_class = {}
+        for rec in recommendations:
+            if rec.get('class_name') and rec.get('test_code'):
+                by_class.setdefault(rec['class_name'], rec['test_code'])
+        if not by_class:
+            return []
+
+        workers = min(self.workers, len(by_class))
+        if workers == 1:
+            return [self._merge(self._validate_in_place(class_name, test_code, test_dir), test_dir)
+                    for class_name, test_code in by_class.items()]
+
+        relative_test_dir = os.path.relpath(os.path.abspath(test_dir), self.project_dir)
+        scratch = tempfile.mkdtemp(prefix="validate-")
+        workspaces = queue.Queue()
+        created = []
+        try:
+            for i in range(workers):
+                workspace = self._create_workspace(os.path.join(scratch, f"worker-{i}"))
+                created.append(workspace)
+                workspaces.put(workspace)
+            logging.info(f"Validating {len(by_class)} test class(es) with {workers} worker(s)")
+
+            def run(class_name: str, test_code: str) -> Dict:
+                workspace = workspaces.get()
+                try:
+                    result = validate_test_class(
+                        workspace, os.path.join(workspace, relative_test_dir), class_name,
+                        test_code, self.llm, self.max_retries, self.runner, self.precompile
+                    )
+                    # Leave the workspace as it was for the next class: a failing test would
+                    # otherwise break test compilation for every later run in this workspace
+                    os.remove(result["file_path"])
+                    original = os.path.join(self.project_dir, os.path.relpath(result["file_path"], workspace))
+                    if os.path.exists(original):
+                        _link_or_copy(original, result["file_path"])
+                    return result
+                finally:
+                    workspaces.put(workspace)
+
+            # Carry the caller's context (run metrics and labels) into the worker threads
+            tasks = [(contextvars.copy_context(), item) for item in by_class.items()]
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(lambda task: task[0].run(run, *task[1]), tasks))
+        finally:
+            for workspace in created:
+                self._remove_workspace(workspace)
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        return [self._merge(result, test_dir) for result in results]
+
+    def _validate_in_place(self, class_name: str, test_code: str, test_dir: str) -> Dict:
+        """Validate in the original checkout, putting back whatever test file was there if the test fails"""
+        file_path = os.path.join(test_dir, f"{class_name}Test.java")
+        original = None
+        if os.path.exists(file_path):
+            with open(file_path, 'rb') as f:
+                original = f.read()
+        result = validate_test_class(self.project_dir, test_dir, class_name, test_code,
+                                     self.llm, self.max_retries, self.runner, self.precompile)
+        if not result["passed"]:
+            if original is None:
+                os.remove(result["file_path"])
+            else:
+                with open(result["file_path"], 'wb') as f:
+                    f.write(original)
+        return result
+
+    def _merge(self, result: Dict, test_dir: str) -> Dict:
+        """Point a workspace result at the original checkout, writing the test there if it passed"""
+        file_path = os.path.join(test_dir, os.path.basename(result["file_path"]))
+        if result["passed"]:
+            os.makedirs(test_dir, exist_ok=True)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(result["test_code"])
+        return {**result, "file_path": file_path}
+
+    def _create_workspace(self, path: str) -> str:
+        if self.mode == "worktree":
+            subprocess.run(["git", "-C", self.project_dir, "worktree", "add", "--detach", path, "HEAD"],
+                           check=True, capture_output=True)
+        else:
+            shutil.copytree(self.project_dir, path, copy_function=_link_or_copy,
+                            ignore=shutil.ignore_patterns("target", ".git"))
+        self._seed_target_dirs(path)
+        return path
+
+    def _seed_target_dirs(self, workspace: str) -> None:
+        """Give the workspace real copies of every module's target/ so compilation stays incremental"""
+        for root, dirs, _ in os.walk(self.project_dir):
+            dirs[:] = [d for d in dirs if d != ".git"]
+            if "target" in dirs:
+                source = os.path.join(root, "target")
+                destination = os.path.join(workspace, os.path.relpath(source, self.project_dir))
+                if not os.path.exists(destination):
+                    # Build tools rewrite files in target/ in place, so these must not be hardlinks
+                    shutil.copytree(source, destination, symlinks=True)
+                dirs.remove("target")
+
+    def _remove_workspace(self, path: str) -> None:
+        if self.mode == "worktree":
+            subprocess.run(["git", "-C", self.project_dir, "worktree", "remove", "--force", path],
+                           capture_output=True)
+        shutil.rmtree(path, ignore_errors=True)
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
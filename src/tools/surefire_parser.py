@@ -0,0 +1,97 @@
+import logging
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+@dataclass
+class TestFailure:
+    class_name: str
+    method_name: str
+    kind: str
+    message: str
+    type: str
+    stack_trace: str
+
+    @property
+    def test_name(self) -> str:
+        return f"{self.class_name}.{self.method_name}"
+
+    def describe(self) -> str:
+        """Render the failure the way it is fed back into correction prompts"""
+        header = f"{self.test_name} {self.kind.upper()}: {self.type}: {self.message}"
+        return f"{header}\n{self.stack_trace}".strip()
+
+def find_reports(project_dir: str, since: Optional[float] = None) -> List[str]:
+    """
+    Find Surefire XML reports in every module of a Maven project.
+
+    Args:
+        project_dir (str): Root of the Maven project.
+        since (Optional[float]): Only return reports modified at or after this timestamp.
+
+    Returns:
+        List[str]: Paths of matching TEST-*.xml files.
+    """
+    reports = []
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = [d for d in dirs if d not in (".git", "node_modules")]
+        if os.path.basename(root) != "surefire-reports":
+            continue
+        for name in files:
+            if name.startswith("TEST-") and name.endswith(".xml"):
+                path = os.path.join(root, name)
+                if since is None or os.path.getmtime(path) >= since:
+                    reports.append(path)
+    return reports
+
+def parse_report(report_path: str) -> Iterator[TestFailure]:
+    """Stream the failed and errored test cases out of one Surefire report"""
+    for _, element in ET.iterparse(report_path, events=("end",)):
+        if element.tag != "testcase":
+            continue
+        for outcome in element:
+            if outcome.tag in ("failure", "error"):
+                yield TestFailure(
+                    class_name=element.get("classname", ""),
+                    method_name=element.get("name", ""),
+                    kind=outcome.tag,
+                    message=outcome.get("message", ""),
+                    type=outcome.get("type", ""),
+                    stack_trace=(outcome.text or "").strip()
+                )
+                break
+        # Drop the processed test case (and its captured output) right away
+        element.clear()
+
+def _matches_class(class_name: str, class_filter: str) -> bool:
+    """Whether a test case's class is class_filter, given as a simple or fully qualified name; nested classes count"""
+    outer = class_name.split("$", 1)[0]
+    return outer == class_filter or outer.endswith("." + class_filter)
+
+def parse_surefire_reports(
+    project_dir: str,
+    since: Optional[float] = None,
+    class_filter: Optional[str] = None
+) -> List[TestFailure]:
+    """
+    Collect test failures from the Surefire XML reports of a Maven project.
+
+    Args:
+        project_dir (str): Root of the Maven project.
+        since (Optional[float]): Ignore reports older than this timestamp (e.g. the run start).
+        class_filter (Optional[str]): Only keep failures of this test class, given by its simple
+            or fully qualified name (failures of its nested classes included).
+
+    Returns:
+        List[TestFailure]: The failures and errors found.
+    """
+    failures = []
+    for report_path in find_reports(project_dir, since):
+        try:
+            for failure in parse_report(report_path):
+                if class_filter is None or _matches_class(failure.class_name, class_filter):
+                    failures.append(failure)
+        except ET.ParseError as e:
+            logging.warning(f"Skipping unreadable Surefire report {report_path}: {e}")
+    return failures
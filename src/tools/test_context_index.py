@@ -0,0 +1,189 @@
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+DEFAULT_TOP_K = 5
+DEFAULT_TOKEN_BUDGET = 1500
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_WORD_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_TEST_ANNOTATION = re.compile(r"@(?:Test|ParameterizedTest|RepeatedTest|TestFactory|TestTemplate)\b")
+_FIXTURE_ANNOTATION = re.compile(r"@(?:BeforeEach|BeforeAll|AfterEach|AfterAll|Before|After|BeforeClass|AfterClass)\b")
+# Words every Java method has; they would only dilute the scores
+_STOP_WORDS = frozenset(
+    "public private protected static final void new return class import package this null true false "
+    "int long double float boolean char byte short string var throws throw".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased identifiers of text plus their camelCase and snake_case parts"""
+    tokens = []
+    for identifier in _IDENTIFIER.findall(text):
+        parts = [part.lower() for part in _WORD_PART.findall(identifier)]
+        for token in [identifier.lower(), *parts] if len(parts) > 1 else [identifier.lower()]:
+            if token not in _STOP_WORDS and len(token) > 1:
+                tokens.append(token)
+    return tokens
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count of text (about four characters per token for code)"""
+    return (len(text) + 3) // 4
+
+@dataclass
+class TestExample:
+    file_path: str
+    class_name: str
+    method_name: str
+    start_line: int
+    end_line: int
+    source: str
+    # Imports and setup methods of the test class, shown once per class in a prompt
+    header: str = ""
+
+class TestContextIndex:
+    """
+    BM25 index over the test methods under a project's src/test/java.
+
+    Test methods are found from tree-sitter method spans, so with an indexed
+    TreeSitterCoverageAgent unchanged test files are not parsed again. The index is
+    built on the first query and then kept for the object's lifetime (one pipeline
+    run). few_shot() returns the best matching tests for a target method that fit
+    a token budget. Prompts use those as examples of how this project writes tests,
+    not whole test files.
+    """
+
+    def __init__(self, repo_path: str, tree_sitter_agent=None, k1: float = 1.5, b: float = 0.75):
+        self.repo_path = repo_path
+        self.test_root = os.path.join(repo_path, "src", "test", "java")
+        self.k1 = k1
+        self.b = b
+        self._tree_sitter_agent = tree_sitter_agent
+        self._lock = threading.Lock()
+        self._examples: Optional[List[TestExample]] = None
+        self._term_freqs: List[Counter] = []
+        self._doc_freqs: Counter = Counter()
+        self._avg_length = 0.0
+
+    @property
+    def tree_sitter_agent(self):
+        if self._tree_sitter_agent is None:
+            from src.tree_sitter_coverage_agent import TreeSitterCoverageAgent
+            self._tree_sitter_agent = TreeSitterCoverageAgent(self.repo_path)
+        return self._tree_sitter_agent
+
+    @property
+    def examples(self) -> List[TestExample]:
+        """Every indexed test method; builds the index on first use"""
+        with self._lock:
+            if self._examples is None:
+                self._build()
+            return self._examples
+
+    def _build(self) -> None:
+        examples = []
+        for directory, _, file_names in os.walk(self.test_root):
+            for file_name in sorted(file_names):
+                if file_name.endswith(".java"):
+                    examples.extend(self._file_examples(os.path.join(directory, file_name)))
+        self._term_freqs = [Counter(tokenize(f"{example.class_name} {example.source}")) for example in examples]
+        self._doc_freqs = Counter(term for freqs in self._term_freqs for term in freqs)
+        lengths = [sum(freqs.values()) for freqs in self._term_freqs]
+        self._avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+        self._examples = examples
+
+    def _file_examples(self, file_path: str) -> List[TestExample]:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                source_code = f.read()
+            methods = self.tree_sitter_agent.get_file_methods(file_path)
+        except (OSError, UnicodeDecodeError) as e:
+            logging.warning(f"Skipping test file {file_path}: {e}")
+            return []
+        lines = source_code.splitlines()
+        class_name = os.path.splitext(os.path.basename(file_path))[0]
+        tests, fixtures = [], []
+        for method in methods:
+            # The span starts at the method's annotations
+            source = "\n".join(lines[method.start_line - 1:method.end_line])
+            if _TEST_ANNOTATION.search(source):
+                tests.append((method, source))
+            elif _FIXTURE_ANNOTATION.search(source):
+                fixtures.append(source)
+        imports = [line.strip() for line in lines if line.strip().startswith("import ")]
+        header = "\n".join(imports + ([""] if imports and fixtures else []) + fixtures)
+        return [
+            TestExample(file_path, class_name, method.name, method.start_line, method.end_line, source, header)
+            for method, source in tests
+        ]
+
+    def search(self, query: str, k: int = DEFAULT_TOP_K) -> List[Tuple[float, TestExample]]:
+        """The k test methods scoring highest for query, best first"""
+        examples = self.examples
+        terms = set(tokenize(query))
+        if not examples or not terms:
+            return []
+        count = len(examples)
+        idf = {
+            term: math.log(1 + (count - self._doc_freqs[term] + 0.5) / (self._doc_freqs[term] + 0.5))
+            for term in terms if term in self._doc_freqs
+        }
+        scored = []
+        for example, freqs in zip(examples, self._term_freqs):
+            length_norm = self.k1 * (1 - self.b + self.b * sum(freqs.values()) / self._avg_length)
+            score = sum(
+                weight * freqs[term] * (self.k1 + 1) / (freqs[term] + length_norm)
+                for term, weight in idf.items() if freqs[term]
+            )
+            if score > 0:
+                scored.append((score, example))
+        scored.sort(key=lambda pair: -pair[0])
+        return scored[:k]
+
+    def few_shot(self, query: str, k: Optional[int] = None, token_budget: Optional[int] = None) -> List[TestExample]:
+        """
+        The best matching tests for query that together fit token_budget
+        (TEST_CONTEXT_K and TEST_CONTEXT_TOKENS by default). A test that does not fit is
+        skipped in favour of a smaller, lower-ranked one. The header of each test
+        class counts once, with its first selected test.
+        """
+        k = k if k is not None else int(os.getenv("TEST_CONTEXT_K", DEFAULT_TOP_K))
+        budget = token_budget if token_budget is not None else int(
+            os.getenv("TEST_CONTEXT_TOKENS", DEFAULT_TOKEN_BUDGET)
+        )
+        selected = []
+        classes = set()
+        for _, example in self.search(query, k=k * 4):
+            cost = estimate_tokens(example.source)
+            if example.file_path not in classes:
+                cost += estimate_tokens(example.header)
+            if cost <= budget:
+                selected.append(example)
+                classes.add(example.file_path)
+                budget -= cost
+            if len(selected) == k:
+                break
+        return selected
+
+    @staticmethod
+    def format_examples(examples: List[TestExample]) -> str:
+        """Examples as prompt text, grouped by test class under the class's header"""
+        if not examples:
+            return "None"
+        by_class = {}
+        for example in examples:
+            by_class.setdefault(example.file_path, []).append(example)
+        return "\n\n".join(
+            "\n\n".join([f"// {group[0].class_name}", *([group[0].header] if group[0].header else []),
+                         *(example.source for example in group)])
+            for group in by_class.values()
+        )
+
+def method_query(class_name: str, method_name: str, source: str = "") -> str:
+    """Retrieval query for a target method: its class, its name and its code"""
+    simple_name = class_name.split("/")[-1].split(".")[-1]
+    return f"{simple_name}Test {method_name} {source}"
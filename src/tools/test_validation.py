@@ -0,0 +1,139 @@
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Dict, Iterable, Optional
+
+from .build_runner import BuildRunner
+from .javac_check import JavacChecker
+from .limits import llm_slot
+from .metrics import count, metric_labels
+from .maven_stream import FailureWatcher
+from .maven_tool import find_module_dir, stream_tests
+from .surefire_parser import parse_surefire_reports
+
+CORRECTION_PROMPT = """
+The following generated JUnit test failed with this error:
+{error_message}
+
+Here is the test code:
+{test_code}
+
+Please correct the test code so that it passes, and output only the corrected Java code (no explanations).
+"""
+
+def clean_test_code(test_code: str) -> str:
+    """Strip markdown code fences that LLMs tend to wrap around generated code."""
+    cleaned = re.sub(r"```[a-zA-Z]*\n?", "", test_code)
+    return cleaned.replace("```", "")
+
+def write_test_file(file_path: str, test_code: str) -> str:
+    """
+    Write generated test code to file_path, replacing any existing file atomically.
+
+    The file is written to a temporary name and renamed into place, so a hardlinked
+    copy of the checkout never shares the new content with the original.
+
+    Returns:
+        str: The cleaned code that was written.
+    """
+    cleaned = clean_test_code(test_code)
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(cleaned)
+    os.replace(tmp_path, file_path)
+    return cleaned
+
+def build_error_excerpt(lines: Iterable[str], max_lines: int = 50) -> str:
+    """Keep the [ERROR] lines of a failed build, e.g. compiler diagnostics, for the correction prompt."""
+    errors = []
+    for line in lines:
+        if line.startswith("[ERROR]"):
+            errors.append(line)
+            if len(errors) >= max_lines:
+                break
+    return "\n".join(errors)
+
+def correct_test_code(llm, test_code: str, error_message: str) -> str:
+    """Ask the LLM to fix a failing test and return the corrected code."""
+    prompt = CORRECTION_PROMPT.format(error_message=error_message, test_code=test_code)
+    with llm_slot():
+        response = llm.invoke([{"role": "user", "content": prompt}])
+    return response.content
+
+def validate_test_class(
+    project_dir: str,
+    test_dir: str,
+    class_name: str,
+    test_code: str,
+    llm,
+    max_retries: int = 10,
+    runner: Optional[BuildRunner] = None,
+    precompile: bool = True
+) -> Dict:
+    """
+    Write a generated test class, run it, and let the LLM correct it until it passes.
+
+    Args:
+        project_dir (str): The Maven project to validate in.
+        test_dir (str): Directory the '<class_name>Test.java' file is written to.
+        class_name (str): Simple name of the class under test.
+        test_code (str): The generated test code.
+        llm: Chat model used for corrections.
+        max_retries (int): Maximum number of test runs.
+        runner (Optional[BuildRunner]): Build command to use; detected when None.
+        precompile (bool): Compile the test with javac first and only run Maven once it compiles.
+
+    Returns:
+        Dict: 'class_name', 'file_path', 'test_code' (the final version), 'passed' and 'attempts'.
+    """
+    runner = runner or BuildRunner.detect(project_dir)
+    file_path = os.path.join(test_dir, f"{class_name}Test.java")
+    test_code = write_test_file(file_path, test_code)
+    module_dir = find_module_dir(project_dir, file_path)
+    test_class = f"{class_name}Test"
+    checker = JavacChecker(project_dir, module_dir, runner) if precompile else None
+    if checker is not None and not checker.available:
+        checker = None
+
+    # Label the LLM and Maven metrics of this class
+    with metric_labels(class_name=class_name):
+        for attempt in range(max_retries):
+            if checker is not None:
+                compiled = checker.check(file_path)
+                if not compiled.ok:
+                    logging.info(f"Test for {class_name} does not compile ({compiled.seconds:.1f}s javac). Attempting to auto-correct...")
+                    test_code = write_test_file(file_path, correct_test_code(llm, test_code, compiled.diagnostics))
+                    time.sleep(2)
+                    continue
+            # Report timestamps can be truncated to whole seconds on some filesystems
+            started = time.time() - 1
+            # Only the generated class needs to run, and only until it is known to be broken
+            result = stream_tests(project_dir, test_classes=[test_class], module_dir=module_dir,
+                                  runner=runner, watcher=FailureWatcher(test_class))
+            failures = parse_surefire_reports(project_dir, since=started, class_filter=test_class)
+            error_message = "\n\n".join(failure.describe() for failure in failures)
+            if result.aborted:
+                logging.info(f"Stopped the build early: {result.reason}")
+                error_message = error_message or result.excerpt
+            elif not failures and result.returncode != 0:
+                # No test ran at all, most likely a compilation error in the generated test
+                error_message = build_error_excerpt(result.read_log()) or result.excerpt or "Build failed"
+            os.remove(result.log_path)
+            if error_message:
+                logging.info(f"Test for {class_name} failed. Attempting to auto-correct...")
+                test_code = write_test_file(file_path, correct_test_code(llm, test_code, error_message))
+                time.sleep(2)
+            else:
+                logging.info(f"Test for {class_name} passed after {attempt+1} attempt(s).")
+                count("retries", class_name, attempt)
+                return {"class_name": class_name, "file_path": file_path, "test_code": test_code,
+                        "passed": True, "attempts": attempt + 1}
+
+        logging.warning(f"Test for {class_name} could not be auto-corrected after {max_retries} attempts.")
+        count("retries", class_name, max_retries)
+        return {"class_name": class_name, "file_path": file_path, "test_code": test_code,
+                "passed": False, "attempts": max_retries}
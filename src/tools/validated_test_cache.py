@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from .cache_paths import cache_path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS validated_tests (
+    body_hash TEXT PRIMARY KEY,
+    class_name TEXT NOT NULL,
+    method_name TEXT NOT NULL,
+    test_code TEXT NOT NULL,
+    coverage TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_validated_tests_last_used ON validated_tests(last_used);
+"""
+
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_MAX_BYTES = 100 * 1024 ** 2
+
+# String and char literals are matched so comment markers inside them are left alone
+_COMMENT_OR_LITERAL = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+def normalize_java(source: str) -> str:
+    """Java source without comments and with every run of whitespace collapsed to one space"""
+    def keep_literals(match: re.Match) -> str:
+        text = match.group(0)
+        return text if text[0] in "\"'" else " "
+    return " ".join(_COMMENT_OR_LITERAL.sub(keep_literals, source).split())
+
+def method_body_hash(project: str, class_name: str, source_code: str, start_line: int, end_line: int) -> str:
+    """
+    Hash of a method's tree-sitter span (1-based, inclusive) with comments and
+    formatting normalized away. The project (e.g. its normalized repository URL)
+    and class name are part of the hash because a test is written against the
+    fixtures and imports of its own project and class.
+    """
+    span = "\n".join(source_code.splitlines()[start_line - 1:end_line])
+    return hashlib.sha256(f"{project}\0{class_name}\0{normalize_java(span)}".encode("utf-8")).hexdigest()
+
+class ValidatedTestCache:
+    """
+    Persistent SQLite store of generated tests that passed validation.
+
+    Entries are keyed by method_body_hash, so a method whose body is unchanged
+    since an earlier commit gets its previously validated test back, together
+    with the coverage that test achieved, instead of a new generation and
+    correction round. Entries not used for max_age_days are dropped, and the least
+    recently used entries go once the stored test code exceeds max_bytes
+    (VALIDATED_TEST_CACHE_MAX_AGE_DAYS and VALIDATED_TEST_CACHE_MAX_MB by default).
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_age_days: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self.db_path = db_path or cache_path("validated_tests.sqlite")
+        self.max_age_days = max_age_days if max_age_days is not None else float(
+            os.getenv("VALIDATED_TEST_CACHE_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS)
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else (
+            int(float(os.environ["VALIDATED_TEST_CACHE_MAX_MB"]) * 1024 ** 2)
+            if os.getenv("VALIDATED_TEST_CACHE_MAX_MB") else DEFAULT_MAX_BYTES
+        )
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.evict()
+
+    def lookup(self, body_hashes: Iterable[str]) -> Dict[str, Dict]:
+        """The entries ('test_code', 'coverage', ...) of the hashes that are cached; marks them used"""
+        body_hashes = list(dict.fromkeys(body_hashes))
+        if not body_hashes:
+            return {}
+        placeholders = ", ".join("?" * len(body_hashes))
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                f"SELECT * FROM validated_tests WHERE body_hash IN ({placeholders})", body_hashes
+            ).fetchall()
+            self._conn.execute(
+                f"UPDATE validated_tests SET last_used = ? WHERE body_hash IN ({placeholders})",
+                (time.time(), *body_hashes)
+            )
+        return {row["body_hash"]: self._row_to_entry(row) for row in rows}
+
+    def lookup_class(self, body_hashes: Iterable[str]) -> Optional[Dict]:
+        """
+        The validated test shared by all the given methods of a class, or None when
+        any of them changed or they were last validated with different tests.
+        """
+        body_hashes = list(body_hashes)
+        entries = self.lookup(body_hashes)
+        if not body_hashes or len(entries) < len(set(body_hashes)):
+            return None
+        test_codes = {entry["test_code"] for entry in entries.values()}
+        if len(test_codes) != 1:
+            return None
+        return next(iter(entries.values()))
+
+    def store(self, class_name: str, methods: Dict[str, str], test_code: str,
+              coverage: Optional[Dict] = None) -> None:
+        """Record test_code as the validated test of methods (body hash -> method name)"""
+        now = time.time()
+        size = len(test_code.encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """INSERT OR REPLACE INTO validated_tests
+                   (body_hash, class_name, method_name, test_code, coverage, size, created_at, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                [
+                    (body_hash, class_name, method_name, test_code,
+                     json.dumps(coverage) if coverage is not None else None, size, now, now)
+                    for body_hash, method_name in methods.items()
+                ]
+            )
+        self.evict()
+
+    def record_coverage(self, body_hashes: Iterable[str], coverage: Dict) -> None:
+        """Attach the coverage a validated test achieved to its entries"""
+        body_hashes = list(body_hashes)
+        if not body_hashes:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE validated_tests SET coverage = ? WHERE body_hash = ?",
+                [(json.dumps(coverage), body_hash) for body_hash in body_hashes]
+            )
+
+    def discard(self, body_hashes: Iterable[str]) -> None:
+        """Drop the entries of the hashes, e.g. when their test no longer passes"""
+        body_hashes = list(body_hashes)
+        if not body_hashes:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM validated_tests WHERE body_hash = ?",
+                                   [(body_hash,) for body_hash in body_hashes])
+
+    def evict(self) -> int:
+        """Drop entries older than max_age_days, then the least recently used beyond max_bytes"""
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM validated_tests WHERE last_used < ?",
+                (time.time() - self.max_age_days * 86400,)
+            ).rowcount
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM validated_tests").fetchone()[0]
+            if total > self.max_bytes:
+                for row in self._conn.execute(
+                    "SELECT body_hash, size FROM validated_tests ORDER BY last_used"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute("DELETE FROM validated_tests WHERE body_hash = ?", (row["body_hash"],))
+                    total -= row["size"]
+                    removed += 1
+        return removed
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> Dict:
+        return {
+            "class_name": row["class_name"],
+            "method_name": row["method_name"],
+            "test_code": row["test_code"],
+            "coverage": json.loads(row["coverage"]) if row["coverage"] else None,
+            "created_at": row["created_at"],
+            "last_used": row["last_used"]
+        }
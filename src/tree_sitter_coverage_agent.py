@@ -1,8 +1,12 @@
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Optional
 from tree_sitter import Parser, Language
+from concurrent.futures import Executor
 import os
 import asyncio
-from dataclasses import dataclass
+import hashlib
+import threading
+import aiofiles
+from dataclasses import asdict, dataclass
 from pathlib import Path
 
 @dataclass
@@ -17,30 +21,77 @@ class MethodAnalysis:
     return_type: str
     throws: List[str]
 
+def _load_java_language():
+    """Load the Java grammar from whichever tree-sitter package is installed"""
+    try:
+        import tree_sitter_java
+        return Language(tree_sitter_java.language())
+    except ImportError:
+        pass
+    try:
+        from tree_sitter_languages import get_language
+        return get_language("java")
+    except ImportError:
+        return None
+
+def _new_parser(language) -> Parser:
+    parser = Parser()
+    if language is not None:
+        try:
+            parser.language = language
+        except AttributeError:
+            parser.set_language(language)
+    return parser
+
 class TreeSitterCoverageAgent:
-    def __init__(self, repo_path: str):
+    def __init__(self, repo_path: str, index=None):
         self.repo_path = repo_path
-        self.parser = Parser()
+        # Optional MethodIndex that persists per-file method analysis across runs
+        self.index = index
+        self.language = _load_java_language()
+        self.parser = _new_parser(self.language)
+        # tree-sitter parsers are not thread-safe, so executor threads get their own
+        self._local = threading.local()
+
+    def _get_parser(self) -> Parser:
+        """Return the parser owned by the calling thread"""
+        if threading.current_thread() is threading.main_thread():
+            return self.parser
+        parser = getattr(self._local, "parser", None)
+        if parser is None:
+            parser = _new_parser(self.language)
+            self._local.parser = parser
+        return parser
 
     def analyze_method(self, source_code: str, method_name: str) -> MethodAnalysis:
         """Analyze a specific method using tree-sitter syntax parsing"""
-        tree = self.parser.parse(bytes(source_code, "utf8"))
+        tree = self._get_parser().parse(bytes(source_code, "utf8"))
         root_node = tree.root_node
 
         # Find the method declaration
         method_node = None
-        for node in root_node.children:
-            if node.type == "method_declaration":
-                for child in node.children:
-                    if child.type == "identifier" and child.text.decode("utf8") == method_name:
-                        method_node = node
-                        break
-                if method_node:
+        for node in self._iter_method_nodes(root_node):
+            for child in node.children:
+                if child.type == "identifier" and child.text.decode("utf8") == method_name:
+                    method_node = node
                     break
+            if method_node:
+                break
 
         if not method_node:
             raise ValueError(f"Method {method_name} not found in source code")
 
+        return self._analyze_method_node(method_node)
+
+    def _iter_method_nodes(self, node):
+        """Yield every method declaration below node, including those nested in class bodies"""
+        if node.type == "method_declaration":
+            yield node
+        for child in node.children:
+            yield from self._iter_method_nodes(child)
+
+    def _analyze_method_node(self, method_node) -> MethodAnalysis:
+        """Build a MethodAnalysis from a method_declaration node"""
         # Get method name
         name_node = next(node for node in method_node.children if node.type == "identifier")
         method_name = name_node.text.decode("utf8")
@@ -68,10 +119,14 @@ class TreeSitterCoverageAgent:
                         throws_list.append(exception.text.decode("utf8"))
 
         # Analyze body
-        body_node = next(node for node in method_node.children if node.type == "block")
-        branches = self._analyze_branches(body_node)
-        conditions = self._analyze_conditions(body_node)
-        complexity = self._calculate_complexity(body_node)
+        body_node = next((node for node in method_node.children if node.type == "block"), None)
+        if body_node is None:
+            # Abstract and interface methods have no body to analyze
+            branches, conditions, complexity = [], [], 1
+        else:
+            branches = self._analyze_branches(body_node)
+            conditions = self._analyze_conditions(body_node)
+            complexity = self._calculate_complexity(body_node)
 
         return MethodAnalysis(
             name=method_name,
@@ -198,18 +253,18 @@ class TreeSitterCoverageAgent:
         # Add tests for each branch condition
         for branch in method_analysis.branches:
             suggestions["structure_based_tests"].append({
-                "scenario": f"test{branch['type'].capitalize()}Condition_Line{branch['line']}",
+                "scenario": f"test{branch['type'].capitalize()}Condition_Line{branch['start']}",
                 "focus": "Branch coverage",
-                "line": branch['line'],
-                "condition": branch['condition']
+                "line": branch['start'],
+                "end_line": branch['end']
             })
         
         # Add edge case tests based on conditions
         for condition in method_analysis.conditions:
             suggestions["edge_cases"].append({
-                "type": condition['type'],
+                "expression": condition['expression'],
                 "line": condition['line'],
-                "variants": self._generate_condition_variants(condition['text'])
+                "variants": self._generate_condition_variants(condition['expression'])
             })
         
         return suggestions
@@ -229,18 +284,52 @@ class TreeSitterCoverageAgent:
 
     async def analyze_file(self, file_path: str, uncovered_lines: List[int]) -> Dict:
         """Analyze a Java file focusing on uncovered lines"""
-        with open(file_path, 'r') as f:
-            source_code = f.read()
-            
-        tree = self.parser.parse(bytes(source_code, "utf8"))
-        
-        # Find methods containing uncovered lines
-        methods_analysis = []
-        for method in self._find_methods_with_uncovered_lines(tree, uncovered_lines):
-            analysis = self.analyze_method(source_code, method)
-            if analysis:
-                methods_analysis.append(analysis)
-                
+        async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+            source_code = await f.read()
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._analyze_source, file_path, source_code, uncovered_lines)
+
+    async def analyze_files(
+        self,
+        files: Dict[str, List[int]],
+        max_concurrency: int = 16,
+        executor: Optional[Executor] = None
+    ) -> AsyncIterator[Dict]:
+        """Analyze many Java files concurrently, yielding each result as soon as it is ready.
+
+        Files are read with aiofiles and parsed on `executor` (the loop's default thread pool
+        when None). A file that cannot be read or parsed yields a result with an "error" key."""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def analyze(file_path: str, uncovered_lines: List[int]) -> Dict:
+            async with semaphore:
+                try:
+                    async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+                        source_code = await f.read()
+                    return await loop.run_in_executor(
+                        executor, self._analyze_source, file_path, source_code, uncovered_lines
+                    )
+                except Exception as e:
+                    return {"file_path": file_path, "error": str(e), "methods": [], "suggestions": []}
+
+        tasks = [asyncio.ensure_future(analyze(path, lines)) for path, lines in files.items()]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # Stop outstanding work if the consumer breaks out early
+            for task in tasks:
+                task.cancel()
+
+    def _analyze_source(self, file_path: str, source_code: str, uncovered_lines: List[int]) -> Dict:
+        """Analyze the methods of source_code that contain uncovered lines"""
+        methods_analysis = [
+            method for method in self._methods_from_source(file_path, source_code)
+            if any(method.start_line <= line <= method.end_line for line in uncovered_lines)
+        ]
+
         return {
             "file_path": file_path,
             "methods": methods_analysis,
@@ -250,22 +339,61 @@ class TreeSitterCoverageAgent:
             ]
         }
 
-    def _find_methods_with_uncovered_lines(self, tree, uncovered_lines: List[int]):
-        """Find methods that contain uncovered lines"""
-        methods = set()
-        query = self.parser.language.query("""
-            (method_declaration
-                name: (identifier) @method_name
-            ) @method
-        """)
-        
-        for match in query.matches(tree.root_node):
-            method_node = match.captures[1].node
-            method_name = match.captures[0].node.text.decode('utf8')
-            start_line = method_node.start_point[0] + 1
-            end_line = method_node.end_point[0] + 1
-            
-            if any(start_line <= line <= end_line for line in uncovered_lines):
-                methods.add(method_name)
-                
+    def get_file_methods(self, file_path: str) -> List[MethodAnalysis]:
+        """Return every method declared in a Java file, served from the index when unchanged"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            source_code = f.read()
+        return self._methods_from_source(file_path, source_code)
+
+    def find_methods(self, method_name: str) -> List[Dict]:
+        """
+        Look up indexed methods by name across all indexed files. Files deleted since
+        they were indexed are dropped from the index, and changed ones re-indexed.
+        """
+        if self.index is None:
+            raise ValueError("find_methods requires a method index")
+        found = []
+        for path in sorted({path for path, _ in self.index.find_methods(method_name)}):
+            file_path = os.path.join(self.repo_path, path)
+            if not os.path.isfile(file_path):
+                self.index.forget(path)
+                continue
+            found.extend(
+                {"file_path": file_path, "method": method}
+                for method in self.get_file_methods(file_path) if method.name == method_name
+            )
+        return found
+
+    def methods_overlapping(self, file_path: str, start_line: int, end_line: int) -> List[MethodAnalysis]:
+        """Return the methods of file_path whose span overlaps the given line range"""
+        if self.index is None:
+            return [
+                method for method in self.get_file_methods(file_path)
+                if method.start_line <= end_line and method.end_line >= start_line
+            ]
+        # Make sure the index reflects the file's current content before querying it
+        self.get_file_methods(file_path)
+        return [
+            MethodAnalysis(**method)
+            for method in self.index.methods_overlapping(self._index_key(file_path), start_line, end_line)
+        ]
+
+    def _methods_from_source(self, file_path: str, source_code: str) -> List[MethodAnalysis]:
+        """Analyze every method in source_code, reusing the index entry if the content is unchanged"""
+        content_hash = hashlib.sha256(source_code.encode("utf8")).hexdigest()
+        key = self._index_key(file_path)
+        if self.index is not None:
+            cached = self.index.lookup(key, content_hash)
+            if cached is not None:
+                return [MethodAnalysis(**method) for method in cached]
+
+        tree = self._get_parser().parse(bytes(source_code, "utf8"))
+        methods = [self._analyze_method_node(node) for node in self._iter_method_nodes(tree.root_node)]
+
+        if self.index is not None:
+            self.index.store(key, content_hash, [asdict(method) for method in methods])
         return methods
+
+    def _index_key(self, file_path: str) -> str:
+        """Index files by their path relative to the repository root"""
+        return Path(os.path.relpath(file_path, self.repo_path)).as_posix()
@@ -0,0 +1,37 @@
+import os
+import time
+
+from src.tools.artifact_store import ArtifactStore
+
+
+def age(store, ref, days):
+    then = time.time() - days * 86400
+    os.utime(store._path(ref.digest), (then, then))
+
+
+def test_evict_drops_old_payloads_then_least_recently_used(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_age_days=7, max_bytes=10)
+    expired = store.put("x" * 4)
+    older = store.put("y" * 4)
+    newer = store.put("z" * 4)
+    recent = store.put("w" * 4)
+    age(store, expired, 8)
+    age(store, older, 3)
+    age(store, newer, 2)
+
+    assert store.evict() == 2
+
+    assert not store.exists(expired)
+    assert not store.exists(older)
+    assert store.get(newer) == "z" * 4
+    assert store.get(recent) == "w" * 4
+
+
+def test_reading_a_payload_marks_it_used(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_age_days=7)
+    ref = store.put({"analysis": 1})
+    age(store, ref, 8)
+
+    assert store.get(ref) == {"analysis": 1}
+    assert store.evict() == 0
+    assert store.exists(ref)
@@ -0,0 +1,40 @@
+import json
+
+from src import cli
+
+COUNTERS = ('<counter type="INSTRUCTION" missed="6" covered="0"/><counter type="LINE" missed="2" covered="0"/>'
+            '<counter type="COMPLEXITY" missed="1" covered="0"/><counter type="METHOD" missed="1" covered="0"/>')
+REPORT = f"""<report name="x">
+<package name="com/ex">
+<class name="com/ex/Calc" sourcefilename="Calc.java">
+<method name="add" desc="(II)I" line="20">{COUNTERS}</method>
+</class>
+<sourcefile name="Calc.java"><line nr="20" mi="3" ci="0" mb="0" cb="0"/><line nr="24" mi="3" ci="0" mb="0" cb="0"/></sourcefile>
+{COUNTERS}
+</package>
+{COUNTERS}
+</report>
+"""
+
+
+def write_report(tmp_path):
+    report_dir = tmp_path / "target" / "site" / "jacoco"
+    report_dir.mkdir(parents=True)
+    (report_dir / "jacoco.xml").write_text(REPORT)
+    return str(tmp_path)
+
+
+def test_summary_counts_reported_lines_not_the_span(tmp_path, capsys):
+    assert cli.main(["summary", write_report(tmp_path), "--json"]) == 0
+
+    result = json.loads(capsys.readouterr().out)
+    assert result["uncovered_ranges"] == 1
+    assert result["uncovered_lines"] == 2
+
+
+def test_json_report_labels_range_fields(tmp_path, capsys):
+    assert cli.main(["report", write_report(tmp_path), "--json"]) == 0
+
+    ranges = json.loads(capsys.readouterr().out)["classes"][0]["uncovered_ranges"]
+    assert ranges == [{"start": 20, "end": 24, "partial": False, "branches_missed": 0,
+                       "branches_covered": 0, "lines": 2}]
@@ -0,0 +1,82 @@
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from src import daemon
+
+
+def make_project(root, name):
+    report_dir = root / name / "target" / "site" / "jacoco"
+    report_dir.mkdir(parents=True)
+    (report_dir / "jacoco.xml").write_text("<report/>")
+    return str(root / name)
+
+
+def test_sessions_are_capped_least_recently_used_first(tmp_path):
+    analysis = daemon.AnalysisDaemon(max_sessions=2)
+    first, second, third = (make_project(tmp_path, name) for name in ("a", "b", "c"))
+
+    first_session = analysis._session(first, (None, None))
+    analysis._session(second, (None, None))
+    assert analysis._session(first, (None, None)) is first_session
+    analysis._session(third, (None, None))
+
+    assert analysis.health()["projects"] == sorted([first, third])
+
+
+def test_idle_sessions_expire(tmp_path, monkeypatch):
+    analysis = daemon.AnalysisDaemon(session_ttl=60)
+    project = make_project(tmp_path, "a")
+    clock = [1000.0]
+    monkeypatch.setattr(daemon.time, "time", lambda: clock[0])
+
+    session = analysis._session(project, (None, None))
+    clock[0] += 61
+    analysis._session(make_project(tmp_path, "b"), (None, None))
+
+    assert analysis.health()["projects"] == [str(tmp_path / "b")]
+    assert analysis._session(project, (None, None)) is not session
+
+
+class FakeDaemon:
+    def analyze(self, request):
+        raise AssertionError("not requested")
+
+    generate = analyze
+
+    def invalidate(self, request):
+        return {"invalidated": 0}
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), daemon._Handler)
+    server.daemon = FakeDaemon()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, headers):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+    try:
+        connection.request("POST", "/invalidate", body=json.dumps({}), headers=headers)
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("headers, status", [
+    ({"Content-Type": "application/json"}, 200),
+    ({"Content-Type": "application/json; charset=utf-8", "Origin": "http://localhost:3000"}, 200),
+    ({"Content-Type": "application/x-www-form-urlencoded"}, 415),
+    ({"Content-Type": "application/json", "Host": "attacker.example:8765"}, 403),
+    ({"Content-Type": "application/json", "Origin": "https://attacker.example"}, 403),
+])
+def test_only_local_json_requests_are_served(server, headers, status):
+    assert post(server, headers) == status
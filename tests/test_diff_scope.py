@@ -0,0 +1,59 @@
+import subprocess
+
+from src.tools.diff_scope import DiffScope, _changed_ranges, compute_diff_scope
+
+CALC = "package com.ex;\n\npublic class Calc {\n    int add(int a, int b) {\n        return a + b;\n    }\n}\n"
+
+
+def test_changed_ranges_reads_new_file_side_of_hunks():
+    patch = (b"--- a/Calc.java\n+++ b/Calc.java\n"
+             b"@@ -3,2 +3,4 @@ class Calc {\n+a\n+b\n"
+             b"@@ -10 +12 @@\n-x\n+y\n"
+             b"@@ -20,3 +21,0 @@\n-gone\n")
+
+    assert _changed_ranges(patch) == [(3, 6), (12, 12), (21, 21)]
+
+
+def test_deletion_at_top_of_file_maps_to_first_line():
+    assert _changed_ranges(b"@@ -1,2 +0,0 @@\n-a\n-b\n") == [(1, 1)]
+
+
+def test_ranges_for_matches_jacoco_style_suffix():
+    scope = DiffScope("base", "head", {"module/src/main/java/com/ex/Calc.java": [(3, 6)]})
+
+    assert scope.ranges_for("com/ex/Calc.java") == [(3, 6)]
+    assert scope.overlaps("com/ex/Calc.java", 6, 9)
+    assert scope.filter_lines("com/ex/Calc.java", [2, 3, 7]) == [3]
+    assert not scope.touches("com/ex/Other.java")
+
+
+def git(cwd, *args):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd, check=True,
+                   capture_output=True)
+
+
+def commit_file(repo, path, content, message):
+    target = repo / path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(content)
+    git(repo, "add", path)
+    git(repo, "commit", "-m", message)
+
+
+def test_diff_starts_at_merge_base_of_a_remote_tracking_ref(tmp_path):
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    git(origin, "init", "-b", "main")
+    commit_file(origin, "src/main/java/com/ex/Calc.java", CALC, "initial")
+    git(origin, "checkout", "-b", "feature")
+    commit_file(origin, "src/main/java/com/ex/Calc.java", CALC.replace("a + b", "b + a"), "feature change")
+    git(origin, "checkout", "main")
+    commit_file(origin, "src/main/java/com/ex/Other.java", "class Other {}\n", "main moves on")
+
+    clone = tmp_path / "clone"
+    subprocess.run(["git", "clone", "--depth", "1", "--single-branch", "--branch", "feature",
+                    f"file://{origin}", str(clone)], check=True, capture_output=True)
+
+    scope = compute_diff_scope(str(clone), "origin/main")
+
+    assert scope.changed_lines == {"src/main/java/com/ex/Calc.java": [(5, 5)]}
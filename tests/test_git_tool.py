@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+from src.tools.git_tool import clone_repo
+from src.tools.mirror_cache import MirrorCache
+
+
+def test_git_tools_import_without_gitpython():
+    code = ("import sys; import src.tools.git_tool, src.tools.diff_scope, src.tools.mirror_cache; "
+            "print('git' in sys.modules)")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+
+def git(cwd, *args):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd, check=True,
+                   capture_output=True)
+
+
+def test_clone_through_bare_mirror_of_a_local_repository(tmp_path):
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    git(origin, "init", "-b", "main")
+    (origin / "README").write_text("first\n")
+    git(origin, "add", "README")
+    git(origin, "commit", "-m", "first")
+    cache = MirrorCache(str(tmp_path / "mirrors"))
+    repo_url = f"file://{origin}"
+    target = tmp_path / "checkout"
+
+    first = clone_repo({"repo_url": repo_url, "target_dir": str(target), "mirror_cache": cache})
+    (origin / "README").write_text("second\n")
+    git(origin, "commit", "-am", "second")
+    second = clone_repo({"repo_url": repo_url, "target_dir": str(target), "mirror_cache": cache})
+
+    head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=origin, capture_output=True, text=True).stdout.strip()
+    assert first["clone_timing"]["mode"].startswith("mirror+clone")
+    assert second["clone_timing"]["mode"] == "mirror+reuse"
+    assert second["commit"] == head
+    assert (target / "README").read_text() == "second\n"
+    mirror = cache.mirror_path(repo_url)
+    assert subprocess.run(["git", "rev-parse", "--is-bare-repository"], cwd=mirror,
+                          capture_output=True, text=True).stdout.strip() == "true"
+    assert subprocess.run(["git", "remote", "get-url", "origin"], cwd=target,
+                          capture_output=True, text=True).stdout.strip() == repo_url
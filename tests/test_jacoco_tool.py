@@ -0,0 +1,32 @@
+import os
+
+from src.tools.jacoco_tool import run_jacoco
+
+
+class FakeRunner:
+    def __init__(self):
+        self.goals = []
+
+    def run(self, goals, cwd, capture_output=True, check=False):
+        self.goals.append(list(goals))
+        report = os.path.join(cwd, "target", "site", "jacoco", "index.html")
+        os.makedirs(os.path.dirname(report), exist_ok=True)
+        with open(report, 'w', encoding='utf-8') as f:
+            f.write("<html/>")
+
+
+def test_incremental_runs_clean_only_when_the_set_of_sources_changes(tmp_path):
+    sources = tmp_path / "src" / "main" / "java"
+    sources.mkdir(parents=True)
+    (tmp_path / "pom.xml").write_text("<project/>")
+    (sources / "Calc.java").write_text("class Calc {}")
+    runner = FakeRunner()
+
+    run_jacoco(str(tmp_path), runner=runner, incremental=True)
+    (sources / "Calc.java").write_text("class Calc { int x; }")
+    run_jacoco(str(tmp_path), runner=runner, incremental=True)
+    run_jacoco(str(tmp_path), runner=runner, incremental=True)
+    (sources / "Calc.java").rename(sources / "Calculator.java")
+    run_jacoco(str(tmp_path), runner=runner, incremental=True)
+
+    assert ["clean" in goals for goals in runner.goals] == [True, False, True]
@@ -0,0 +1,44 @@
+from src.tools.jacoco_xml_analyzer import LineCoverage, UncoveredRange, line_ranges
+
+
+def missed(line):
+    return LineCoverage(line, 3, 0, 0, 0)
+
+
+def partial(line, branches_missed=1, branches_covered=1):
+    return LineCoverage(line, 1, 2, branches_missed, branches_covered)
+
+
+def covered(line):
+    return LineCoverage(line, 0, 3, 0, 0)
+
+
+def test_consecutive_reported_lines_with_one_status_form_a_range():
+    ranges = line_ranges([missed(10), missed(12), missed(13), covered(14), missed(15)])
+
+    assert ranges == [UncoveredRange(10, 13, False, 0, 0, 3), UncoveredRange(15, 15, False, 0, 0, 1)]
+
+
+def test_status_change_splits_and_branch_counters_add_up():
+    ranges = line_ranges([missed(5), partial(6), partial(7, 2, 0), missed(8)])
+
+    assert ranges == [
+        UncoveredRange(5, 5, False, 0, 0, 1),
+        UncoveredRange(6, 7, True, 3, 1, 2),
+        UncoveredRange(8, 8, False, 0, 0, 1),
+    ]
+
+
+def test_ranges_stop_at_method_starts_and_rejected_lines():
+    lines = [missed(line) for line in (3, 4, 8, 9, 10)]
+
+    assert line_ranges(lines, method_lines=[2, 8]) == [
+        UncoveredRange(3, 4, False, 0, 0, 2), UncoveredRange(8, 10, False, 0, 0, 3)
+    ]
+    assert line_ranges(lines, include=lambda line: line != 9) == [
+        UncoveredRange(3, 8, False, 0, 0, 3), UncoveredRange(10, 10, False, 0, 0, 1)
+    ]
+
+
+def test_input_order_does_not_matter():
+    assert line_ranges([missed(2), missed(1)]) == [UncoveredRange(1, 2, False, 0, 0, 2)]
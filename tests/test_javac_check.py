@@ -0,0 +1,74 @@
+import os
+import subprocess
+
+from src.tools.javac_check import JavacChecker
+
+POM = "<project><modelVersion>4.0.0</modelVersion></project>"
+
+
+class FakeRunner:
+    def __init__(self):
+        self.calls = []
+
+    def run(self, args, cwd):
+        self.calls.append(cwd)
+        output = next(arg.split("=", 1)[1] for arg in args if arg.startswith("-Dmdep.outputFile="))
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(os.pathsep.join(["/m2/junit.jar", os.path.join(cwd, "core", "target", "classes")]))
+        return subprocess.CompletedProcess(args, 0)
+
+
+def test_cached_classpath_is_rebased_onto_each_checkout(tmp_path, monkeypatch):
+    monkeypatch.setenv("CODECOV_CACHE_DIR", str(tmp_path / "cache"))
+    first, second = tmp_path / "first", tmp_path / "second"
+    for project in (first, second):
+        project.mkdir()
+        (project / "pom.xml").write_text(POM)
+    runner = FakeRunner()
+
+    first_classpath = JavacChecker(str(first), "app", runner).dependency_classpath()
+    second_classpath = JavacChecker(str(second), "app", runner).dependency_classpath()
+
+    assert runner.calls == [str(first)]
+    assert first_classpath.split(os.pathsep) == ["/m2/junit.jar", str(first / "core" / "target" / "classes")]
+    assert second_classpath.split(os.pathsep) == ["/m2/junit.jar", str(second / "core" / "target" / "classes")]
+
+
+class FailingRunner:
+    def __init__(self):
+        self.calls = 0
+
+    def run(self, args, cwd):
+        self.calls += 1
+        return subprocess.CompletedProcess(args, 1)
+
+
+def test_failed_resolution_is_not_retried_until_the_poms_change(tmp_path, monkeypatch):
+    monkeypatch.setenv("CODECOV_CACHE_DIR", str(tmp_path / "cache"))
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "pom.xml").write_text(POM)
+    runner = FailingRunner()
+
+    checker = JavacChecker(str(project), None, runner)
+    assert checker.dependency_classpath() is None
+    assert checker.dependency_classpath() is None
+    assert JavacChecker(str(project), None, runner).dependency_classpath() is None
+    assert runner.calls == 1
+
+    (project / "pom.xml").write_text(POM.replace("4.0.0", "4.0.0<!-- edited -->"))
+    assert JavacChecker(str(project), None, runner).dependency_classpath() is None
+    assert runner.calls == 2
+
+
+def test_annotation_processing_projects_are_detected(tmp_path, monkeypatch):
+    monkeypatch.setenv("CODECOV_CACHE_DIR", str(tmp_path / "cache"))
+    plain, lombok = tmp_path / "plain", tmp_path / "lombok"
+    for project in (plain, lombok):
+        project.mkdir()
+    (plain / "pom.xml").write_text(POM)
+    (lombok / "pom.xml").write_text(POM.replace("</project>", "<dependencies><dependency>"
+                                                "<groupId>org.projectlombok</groupId></dependency></dependencies></project>"))
+
+    assert not JavacChecker(str(plain), None, FakeRunner()).uses_annotation_processors()
+    assert JavacChecker(str(lombok), None, FakeRunner()).uses_annotation_processors()
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.code_coverage_analyzer_agent import CoverageAnalysisAgent
+from src.tools import limits
+
+
+class SlotCheckingLLM:
+    """Records how many LLM slots are free while a request is in flight"""
+
+    def __init__(self):
+        self.free_slots = []
+
+    def invoke(self, messages):
+        self.free_slots.append(limits._llm_slots._value)
+        return SimpleNamespace(content="@Test void testAdd_returnsSum() {}")
+
+
+@pytest.fixture
+def restore_limits():
+    yield
+    limits.configure_limits()
+
+
+def test_llm_concurrency_applies_to_test_suggestions(tmp_path, restore_limits):
+    limits.configure_limits(llm_concurrency=2)
+    agent = CoverageAnalysisAgent(str(tmp_path))
+    agent.llm = SlotCheckingLLM()
+
+    result = agent._get_ai_test_suggestions(
+        {"class_name": "com/ex/Calc", "uncovered_ranges": []}, "class Calc {}", "None"
+    )
+
+    assert result["ai_suggestions"].startswith("@Test")
+    # One of the two configured slots is held for the duration of the call
+    assert agent.llm.free_slots == [1]
+    assert limits._llm_slots._value == 2
@@ -0,0 +1,19 @@
+from src.tools.maven_stream import FailureWatcher
+
+
+def failure_line(class_name):
+    return f"[ERROR] Tests run: 1, Failures: 1, Errors: 0, Skipped: 0, Time elapsed: 0.1 s <<< FAILURE! - in {class_name}"
+
+
+def test_only_failures_of_the_target_class_stop_the_build():
+    watcher = FailureWatcher("FooTest")
+
+    assert not watcher.feed(failure_line("com.ex.MyFooTest"))
+    assert not watcher.feed(failure_line("com.ex.FooTestHelperTest"))
+    assert not watcher.feed("[INFO] Running com.ex.BarTest")
+    assert watcher.reason is None
+
+    assert not watcher.feed(failure_line("com.ex.FooTest$Nested"))
+    assert not watcher.feed("java.lang.AssertionError")
+    assert watcher.feed("[INFO] Results:")
+    assert watcher.reason == "test failure in com.ex.FooTest$Nested"
@@ -0,0 +1,58 @@
+import sqlite3
+
+from src import tree_sitter_coverage_agent
+from src.tools.method_index import MethodIndex
+
+CALC = "package com.ex;\n\npublic class Calc {\n    int add(int a, int b) {\n        return a + b;\n    }\n}\n"
+
+
+def write_source(root, content=CALC):
+    path = root / "src" / "main" / "java" / "com" / "ex" / "Calc.java"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return path
+
+
+def test_checkouts_sharing_a_database_do_not_see_each_other(tmp_path):
+    db_path = str(tmp_path / "index.sqlite")
+    first, second = tmp_path / "first", tmp_path / "second"
+    write_source(first)
+    write_source(second, CALC.replace("add", "sub"))
+    first_agent = tree_sitter_coverage_agent.TreeSitterCoverageAgent(str(first), index=MethodIndex(db_path, root=str(first)))
+    second_agent = tree_sitter_coverage_agent.TreeSitterCoverageAgent(str(second), index=MethodIndex(db_path, root=str(second)))
+
+    first_agent.get_file_methods(str(write_source(first)))
+    second_agent.get_file_methods(str(write_source(second, CALC.replace("add", "sub"))))
+
+    assert [entry["method"].name for entry in first_agent.find_methods("add")] == ["add"]
+    assert first_agent.find_methods("sub") == []
+    assert [entry["file_path"] for entry in second_agent.find_methods("sub")] == [
+        str(second / "src" / "main" / "java" / "com" / "ex" / "Calc.java")
+    ]
+
+
+def test_find_methods_drops_deleted_and_refreshes_changed_files(tmp_path):
+    index = MethodIndex(str(tmp_path / "index.sqlite"), root=str(tmp_path))
+    agent = tree_sitter_coverage_agent.TreeSitterCoverageAgent(str(tmp_path), index=index)
+    source = write_source(tmp_path)
+    agent.get_file_methods(str(source))
+
+    source.write_text(CALC.replace("add", "plus"))
+    assert agent.find_methods("add") == []
+    assert [entry["method"].name for entry in agent.find_methods("plus")] == ["plus"]
+
+    source.unlink()
+    assert agent.find_methods("plus") == []
+    assert index.find_methods("plus") == []
+
+
+def test_index_written_without_roots_is_rebuilt(tmp_path):
+    db_path = str(tmp_path / "index.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.executescript("CREATE TABLE files (path TEXT PRIMARY KEY, content_hash TEXT NOT NULL, indexed_at REAL NOT NULL);"
+                       "INSERT INTO files VALUES ('Calc.java', 'x', 0);")
+    conn.close()
+
+    index = MethodIndex(db_path, root=str(tmp_path))
+
+    assert index.lookup("Calc.java", "x") is None
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+from src import test_orchestrator_agent
+from src.tools.metrics import InstrumentedLLM, RunMetrics, use_metrics
+from src.tools import test_context_index
+
+
+class FakeLLM:
+    model_name = "fake"
+
+    def invoke(self, messages):
+        return SimpleNamespace(content="@Test void testAdd_returnsSum() {}",
+                               usage_metadata={"input_tokens": 10, "output_tokens": 5})
+
+
+class FakeCoverageAgent:
+    def __init__(self, repo_path):
+        self.test_context = test_context_index.TestContextIndex(repo_path)
+
+    def get_coverage_data(self):
+        return {"overall_coverage": {}, "test_recommendations": [], "uncovered_methods": []}
+
+    def get_uncovered_methods(self):
+        return [{"class_name": "Calc", "class_path": "com/ex/Calc", "method_name": "add", "line": 5,
+                 "coverage": {"instruction_coverage": 0.0, "branch_coverage": 100}}]
+
+    def get_method_source(self, class_name, method_name):
+        return "public int add(int a, int b) { return a + b; }"
+
+
+class FakeTreeSitterAgent:
+    def analyze_method(self, java_code, method_name):
+        return None
+
+
+def test_orchestrator_llm_records_carry_class_and_method(tmp_path):
+    orchestrator = test_orchestrator_agent.TestOrchestratorAgent(
+        str(tmp_path), coverage_agent=FakeCoverageAgent(str(tmp_path)), tree_sitter_agent=FakeTreeSitterAgent()
+    )
+    orchestrator.llm = InstrumentedLLM(FakeLLM())
+    metrics = RunMetrics()
+
+    with use_metrics(metrics):
+        result = orchestrator.get_test_recommendations()
+
+    assert len(result["test_recommendations"]) == 1
+    llm_records = [entry for entry in metrics.records if entry["kind"] == "llm"]
+    assert len(llm_records) == 1
+    assert llm_records[0]["class_name"] == "Calc"
+    assert llm_records[0]["method_name"] == "add"
+    assert llm_records[0]["tokens_in"] == 10
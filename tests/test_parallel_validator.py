@@ -0,0 +1,34 @@
+import os
+
+from src.tools import parallel_validator
+from src.tools.parallel_validator import ParallelTestValidator
+
+
+def fake_validate(passing):
+    def validate(project_dir, test_dir, class_name, test_code, *args):
+        file_path = os.path.join(test_dir, f"{class_name}Test.java")
+        os.makedirs(test_dir, exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(test_code)
+        return {"class_name": class_name, "file_path": file_path, "test_code": test_code,
+                "passed": class_name in passing, "attempts": 1}
+    return validate
+
+
+def test_single_worker_keeps_passing_tests_and_restores_failing_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_validator, "validate_test_class", fake_validate({"Calc"}))
+    test_dir = tmp_path / "src" / "test" / "java"
+    test_dir.mkdir(parents=True)
+    (test_dir / "OtherTest.java").write_text("class OtherTest { /* hand written */ }")
+    validator = ParallelTestValidator(str(tmp_path), llm=None, workers=1, runner=object())
+
+    results = validator.validate([
+        {"class_name": "Calc", "test_code": "class CalcTest {}"},
+        {"class_name": "Other", "test_code": "class OtherTest { broken }"},
+        {"class_name": "New", "test_code": "class NewTest { broken }"},
+    ], str(test_dir))
+
+    assert [(r["class_name"], r["passed"]) for r in results] == [("Calc", True), ("Other", False), ("New", False)]
+    assert (test_dir / "CalcTest.java").read_text() == "class CalcTest {}"
+    assert (test_dir / "OtherTest.java").read_text() == "class OtherTest { /* hand written */ }"
+    assert not (test_dir / "NewTest.java").exists()
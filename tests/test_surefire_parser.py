@@ -0,0 +1,64 @@
+import os
+
+from src.tools.surefire_parser import parse_surefire_reports
+
+REPORT = """<?xml version="1.0" encoding="UTF-8"?>
+<testsuite name="com.ex.CalcTest" tests="3" failures="1" errors="1">
+  <testcase name="addReturnsSum" classname="com.ex.CalcTest"/>
+  <testcase name="negFlipsSign" classname="com.ex.CalcTest">
+    <failure message="expected: &lt;-4&gt; but was: &lt;4&gt;" type="org.opentest4j.AssertionFailedError">
+      at com.ex.CalcTest.negFlipsSign(CalcTest.java:20)
+    </failure>
+    <system-out>noise</system-out>
+  </testcase>
+  <testcase name="divByZero" classname="com.ex.CalcTest">
+    <error message="/ by zero" type="java.lang.ArithmeticException">at com.ex.Calc.div(Calc.java:9)</error>
+  </testcase>
+</testsuite>
+"""
+
+
+def write_report(project, module, class_name, content=REPORT):
+    report_dir = project / module / "target" / "surefire-reports"
+    report_dir.mkdir(parents=True, exist_ok=True)
+    path = report_dir / f"TEST-{class_name}.xml"
+    path.write_text(content)
+    return path
+
+
+def test_failures_and_errors_are_collected_from_every_module(tmp_path):
+    write_report(tmp_path, "core", "com.ex.CalcTest")
+    write_report(tmp_path, "app", "com.ex.AppTest", REPORT.replace("com.ex.CalcTest", "com.ex.AppTest"))
+
+    failures = sorted(parse_surefire_reports(str(tmp_path)), key=lambda failure: failure.test_name)
+
+    assert [(failure.test_name, failure.kind) for failure in failures] == [
+        ("com.ex.AppTest.divByZero", "error"), ("com.ex.AppTest.negFlipsSign", "failure"),
+        ("com.ex.CalcTest.divByZero", "error"), ("com.ex.CalcTest.negFlipsSign", "failure"),
+    ]
+    assert failures[3].describe() == (
+        "com.ex.CalcTest.negFlipsSign FAILURE: org.opentest4j.AssertionFailedError: expected: <-4> but was: <4>\n"
+        "at com.ex.CalcTest.negFlipsSign(CalcTest.java:20)"
+    )
+
+
+def test_reports_older_than_since_and_unreadable_ones_are_skipped(tmp_path, caplog):
+    old = write_report(tmp_path, "core", "com.ex.CalcTest")
+    os.utime(old, (1000, 1000))
+    write_report(tmp_path, "core", "com.ex.BrokenTest", "<testsuite><testcase")
+
+    assert parse_surefire_reports(str(tmp_path), since=2000) == []
+    assert [record.levelname for record in caplog.records] == ["WARNING"]
+    assert "TEST-com.ex.BrokenTest.xml" in caplog.text
+
+
+def test_class_filter_matches_the_class_exactly(tmp_path):
+    write_report(tmp_path, "core", "com.ex.CalcTest")
+    write_report(tmp_path, "core", "com.ex.ScientificCalcTest", REPORT.replace("com.ex.CalcTest", "com.ex.ScientificCalcTest"))
+    write_report(tmp_path, "core", "com.ex.CalcTestUtils", REPORT.replace("com.ex.CalcTest", "com.ex.CalcTestUtils"))
+    write_report(tmp_path, "core", "com.ex.CalcTest$Nested", REPORT.replace("com.ex.CalcTest", "com.ex.CalcTest$Nested"))
+
+    for class_filter in ("CalcTest", "com.ex.CalcTest"):
+        failures = parse_surefire_reports(str(tmp_path), class_filter=class_filter)
+        assert sorted({failure.class_name for failure in failures}) == ["com.ex.CalcTest", "com.ex.CalcTest$Nested"]
+    assert parse_surefire_reports(str(tmp_path), class_filter="ex.Calc") == []
@@ -0,0 +1,84 @@
+from src.tools import test_context_index as tci
+
+CALC_TEST = """package com.ex;
+
+import org.junit.jupiter.api.BeforeEach;
+import org.junit.jupiter.api.Test;
+
+class CalcTest {
+    private Calc calc;
+
+    @BeforeEach
+    void setUp() {
+        calc = new Calc();
+    }
+
+    @Test
+    void addReturnsSum() {
+        assertEquals(3, calc.add(1, 2));
+    }
+
+    @Test
+    void negFlipsSign() {
+        assertEquals(-4, calc.neg(4));
+    }
+}
+"""
+
+PARSER_TEST = """package com.ex;
+
+import org.junit.jupiter.api.Test;
+
+class ParserTest {
+    @Test
+    void parsesEmptyInput() {
+        assertTrue(new Parser().parse("").isEmpty());
+    }
+}
+"""
+
+
+def make_index(tmp_path):
+    test_dir = tmp_path / "src" / "test" / "java" / "com" / "ex"
+    test_dir.mkdir(parents=True)
+    (test_dir / "CalcTest.java").write_text(CALC_TEST)
+    (test_dir / "ParserTest.java").write_text(PARSER_TEST)
+    return tci.TestContextIndex(str(tmp_path))
+
+
+def test_tokenize_splits_camel_case_and_drops_stop_words():
+    assert tci.tokenize("public void addReturnsSum(int x)") == ["addreturnssum", "add", "returns", "sum"]
+
+
+def test_search_ranks_matching_tests_first(tmp_path):
+    index = make_index(tmp_path)
+
+    results = index.search(tci.method_query("com/ex/Calc", "add", "return a + b;"))
+
+    names = [example.method_name for _, example in results]
+    assert names[0] == "addReturnsSum"
+    assert names[-1] == "parsesEmptyInput"
+    assert [score for score, _ in results] == sorted((score for score, _ in results), reverse=True)
+    assert index.search("") == []
+
+
+def test_few_shot_keeps_header_and_respects_budget(tmp_path):
+    index = make_index(tmp_path)
+
+    examples = index.few_shot("Calc add neg", k=2, token_budget=1000)
+
+    assert {example.method_name for example in examples} == {"addReturnsSum", "negFlipsSign"}
+    assert "void setUp()" in examples[0].header
+    assert "import org.junit.jupiter.api.Test;" in examples[0].header
+    text = tci.TestContextIndex.format_examples(examples)
+    assert text.startswith("// CalcTest") and text.count("void setUp()") == 1
+
+
+def test_few_shot_skips_examples_that_do_not_fit(tmp_path):
+    index = make_index(tmp_path)
+    example = index.few_shot("parse empty", k=1, token_budget=1000)[0]
+    cost = tci.estimate_tokens(example.source) + tci.estimate_tokens(example.header)
+
+    assert example.method_name == "parsesEmptyInput"
+    assert index.few_shot("parse empty", k=1, token_budget=cost - 1) == []
+    assert index.few_shot("parse empty", k=1, token_budget=cost) == [example]
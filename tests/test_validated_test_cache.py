@@ -0,0 +1,44 @@
+from src.tools import validated_test_cache
+from src.tools.validated_test_cache import ValidatedTestCache, method_body_hash, normalize_java
+
+
+def test_discard_drops_only_the_given_entries(tmp_path):
+    cache = ValidatedTestCache(str(tmp_path / "cache.sqlite"))
+    cache.store("Calc", {"h1": "add", "h2": "neg"}, "class CalcTest {}")
+
+    cache.discard(["h1"])
+
+    assert set(cache.lookup(["h1", "h2"])) == {"h2"}
+    assert cache.lookup_class(["h1", "h2"]) is None
+
+
+def test_normalize_java_drops_comments_and_whitespace_but_keeps_literals():
+    source = 'int add(int a, int b) {\n    // sum\n    return a  +  b; /* done */\n}\nString s = "// not a comment";'
+
+    assert normalize_java(source) == 'int add(int a, int b) { return a + b; } String s = "// not a comment";'
+
+
+def test_method_body_hash_ignores_formatting_only():
+    source = "class Calc {\n    int add(int a, int b) {\n        return a + b;\n    }\n}\n"
+    reformatted = "class Calc {\n    int add(int a, int b) {\n        // adds\n        return a+b;\n    }\n}\n"
+
+    def body_hash(class_name, code, project="repo"):
+        return method_body_hash(project, class_name, code, 2, 4)
+
+    assert body_hash("Calc", source) == body_hash("Calc", source.replace("    ", "  "))
+    assert body_hash("Calc", source) != body_hash("Calc", reformatted)
+    assert body_hash("Calc", source) != body_hash("Other", source)
+    assert body_hash("Calc", source) != body_hash("Calc", source, project="other-repo")
+
+
+def test_evict_drops_stale_entries_then_least_recently_used(tmp_path, monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(validated_test_cache.time, "time", lambda: clock[0])
+    cache = ValidatedTestCache(str(tmp_path / "cache.sqlite"), max_age_days=1, max_bytes=15)
+    cache.store("Stale", {"stale": "m"}, "x" * 5)
+    clock[0] += 2 * 86400
+    cache.store("Old", {"old": "m"}, "y" * 10)
+    clock[0] += 1
+    cache.store("New", {"new": "m"}, "z" * 10)
+
+    assert set(cache.lookup(["stale", "old", "new"])) == {"new"}